@@ -0,0 +1,157 @@
+"""Measures how long it takes to import common Whoosh entry points, using the
+``-X importtime`` option of the Python interpreter (Python 3.7+).
+
+Each entry point is imported in a fresh interpreter several times and the best
+time is reported, along with the slowest modules it pulls in. Use ``--save``
+to record the numbers as a baseline and ``--compare`` to check a later run
+against it::
+
+    python benchmark/importtime.py --save baseline.json
+    python benchmark/importtime.py --compare baseline.json
+"""
+
+from __future__ import print_function
+
+import json
+import os.path
+import subprocess
+import sys
+from optparse import OptionParser
+
+
+# Statements to time, roughly in order of how much of the library they load
+ENTRY_POINTS = [
+    ("index", "import whoosh.index"),
+    ("fields", "import whoosh.fields"),
+    ("qparser", "import whoosh.qparser"),
+    ("searching", "import whoosh.searching"),
+    ("search", "from whoosh import index, qparser; "
+               "from whoosh.filedb.filestore import RamStorage; "
+               "from whoosh.fields import Schema, TEXT; "
+               "ix = RamStorage().create_index(Schema(t=TEXT)); "
+               "s = ix.searcher(); "
+               "s.search(qparser.QueryParser('t', ix.schema).parse(u'a b'))"),
+]
+
+# Modules that the entry points above shouldn't need to import
+UNWANTED = ["numpy", "asyncio", "urllib.request", "whoosh.lang.morph_en",
+            "whoosh.lang.porter", "whoosh.lang.snowball",
+            "whoosh.support.charset", "whoosh.qparser.dateparse"]
+
+
+def import_times(statement, python=sys.executable, env=None):
+    """Runs the statement in a new interpreter with ``-X importtime`` and
+    returns a tuple of ``(total, times)``, where ``total`` is the total import
+    time and ``times`` is a dictionary mapping module names to their
+    cumulative import times. All times are in microseconds.
+    """
+
+    cmd = [python, "-X", "importtime", "-c", statement]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env=env)
+    _, err = proc.communicate()
+    if proc.returncode:
+        raise Exception("%r failed:\n%s" % (statement, err.decode("utf8")))
+
+    total = 0
+    times = {}
+    for line in err.decode("utf8").splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, modname = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(cumulative)
+        except ValueError:
+            # Header line
+            continue
+        name = modname.strip()
+        times[name] = cumulative
+        # Nested imports are indented, so the cumulative times of the
+        # unindented lines add up to the total, except for the interpreter's
+        # own startup imports
+        if modname[1] != " " and name not in ("site", "encodings"):
+            total += cumulative
+    return total, times
+
+
+def measure(statement, repeat=5, env=None):
+    """Returns the best total import time (in microseconds) over several runs
+    of the statement, and the per-module times from that run.
+    """
+
+    # Run once first so the measured runs aren't compiling bytecode
+    import_times(statement, env=env)
+
+    best = besttimes = None
+    for _ in range(repeat):
+        total, times = import_times(statement, env=env)
+        if best is None or total < best:
+            best = total
+            besttimes = times
+    return best, besttimes
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-r", "--repeat", type="int", default=5,
+                      help="Number of runs for each entry point")
+    parser.add_option("-t", "--top", type="int", default=8,
+                      help="Number of slowest modules to list")
+    parser.add_option("-s", "--save", metavar="FILE",
+                      help="Save the times to this JSON file")
+    parser.add_option("-c", "--compare", metavar="FILE",
+                      help="Compare the times to a file created with --save")
+    parser.add_option("--tolerance", type="float", default=0.2,
+                      help="Fraction a time can grow before it's reported "
+                           "as a regression with --compare")
+    options, _ = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        parser.error("-X importtime requires Python 3.7 or later")
+
+    # Make sure the subprocesses import this checkout of whoosh
+    src = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([src] + [p for p in [env.get(
+        "PYTHONPATH")] if p])
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, statement in ENTRY_POINTS:
+        total, times = measure(statement, options.repeat, env)
+        results[name] = total
+        line = "%-10s %8.1f ms" % (name, total / 1000.0)
+        if baseline and name in baseline:
+            old = baseline[name]
+            line += "  (was %.1f ms, %+.0f%%)" % (old / 1000.0,
+                                                (total - old) * 100.0 / old)
+            if total > old * (1 + options.tolerance):
+                regressions.append(name)
+        print(line)
+
+        slowest = sorted(((t, m) for m, t in times.items()
+                          if m not in ("whoosh", "site", "encodings")),
+                         reverse=True)
+        for t, modname in slowest[:options.top]:
+            print("    %8.1f ms  %s" % (t / 1000.0, modname))
+        unwanted = [m for m in UNWANTED if m in times]
+        if unwanted:
+            print("    imports: %s" % ", ".join(unwanted))
+
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print("Slower than baseline:", ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compares the ways a NumericRange or DateRange query can find the documents
+in a range, using an index of random dates like ``stress/test_bigsort.py``::
+
+    python benchmark/numericrange.py
+    python benchmark/numericrange.py --docs 500000 --segments 10
+
+For each range width, prints the time to search with the terms the range
+expands into, by checking the values in the field's column, and with the
+planner choosing between them for each segment.
+"""
+
+from __future__ import print_function
+
+import os.path, random, shutil, tempfile
+from datetime import datetime, timedelta
+from optparse import OptionParser
+
+from whoosh import fields, index, query
+from whoosh.compat import xrange
+from whoosh.util import now
+
+
+START = datetime(1970, 7, 3)
+END = datetime(2011, 1, 4)
+
+
+def build(dirname, options):
+    schema = fields.Schema(id=fields.ID(stored=True),
+                           date=fields.DATETIME(sortable=True),
+                           num=fields.NUMERIC(sortable=True))
+    ix = index.create_in(dirname, schema)
+
+    # Write the documents in date order, as in a log, so each segment covers
+    # a separate span of time
+    span = (END - START).total_seconds()
+    stamps = sorted(random.uniform(0, span) for _ in xrange(options.docs))
+    per = options.docs // options.segments
+    t = now()
+    for seg in xrange(options.segments):
+        w = ix.writer(limitmb=256)
+        for i in xrange(seg * per, (seg + 1) * per):
+            dt = START + timedelta(seconds=stamps[i])
+            w.add_document(id=u"%d" % i, date=dt,
+                           num=random.randint(0, 1000000))
+        w.commit(merge=False)
+    print("Indexing %d documents in %d segments took %0.2f s"
+          % (options.docs, options.segments, now() - t))
+    return ix
+
+
+def strategies(q):
+    # Returns a copy of the query that always uses the terms, a copy that
+    # always uses the column, and the query itself, which uses the planner
+    terms = q.copy()
+    terms.column_cost = terms.python_column_cost = float("inf")
+    column = q.copy()
+    column.term_cost = float("inf")
+    return [("terms", terms), ("column", column), ("planner", q)]
+
+
+def best(s, q, repeat):
+    times = []
+    for _ in xrange(repeat):
+        t = now()
+        count = len(s.search(q, limit=None, scored=False))
+        times.append(now() - t)
+    return min(times), count
+
+
+def run(ix, options):
+    with ix.searcher() as s:
+        print("%-10s %-8s %9s %10s %10s %10s"
+              % ("field", "width", "matches", "terms", "column", "planner"))
+        for width in (0.0001, 0.001, 0.01, 0.1, 0.5):
+            span = END - START
+            lo = START + span * random.uniform(0, 1 - width)
+            hi = lo + span * width
+            q1 = query.DateRange("date", lo, hi)
+            lonum = int(1000000 * random.uniform(0, 1 - width))
+            q2 = query.NumericRange("num", lonum, lonum + int(1000000 * width))
+            for name, q in (("date", q1), ("num", q2)):
+                results = [best(s, sq, options.repeat)
+                           for _, sq in strategies(q)]
+                counts = set(count for _, count in results)
+                assert len(counts) == 1, counts
+                print("%-10s %-8s %9d %9.4fs %9.4fs %9.4fs"
+                      % ((name, width, counts.pop())
+                         + tuple(t for t, _ in results)))
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--docs", type="int", default=200000,
+                      help="Number of documents to index")
+    parser.add_option("-s", "--segments", type="int", default=8,
+                      help="Number of segments to write")
+    parser.add_option("-r", "--repeat", type="int", default=3,
+                      help="Number of times to time each search")
+    parser.add_option("-d", "--dir", default=None,
+                      help="Directory for the index (a temporary directory "
+                           "is used if not given)")
+    options, _ = parser.parse_args()
+
+    dirname = options.dir or tempfile.mkdtemp()
+    try:
+        if os.path.exists(dirname):
+            shutil.rmtree(dirname)
+        os.mkdir(dirname)
+        ix = build(dirname, options)
+        run(ix, options)
+    finally:
+        shutil.rmtree(dirname)
+
+
+if __name__ == "__main__":
+    main()
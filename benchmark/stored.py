@@ -0,0 +1,112 @@
+"""Compares the size and speed of the ways Whoosh can store the stored fields
+of documents, using the bundled Reuters corpus::
+
+    python benchmark/stored.py
+    python benchmark/stored.py --copies 20 --repeat 5
+
+The ``pickle`` column is the format used by indexes created before stored
+fields were compressed in blocks. The others encode each value separately in
+compressed blocks, either by pickling it or with the typed binary encoding.
+"""
+
+from __future__ import print_function
+
+import gzip, os.path
+from optparse import OptionParser
+
+from whoosh import columns, fields
+from whoosh.codec.whoosh3 import W3Codec, STORED_COLUMN
+from whoosh.compat import xrange
+from whoosh.filedb.filestore import RamStorage
+from whoosh.util import now
+
+
+def stored_column(serializer):
+    return columns.StoredFieldsColumn(columns.PackedBlockColumn(), serializer)
+
+
+COLUMNS = [("pickle", STORED_COLUMN),
+           ("fields-pickle", stored_column(columns.PickleSerializer())),
+           ("fields-typed", stored_column(columns.TypedSerializer())),
+           ]
+
+
+def documents(path, copies):
+    with gzip.GzipFile(path) as f:
+        lines = f.read().decode("latin1").splitlines()
+
+    for n in xrange(copies):
+        for line in lines:
+            id, text = line.split("\t", 1)
+            yield {"id": u"%s-%d" % (id, n), "headline": text[:70],
+                   "text": text, "length": len(text),
+                   "score": len(text) / 100.0, "copy": n > 0}
+
+
+def best(fn, repeat):
+    # Returns the fastest time of several calls to the function
+    times = []
+    for _ in xrange(repeat):
+        t = now()
+        fn()
+        times.append(now() - t)
+    return min(times)
+
+
+def run(name, column, docs, options):
+    schema = fields.Schema(id=fields.STORED, headline=fields.STORED,
+                           text=fields.STORED, length=fields.STORED,
+                           score=fields.STORED, copy=fields.STORED)
+    storage = RamStorage()
+    ix = storage.create_index(schema)
+
+    t = now()
+    with ix.writer(codec=W3Codec(storedcolumn=column)) as w:
+        for doc in docs:
+            w.add_document(**doc)
+    writetime = now() - t
+    size = sum(storage.file_length(fname) for fname in storage.list())
+
+    with ix.reader() as r:
+        assert list(r.all_stored_fields()) == docs
+        docnums = list(xrange(r.doc_count_all()))
+        smalls = ["id", "headline", "length"]
+
+        def full():
+            for docnum in docnums:
+                r.stored_fields(docnum)
+
+        def projected():
+            for docnum in docnums:
+                r.stored_fields(docnum, smalls)
+
+        def many():
+            r.stored_fields_many(docnums, smalls)
+
+        times = [best(fn, options.repeat) for fn in (full, projected, many)]
+
+    print("%-14s %8.1f KB %8.3f s %8.3f s %8.3f s %8.3f s"
+          % ((name, size / 1024.0, writetime) + tuple(times)))
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-d", "--dir", default=os.path.dirname(__file__),
+                      help="Directory containing reuters21578.txt.gz")
+    parser.add_option("-c", "--copies", type="int", default=4,
+                      help="Number of copies of the corpus to index")
+    parser.add_option("-r", "--repeat", type="int", default=3,
+                      help="Number of times to time each read")
+    options, _ = parser.parse_args()
+
+    path = os.path.join(options.dir, "reuters21578.txt.gz")
+    docs = list(documents(path, options.copies))
+    print("%d documents" % len(docs))
+    print("%-14s %11s %10s %10s %10s %10s"
+          % ("column", "size", "write", "read", "project", "many"))
+    for name, column in COLUMNS:
+        run(name, column, docs, options)
+
+
+if __name__ == "__main__":
+    main()
@@ -60,10 +60,59 @@ The first item must be a tokenizer and the rest must be filters (you can't put
 a filter first or a tokenizer after the first item).
 """
 
+import sys
+
 from whoosh.analysis.acore import *
 from whoosh.analysis.tokenizers import *
 from whoosh.analysis.filters import *
-from whoosh.analysis.morph import *
-from whoosh.analysis.intraword import *
-from whoosh.analysis.ngrams import *
 from whoosh.analysis.analyzers import *
+
+
+# Names that live in submodules which are comparatively expensive to import
+# (the stemming and phonetic tables in whoosh.lang). These are only imported
+# the first time one of the names is accessed on this package.
+_lazy_names = {
+    "StemFilter": "morph",
+    "PyStemmerFilter": "morph",
+    "DoubleMetaphoneFilter": "morph",
+    "CompoundWordFilter": "intraword",
+    "BiWordFilter": "intraword",
+    "ShingleFilter": "intraword",
+    "IntraWordFilter": "intraword",
+    "NgramTokenizer": "ngrams",
+    "NgramFilter": "ngrams",
+    "NgramAnalyzer": "ngrams",
+    "NgramWordAnalyzer": "ngrams",
+}
+_lazy_modules = ("morph", "intraword", "ngrams")
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        from importlib import import_module
+
+        if name in _lazy_modules:
+            return import_module("whoosh.analysis." + name)
+        if name in _lazy_names:
+            module = import_module("whoosh.analysis." + _lazy_names[name])
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(_lazy_names))
+else:
+    # Module-level __getattr__ is not available, so import everything
+    from whoosh.analysis.morph import *
+    from whoosh.analysis.intraword import *
+    from whoosh.analysis.ngrams import *
+
+
+# Since the lazy names aren't in the module's namespace until they're used,
+# list every public name explicitly so "from whoosh.analysis import *" still
+# exports them
+__all__ = sorted(set(name for name in globals()
+                     if not name.startswith("_") and name != "sys")
+                 | set(_lazy_names) | set(_lazy_modules))
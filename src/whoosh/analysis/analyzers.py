@@ -29,14 +29,11 @@ from whoosh.analysis.acore import Composable, CompositionError
 from whoosh.analysis.tokenizers import Tokenizer
 from whoosh.analysis.filters import LowercaseFilter
 from whoosh.analysis.filters import StopFilter, STOP_WORDS
-from whoosh.analysis.morph import StemFilter
-from whoosh.analysis.intraword import IntraWordFilter
 from whoosh.analysis.tokenizers import default_pattern
 from whoosh.analysis.tokenizers import CommaSeparatedTokenizer
 from whoosh.analysis.tokenizers import IDTokenizer
 from whoosh.analysis.tokenizers import RegexTokenizer
 from whoosh.analysis.tokenizers import SpaceSeparatedTokenizer
-from whoosh.lang.porter import stem
 
 
 # Analyzers
@@ -195,7 +192,7 @@ def StandardAnalyzer(expression=default_pattern, stoplist=STOP_WORDS,
 
 
 def StemmingAnalyzer(expression=default_pattern, stoplist=STOP_WORDS,
-                     minsize=2, maxsize=None, gaps=False, stemfn=stem,
+                     minsize=2, maxsize=None, gaps=False, stemfn=None,
                      ignore=None, cachesize=50000):
     """Composes a RegexTokenizer with a lower case filter, an optional stop
     filter, and a stemming filter.
@@ -211,12 +208,19 @@ def StemmingAnalyzer(expression=default_pattern, stoplist=STOP_WORDS,
     :param maxsize: Words longer that this are removed from the stream.
     :param gaps: If True, the tokenizer *splits* on the expression, rather
         than matching on the expression.
+    :param stemfn: the stemming function to use. The default is the Porter
+        stemming algorithm from :mod:`whoosh.lang.porter`.
     :param ignore: a set of words to not stem.
     :param cachesize: the maximum number of stemmed words to cache. The larger
         this number, the faster stemming will be but the more memory it will
         use. Use None for no cache, or -1 for an unbounded cache.
     """
 
+    from whoosh.analysis.morph import StemFilter
+
+    if stemfn is None:
+        from whoosh.lang.porter import stem as stemfn
+
     ret = RegexTokenizer(expression=expression, gaps=gaps)
     chain = ret | LowercaseFilter()
     if stoplist is not None:
@@ -245,6 +249,8 @@ def FancyAnalyzer(expression=r"\s+", stoplist=STOP_WORDS, minsize=2,
         than matching on the expression.
     """
 
+    from whoosh.analysis.intraword import IntraWordFilter
+
     return (RegexTokenizer(expression=expression, gaps=gaps)
             | IntraWordFilter(splitwords=splitwords, splitnums=splitnums,
                               mergewords=mergewords, mergenums=mergenums)
@@ -275,6 +281,7 @@ def LanguageAnalyzer(lang, expression=default_pattern, gaps=False,
         use.
     """
 
+    from whoosh.analysis.morph import StemFilter
     from whoosh.lang import NoStemmer, NoStopWords
 
     # Make the start of the chain
@@ -149,7 +149,8 @@ class Expander(object):
         if self.ixreader.has_vector(docnum, self.fieldname):
             self.add(ixreader.vector_as("weight", docnum, self.fieldname))
         elif self.ixreader.schema[self.fieldname].stored:
-            self.add_text(ixreader.stored_fields(docnum).get(self.fieldname))
+            sfs = ixreader.stored_fields(docnum, [self.fieldname])
+            self.add_text(sfs.get(self.fieldname))
         else:
             raise Exception("Field %r in document %s is not vectored or stored"
                             % (self.fieldname, docnum))
@@ -137,6 +137,16 @@ class PerDocumentWriter(object):
     def add_column_value(self, fieldname, columnobj, value):
         raise NotImplementedError("Codec does not implement writing columns")
 
+    def mark_partial_column(self, fieldname):
+        """Records that for some documents in this segment, the given field's
+        column doesn't hold the value that was indexed, for example because
+        the document has several values in the field and the column only
+        holds the first one. Codecs that don't record this report every
+        column as partial.
+        """
+
+        pass
+
     @abstractmethod
     def add_vector_items(self, fieldname, fieldobj, items):
         raise NotImplementedError
@@ -344,6 +354,19 @@ class TermsReader(object):
     def indexed_field_names(self):
         raise NotImplementedError
 
+    def prefix_top_terms(self, fieldname, prefix):
+        # Codecs that precompute the most frequent terms under each prefix
+        # should return a (complete, [(weight, btext), ...]) tuple, where
+        # "complete" is True if the list contains every term with the prefix.
+        # None means the codec can't answer and the caller should scan.
+        return None
+
+    def warm(self, fieldnames=None):
+        # Codecs that read from files should open them and ask the OS to load
+        # the parts holding the given fields (or all fields if fieldnames is
+        # None) into memory
+        pass
+
     def close(self):
         pass
 
@@ -383,6 +406,12 @@ class PerDocumentReader(object):
     def close(self):
         pass
 
+    def warm(self, fieldnames=None):
+        # Codecs that read from files should open the column files for the
+        # given fields (or all columns if fieldnames is None) and ask the OS
+        # to load them into memory
+        pass
+
     @abstractmethod
     def doc_count(self):
         raise NotImplementedError
@@ -433,6 +462,29 @@ class PerDocumentReader(object):
     def column_reader(self, fieldname, column):
         raise NotImplementedError
 
+    def column_range(self, fieldname):
+        """Returns a tuple of the minimum and maximum values (as stored in the
+        column) in the given field's column, or None if the codec didn't
+        record them.
+        """
+
+        return None
+
+    def zone_map(self, fieldname):
+        """Returns a :class:`whoosh.columns.ZoneMap` of the given field's
+        column, or None if the codec didn't record one.
+        """
+
+        return None
+
+    def is_partial_column(self, fieldname):
+        """Returns False if the given field's column is known to hold the
+        indexed value of every document that has one (see
+        :meth:`PerDocumentWriter.mark_partial_column`).
+        """
+
+        return True
+
     # Bitmaps
 
     def field_docs(self, fieldname):
@@ -468,9 +520,27 @@ class PerDocumentReader(object):
     # Stored
 
     @abstractmethod
-    def stored_fields(self, docnum):
+    def stored_fields(self, docnum, fieldnames=None):
+        """Returns a dictionary of the stored fields of the given document.
+
+        :param fieldnames: if given, only include the values of the fields
+            with these names.
+        """
+
         raise NotImplementedError
 
+    def stored_fields_many(self, docnums, fieldnames=None):
+        """Returns a list of the stored fields of the given documents, in the
+        same order as ``docnums``. Implementations should read the documents
+        in document number order.
+        """
+
+        docnums = list(docnums)
+        result = [None] * len(docnums)
+        for i in sorted(xrange(len(docnums)), key=docnums.__getitem__):
+            result[i] = self.stored_fields(docnums[i], fieldnames)
+        return result
+
     def all_stored_fields(self):
         for docnum in self.all_doc_ids():
             yield self.stored_fields(docnum)
@@ -534,6 +604,17 @@ class Segment(object):
             return False
         return self.compound
 
+    def index_sort(self):
+        """
+        Returns a ``(fieldname, reverse)`` tuple if the documents in this
+        segment were sorted by the given column when the segment was written,
+        or None if the documents are in the order they were added.
+        """
+
+        # Segments pickled before index sorting existed won't have the
+        # attribute
+        return getattr(self, "indexsort", None)
+
     # File convenience methods
 
     def make_filename(self, ext):
@@ -780,6 +861,15 @@ class MultiPerDocumentReader(PerDocumentReader):
         else:
             return columns.MultiColumnReader(colreaders)
 
+    def column_range(self, fieldname):
+        ranges = [r.column_range(fieldname) for r in self._readers]
+        if not ranges or None in ranges:
+            return None
+        return min(lo for lo, _ in ranges), max(hi for _, hi in ranges)
+
+    def is_partial_column(self, fieldname):
+        return any(r.is_partial_column(fieldname) for r in self._readers)
+
     # Lengths
 
     def doc_field_length(self, docnum, fieldname, default=0):
@@ -29,7 +29,7 @@ from __future__ import with_statement
 from bisect import bisect_left
 from threading import Lock
 
-from whoosh.compat import xrange
+from whoosh.compat import iteritems, xrange
 from whoosh.codec import base
 from whoosh.matching import ListMatcher
 from whoosh.reading import SegmentReader, TermInfo, TermNotFound
@@ -179,8 +179,11 @@ class MemPerDocReader(base.PerDocumentReader):
         ids, weights, values = zip(*items)
         return ListMatcher(ids, weights, values, format_)
 
-    def stored_fields(self, docnum):
-        return self._segment._stored[docnum]
+    def stored_fields(self, docnum, fieldnames=None):
+        sfs = self._segment._stored[docnum]
+        if fieldnames is not None:
+            sfs = dict((k, v) for k, v in iteritems(sfs) if k in fieldnames)
+        return sfs
 
     def close(self):
         pass
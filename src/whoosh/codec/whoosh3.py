@@ -30,12 +30,16 @@ This module implements a "codec" for writing/reading Whoosh X indexes.
 """
 
 import struct
+import threading
 from array import array
+from bisect import bisect_left
 from collections import defaultdict
+from heapq import heappush, heapreplace
 
 from whoosh import columns, formats
 from whoosh.compat import b, bytes_type, string_type, integer_types
-from whoosh.compat import dumps, loads, iteritems, xrange
+from whoosh.compat import BytesIO, dumps, load, loads, iteritems, izip, xrange
+from whoosh.compat import pickle
 from whoosh.codec import base
 from whoosh.filedb import compound, filetables
 from whoosh.matching import ListMatcher, ReadTooFar, LeafMatcher
@@ -63,8 +67,14 @@ LENGTHS_COLUMN = columns.NumericColumn("B", default=0)
 VECTOR_COLUMN = columns.NumericColumn("I")
 # Column type to store vector posting list lengths
 VECTOR_LEN_COLUMN = columns.NumericColumn("i")
-# Column type to store values of stored fields
+# Column type to store values of stored fields in indexes created before
+# stored fields were compressed in blocks
 STORED_COLUMN = columns.PickleColumn(columns.CompressedBytesColumn())
+# Column type to store values of stored fields
+BLOCK_STORED_COLUMN = columns.StoredFieldsColumn(columns.PackedBlockColumn())
+# Column type to store large stored field values separately from the others
+BIG_STORED_COLUMN = columns.StoredFieldsColumn(columns.CompressedBytesColumn(),
+                                               columns.PickleSerializer())
 
 
 class W3Codec(base.Codec):
@@ -73,11 +83,45 @@ class W3Codec(base.Codec):
     POSTS_EXT = ".pst"  # Term postings
     VPOSTS_EXT = ".vps"  # Vector postings
     COLUMN_EXT = ".col"  # Per-document value columns
+    COMPLETION_EXT = ".cmp"  # Top terms by prefix for completion fields
+
+    # Codecs unpickled from indexes written by older versions don't have these
+    # attributes set by __init__, so they fall back to the old stored format
+    _storedcolumn = STORED_COLUMN
+    _storedlimit = None
+    _zonesize = 0
+
+    def __init__(self, blocklimit=128, compression=3, inlinelimit=1,
+                 completiondepth=3, completionlimit=10, storedcolumn=None,
+                 storedlimit=1024, zonesize=1024):
+        """
+        :param storedcolumn: the :class:`whoosh.columns.Column` object used
+            to store the stored fields of each document. The default is a
+            :class:`~whoosh.columns.StoredFieldsColumn` wrapping a
+            :class:`~whoosh.columns.PackedBlockColumn`, which encodes common
+            types of values with a
+            :class:`~whoosh.columns.TypedSerializer`. To use a different
+            serializer, pass a ``StoredFieldsColumn`` with your own
+            serializer object.
+        :param storedlimit: stored string and bytes values longer than this
+            are stored in a separate column, so that reading a document's
+            other stored fields doesn't have to decompress them. Use None to
+            store all values together.
+        :param zonesize: for fields with numeric columns, record the minimum
+            and maximum value in each run of this many documents (see
+            :class:`whoosh.columns.ZoneMap`), and in the whole segment, so
+            range searches on the column can skip documents that can't
+            match. Use 0 to not record them.
+        """
 
-    def __init__(self, blocklimit=128, compression=3, inlinelimit=1):
         self._blocklimit = blocklimit
         self._compression = compression
         self._inlinelimit = inlinelimit
+        self._completiondepth = completiondepth
+        self._completionlimit = completionlimit
+        self._storedcolumn = storedcolumn or BLOCK_STORED_COLUMN
+        self._storedlimit = storedlimit
+        self._zonesize = zonesize
 
     # def automata(self):
 
@@ -112,7 +156,7 @@ class W3Codec(base.Codec):
     # Readers
 
     def per_document_reader(self, storage, segment):
-        return W3PerDocReader(storage, segment)
+        return W3PerDocReader(storage, segment, self._storedcolumn)
 
     def terms_reader(self, storage, segment):
         tiname = segment.make_filename(self.TERMS_EXT)
@@ -121,7 +165,14 @@ class W3Codec(base.Codec):
 
         postfile = segment.open_file(storage, self.POSTS_EXT)
 
-        return W3TermsReader(self, tifile, tilen, postfile)
+        # The completion table only exists if a field was configured with
+        # completion=True
+        cmpname = segment.make_filename(self.COMPLETION_EXT)
+        cmptable = None
+        if storage.file_exists(cmpname):
+            cmptable = filetables.HashReader.open(storage, cmpname)
+
+        return W3TermsReader(self, tifile, tilen, postfile, cmptable)
 
     # Graph methods provided by CodecWithGraph
 
@@ -151,6 +202,32 @@ def _lenfield(fieldname):
     return "_%s_len" % fieldname
 
 
+def _zonefield(fieldname):
+    return "_%s_zone" % fieldname
+
+
+# The number of bytes to read for a posting block's info tuple. This is enough
+# for the info of blocks with integer IDs; if the info is longer (for example
+# a vector block's maximum ID is a term), the whole block is read instead
+_BLOCK_INFO_PEEK = 64
+
+
+def _load_block_info(postfile, position, length):
+    # Unpickles the info tuple at the start of the posting block at the given
+    # position, and returns it with the position where the block's data
+    # starts. Unpickling from a BytesIO over a small read is much faster than
+    # unpickling from a file-like object implemented in Python
+    size = min(length, _BLOCK_INFO_PEEK)
+    while True:
+        bio = BytesIO(postfile.get(position, size))
+        try:
+            return load(bio), position + bio.tell()
+        except (EOFError, pickle.UnpicklingError):
+            if size >= length:
+                raise
+            size = length
+
+
 # Per-doc information writer
 
 class W3PerDocWriter(base.PerDocWriterWithColumns):
@@ -162,9 +239,13 @@ class W3PerDocWriter(base.PerDocWriterWithColumns):
         tempst = storage.temp_storage("%s.tmp" % segment.indexname)
         self._cols = compound.CompoundWriter(tempst)
         self._colwriters = {}
-        self._create_column("_stored", STORED_COLUMN)
+        self._storedcolumn = codec._storedcolumn
+        self._storedlimit = codec._storedlimit
+        self._zonesize = codec._zonesize
+        self._create_column("_stored", self._storedcolumn)
 
         self._fieldlengths = defaultdict(int)
+        self._partialcolumns = set()
         self._doccount = 0
         self._docnum = None
         self._storedfields = None
@@ -187,7 +268,10 @@ class W3PerDocWriter(base.PerDocWriterWithColumns):
             raise Exception("Already added column %r" % fieldname)
 
         f = self._cols.create_file(fieldname)
-        writers[fieldname] = column.writer(f)
+        writer = writers[fieldname] = column.writer(f)
+        # Internal columns (lengths, vectors, etc.) start with an underscore
+        if self._zonesize and not fieldname.startswith("_"):
+            writer.track_zones(self._zonesize)
 
     def _get_column(self, fieldname):
         return self._colwriters[fieldname]
@@ -221,6 +305,9 @@ class W3PerDocWriter(base.PerDocWriterWithColumns):
             # Add length to total field length
             self._fieldlengths[fieldname] += length
 
+    def mark_partial_column(self, fieldname):
+        self._partialcolumns.add(fieldname)
+
     def add_vector_items(self, fieldname, fieldobj, items):
         if not items:
             # Don't do anything if the list of items is empty
@@ -247,7 +334,17 @@ class W3PerDocWriter(base.PerDocWriterWithColumns):
     def finish_doc(self):
         sf = self._storedfields
         if sf:
-            self.add_column_value("_stored", STORED_COLUMN, sf)
+            limit = self._storedlimit
+            if limit is not None:
+                big = dict((k, v) for k, v in iteritems(sf)
+                           if isinstance(v, (string_type, bytes_type))
+                           and len(v) > limit)
+                if big:
+                    self.add_column_value("_stored_big", BIG_STORED_COLUMN,
+                                          big)
+                    for k in big:
+                        del sf[k]
+            self.add_column_value("_stored", self._storedcolumn, sf)
             sf.clear()
         self._indoc = False
 
@@ -266,8 +363,18 @@ class W3PerDocWriter(base.PerDocWriterWithColumns):
         self._segment._fieldlengths = self._fieldlengths
 
         # Finish open columns and close the columns writer
-        for writer in self._colwriters.values():
+        columnranges = {}
+        for fieldname, writer in list(self._colwriters.items()):
             writer.finish(self._doccount)
+
+            # Save the zone map in a separate column file, and the range of
+            # the whole column in the segment
+            zones = writer.zone_map()
+            if zones is not None:
+                zones.to_file(self._cols.create_file(_zonefield(fieldname)))
+                columnranges[fieldname] = zones.min_max()
+        self._segment._columnranges = columnranges
+        self._segment._partialcolumns = self._partialcolumns
         self._cols.save_as_files(self._storage, self._column_filename)
 
         # If vectors were written, close the vector writers
@@ -295,6 +402,11 @@ class W3FieldWriter(base.FieldWriter):
 
         self._postfile = self._create_file(W3Codec.POSTS_EXT)
 
+        # We'll wait to create the completion file until a field that wants
+        # completions is actually written
+        self._cmpwriter = None
+        self._incompletion = False
+
         self._postwriter = None
         self._infield = False
         self.is_closed = False
@@ -318,6 +430,17 @@ class W3FieldWriter(base.FieldWriter):
         # Start a new postwriter for this field
         self._postwriter = self._codec.postings_writer(self._postfile)
 
+        self._incompletion = bool(fieldobj.completion)
+        if self._incompletion:
+            if self._cmpwriter is None:
+                codec = self._codec
+                cmpfile = self._create_file(W3Codec.COMPLETION_EXT)
+                self._cmpwriter = W3CompletionWriter(cmpfile,
+                                                     codec._completiondepth,
+                                                     codec._completionlimit)
+            keyprefix = pack_ushort(self._fieldid)
+            self._cmpwriter.start_field(fieldname, keyprefix)
+
     def start_term(self, btext):
         if self._postwriter is None:
             raise Exception("Called start_term before start_field")
@@ -335,28 +458,109 @@ class W3FieldWriter(base.FieldWriter):
         valbytes = terminfo.to_bytes()
         self._tindex.add(keybytes, valbytes)
 
+        if self._incompletion:
+            self._cmpwriter.add_term(self._btext, terminfo.weight())
+
     # FieldWriterWithGraph.add_spell_word
 
     def finish_field(self):
         if not self._infield:
             raise Exception("Called finish_field before start_field")
+        if self._incompletion:
+            self._cmpwriter.finish_field()
+            self._incompletion = False
         self._infield = False
         self._postwriter = None
 
     def close(self):
         self._tindex.close()
         self._postfile.close()
+        if self._cmpwriter is not None:
+            self._cmpwriter.close()
         self.is_closed = True
 
 
+class W3CompletionWriter(object):
+    """Writes a table mapping each prefix of up to ``depth`` bytes to the
+    ``limit`` most frequent terms that start with it. Because the field writer
+    sees terms in sorted order, the prefixes form a trie that is built in one
+    pass: each open node keeps a bounded heap, and is written out as soon as
+    the incoming terms no longer share its prefix.
+    """
+
+    def __init__(self, dbfile, depth, limit):
+        self._table = filetables.HashWriter(dbfile)
+        self._depth = depth
+        self._limit = limit
+
+        extras = self._table.extras
+        extras["depth"] = depth
+        extras["limit"] = limit
+        self._fieldnames = extras["fieldnames"] = set()
+
+        self._keyprefix = None
+        # The open trie nodes from the root down, as [prefix, count, heap]
+        self._nodes = []
+
+    def start_field(self, fieldname, keyprefix):
+        self._fieldnames.add(fieldname)
+        self._keyprefix = keyprefix
+        self._nodes = []
+
+    def add_term(self, btext, weight):
+        nodes = self._nodes
+        depth = min(self._depth, len(btext))
+
+        # Close the nodes whose prefix this term does not share
+        level = 0
+        while (level < len(nodes) and level <= depth
+               and nodes[level][0] == btext[:level]):
+            level += 1
+        self._close_nodes(level)
+
+        # Open nodes for the rest of this term's prefixes
+        for i in xrange(len(nodes), depth + 1):
+            nodes.append([btext[:i], 0, []])
+
+        item = (weight, btext)
+        limit = self._limit
+        for node in nodes:
+            node[1] += 1
+            heap = node[2]
+            if len(heap) < limit:
+                heappush(heap, item)
+            elif item > heap[0]:
+                heapreplace(heap, item)
+
+    def _close_nodes(self, level):
+        nodes = self._nodes
+        limit = self._limit
+        while len(nodes) > level:
+            prefix, count, heap = nodes.pop()
+            # Record whether the list contains every term with this prefix, so
+            # the reader knows whether it can filter it for longer prefixes
+            value = dumps((count <= limit, sorted(heap, reverse=True)), 2)
+            self._table.add(self._keyprefix + prefix, value)
+
+    def finish_field(self):
+        self._close_nodes(0)
+
+    def close(self):
+        self._table.close()
+
+
 # Reader objects
 
 class W3PerDocReader(base.PerDocumentReader):
-    def __init__(self, storage, segment):
+    def __init__(self, storage, segment, storedcolumn=STORED_COLUMN):
         self._storage = storage
         self._segment = segment
+        self._storedcolumn = storedcolumn
         self._doccount = segment.doc_count_all()
 
+        # Files are opened the first time they're needed. Since a reader can
+        # be shared between threads, use a lock to only open each file once
+        self._lock = threading.Lock()
         self._vpostfile = None
         self._colfiles = {}
         self._readers = {}
@@ -398,12 +602,52 @@ class W3PerDocReader(base.PerDocumentReader):
         colfile = self._storage.open_file(filename)
         return colfile, 0, length
 
-    def column_reader(self, fieldname, column):
+    def _column_file(self, fieldname):
         if fieldname not in self._colfiles:
-            self._colfiles[fieldname] = self._get_column_file(fieldname)
-        colfile, offset, length = self._colfiles[fieldname]
+            with self._lock:
+                if fieldname not in self._colfiles:
+                    colfile = self._get_column_file(fieldname)
+                    self._colfiles[fieldname] = colfile
+        return self._colfiles[fieldname]
+
+    def column_reader(self, fieldname, column):
+        colfile, offset, length = self._column_file(fieldname)
         return column.reader(colfile, offset, length, self._doccount)
 
+    def column_range(self, fieldname):
+        # Segments written by older versions don't have this attribute
+        columnranges = getattr(self._segment, "_columnranges", None)
+        if columnranges:
+            return columnranges.get(fieldname)
+
+    def is_partial_column(self, fieldname):
+        # Segments written by older versions don't have this attribute
+        partial = getattr(self._segment, "_partialcolumns", None)
+        return partial is None or fieldname in partial
+
+    def zone_map(self, fieldname):
+        zonefield = _zonefield(fieldname)
+        if not self.has_column(zonefield):
+            return None
+        colfile, offset, _ = self._column_file(zonefield)
+        return columns.ZoneMap.from_file(colfile, offset)
+
+    def warm(self, fieldnames=None):
+        if fieldnames is None:
+            # Find the names of all column files in the segment
+            prefix = self._segment.make_filename(".")
+            fieldnames = [name[len(prefix):-len(W3Codec.COLUMN_EXT)]
+                          for name in self._segment.list_files(self._storage)
+                          if name.endswith(W3Codec.COLUMN_EXT)]
+            vname = self._segment.make_filename(W3Codec.VPOSTS_EXT)
+            if self._storage.file_exists(vname):
+                self._vector_file().prefetch()
+
+        for fieldname in fieldnames:
+            if self.has_column(fieldname):
+                colfile, offset, length = self._column_file(fieldname)
+                colfile.prefetch(offset, length)
+
     # Lengths
 
     def _cached_reader(self, fieldname, column):
@@ -452,9 +696,13 @@ class W3PerDocReader(base.PerDocumentReader):
 
     # Vectors
 
-    def _prep_vectors(self):
-        f = self._segment.open_file(self._storage, W3Codec.VPOSTS_EXT)
-        self._vpostfile = f
+    def _vector_file(self):
+        if self._vpostfile is None:
+            with self._lock:
+                if self._vpostfile is None:
+                    self._vpostfile = self._segment.open_file(
+                        self._storage, W3Codec.VPOSTS_EXT)
+        return self._vpostfile
 
     def _vector_extent(self, docnum, fieldname):
         if docnum > self._doccount:
@@ -482,25 +730,76 @@ class W3PerDocReader(base.PerDocumentReader):
         return False
 
     def vector(self, docnum, fieldname, format_):
-        if self._vpostfile is None:
-            self._prep_vectors()
+        vpostfile = self._vector_file()
         offset, length = self._vector_extent(docnum, fieldname)
         if not offset:
             raise Exception("Field %r has no vector in docnum %s" %
                             (fieldname, docnum))
-        m = W3LeafMatcher(self._vpostfile, offset, length, format_,
-                          byteids=True)
+        m = W3LeafMatcher(vpostfile, offset, length, format_, byteids=True)
         return m
 
     # Stored fields
 
-    def stored_fields(self, docnum):
-        reader = self._cached_reader("_stored", STORED_COLUMN)
-        v = reader[docnum]
-        if v is None:
-            v = {}
+    def stored_fields(self, docnum, fieldnames=None):
+        reader = self._cached_reader("_stored", self._storedcolumn)
+        if fieldnames is None:
+            v = reader[docnum] or {}
+        elif isinstance(reader, columns.StoredFieldsColumn.Reader):
+            # Only decode the requested fields
+            v = reader.project(docnum, fieldnames) or {}
+        else:
+            v = reader[docnum] or {}
+            v = dict((k, v[k]) for k in fieldnames if k in v)
+
+        # Get large values that were stored separately
+        bigreader = self._cached_reader("_stored_big", BIG_STORED_COLUMN)
+        if bigreader is not None:
+            if fieldnames is None:
+                big = bigreader[docnum]
+            else:
+                missing = [name for name in fieldnames if name not in v]
+                big = missing and bigreader.project(docnum, missing)
+            if big:
+                v.update(big)
         return v
 
+    def stored_fields_many(self, docnums, fieldnames=None):
+        docnums = list(docnums)
+        # Read the documents in order, so the stored column reads each block
+        # (or each run of neighboring blocks) once
+        ordered = sorted(set(docnums))
+
+        reader = self._cached_reader("_stored", self._storedcolumn)
+        if isinstance(reader, columns.StoredFieldsColumn.Reader):
+            values = reader.values(ordered, fieldnames)
+        else:
+            values = reader.values(ordered)
+            if fieldnames is not None:
+                values = [v and dict((k, v[k]) for k in fieldnames if k in v)
+                          for v in values]
+        values = [v or {} for v in values]
+
+        bydoc = dict(izip(ordered, values))
+
+        bigreader = self._cached_reader("_stored_big", BIG_STORED_COLUMN)
+        if bigreader is not None:
+            wanted = ordered
+            if fieldnames is not None:
+                # Only look for large values of fields that weren't found
+                wanted = [docnum for docnum in ordered
+                          if any(name not in bydoc[docnum]
+                                 for name in fieldnames)]
+            for docnum, big in izip(wanted,
+                                    bigreader.values(wanted, fieldnames)):
+                if big:
+                    bydoc[docnum].update(big)
+
+        result = [bydoc[docnum] for docnum in docnums]
+        if len(ordered) < len(docnums):
+            # Don't return the same dictionary object for repeated docnums
+            result = [dict(v) for v in result]
+        return result
+
 
 class W3FieldCursor(base.FieldCursor):
     def __init__(self, tindex, fieldname, keycoder, keydecoder, fieldobj):
@@ -561,16 +860,51 @@ class W3FieldCursor(base.FieldCursor):
 
 
 class W3TermsReader(base.TermsReader):
-    def __init__(self, codec, dbfile, length, postfile):
+    def __init__(self, codec, dbfile, length, postfile, cmptable=None):
         self._codec = codec
         self._dbfile = dbfile
-        self._tindex = filetables.OrderedHashReader(dbfile, length)
-        self._fieldmap = self._tindex.extras["fieldmap"]
+        self._length = length
         self._postfile = postfile
-
-        self._fieldunmap = [None] * len(self._fieldmap)
-        for fieldname, num in iteritems(self._fieldmap):
-            self._fieldunmap[num] = fieldname
+        self._cmptable = cmptable
+
+        # The files are open, but the term index isn't parsed until it's
+        # first needed. Since a reader can be shared between threads, use a
+        # lock to only parse it once
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._index is None:
+                tindex = filetables.OrderedHashReader(self._dbfile,
+                                                      self._length)
+                fieldmap = tindex.extras["fieldmap"]
+                fieldunmap = [None] * len(fieldmap)
+                for fieldname, num in iteritems(fieldmap):
+                    fieldunmap[num] = fieldname
+
+                self._fmap = fieldmap
+                self._funmap = fieldunmap
+                self._index = tindex
+        return self._index
+
+    @property
+    def _tindex(self):
+        if self._index is None:
+            return self._load()
+        return self._index
+
+    @property
+    def _fieldmap(self):
+        if self._index is None:
+            self._load()
+        return self._fmap
+
+    @property
+    def _fieldunmap(self):
+        if self._index is None:
+            self._load()
+        return self._funmap
 
     def _keycoder(self, fieldname, tbytes):
         assert isinstance(tbytes, bytes_type), "tbytes=%r" % tbytes
@@ -640,9 +974,62 @@ class W3TermsReader(base.TermsReader):
                                         term=(fieldname, tbytes), scorer=scorer)
         return m
 
+    def prefix_top_terms(self, fieldname, prefix):
+        table = self._cmptable
+        if table is None or fieldname not in table.extras["fieldnames"]:
+            return None
+
+        depth = table.extras["depth"]
+        value = table.get(self._keycoder(fieldname, prefix[:depth]))
+        if value is None:
+            # No terms in this field start with the prefix
+            return True, []
+
+        complete, items = loads(value)
+        if len(prefix) > depth:
+            # The table doesn't go this deep, but if the shallower node lists
+            # every term under it we can still answer by filtering the list
+            if not complete:
+                return None
+            items = [item for item in items if item[1].startswith(prefix)]
+        return complete, items
+
+    def warm(self, fieldnames=None):
+        # The term index is small compared to the postings, so always load
+        # all of it
+        self._dbfile.prefetch()
+        if self._cmptable is not None:
+            self._cmptable.dbfile.prefetch()
+
+        postfile = self._postfile
+        if fieldnames is None:
+            postfile.prefetch()
+            return
+
+        for fieldname in fieldnames:
+            # Postings are written in term order, so a field's postings are
+            # one contiguous range of the file
+            start = end = None
+            for (fname, _), terminfo in self.items_from(fieldname, emptybytes):
+                if fname != fieldname:
+                    break
+                if terminfo.is_inlined():
+                    continue
+                offset, length = terminfo.extent()
+                if start is None:
+                    start = offset
+                end = offset + length
+            if start is not None:
+                postfile.prefetch(start, end - start)
+
     def close(self):
-        self._tindex.close()
+        if self._index is not None:
+            self._index.close()
+        else:
+            self._dbfile.close()
         self._postfile.close()
+        if self._cmptable is not None:
+            self._cmptable.close()
 
 
 # Postings
@@ -872,6 +1259,9 @@ class W3PostingsWriter(base.PostingsWriter):
 class W3LeafMatcher(LeafMatcher):
     """Reads on-disk postings from the postings file and presents the
     :class:`whoosh.matching.Matcher` interface.
+
+    This class only reads from the postings file using positional ``get*``
+    methods, so many matchers in different threads can share the same file.
     """
 
     def __init__(self, postfile, startoffset, length, format_, term=None,
@@ -891,16 +1281,13 @@ class W3LeafMatcher(LeafMatcher):
         self.reset()
 
     def _read_header(self):
-        # Seek to the start of the postings and check the header tag
-        postfile = self._postfile
-
-        postfile.seek(self._startoffset)
-        magic = postfile.read(4)
+        # Check the header tag at the start of the postings
+        magic = self._postfile.get(self._startoffset, 4)
         if magic != WHOOSH3_HEADER_MAGIC:
             raise Exception("Block tag error %r" % magic)
 
         # Remember the base offset (start of postings, after the header)
-        self._baseoffset = postfile.tell()
+        self._baseoffset = self._startoffset + 4
 
     def reset(self):
         # Reset block stats
@@ -930,10 +1317,8 @@ class W3LeafMatcher(LeafMatcher):
         # Reset pointer into the block
         self._i = 0
 
-        # Seek to the start of the block
-        postfile.seek(position)
         # Read the block length
-        length = postfile.read_int()
+        length = postfile.get_int(position)
         # If the block length is negative, that means this is the last block
         if length < 0:
             self._lastblock = True
@@ -941,10 +1326,11 @@ class W3LeafMatcher(LeafMatcher):
 
         # Remember the offset of the next block
         self._nextoffset = position + _INT_SIZE + length
-        # Read the pickled block info tuple
-        info = postfile.read_pickle()
-        # Remember the offset of the block's data
-        self._dataoffset = postfile.tell()
+        # Read the pickled block info tuple, and remember the offset of the
+        # block's data. The data isn't read until it's needed, since the
+        # caller may skip the block based on the info
+        info, self._dataoffset = _load_block_info(postfile,
+                                                  position + _INT_SIZE, length)
 
         # Decompose the info tuple to set the current block info
         (self._blocklength, self._maxid, self._maxweight, self._compression,
@@ -1030,10 +1416,14 @@ class W3LeafMatcher(LeafMatcher):
         if targetid > block_max_id():
             self._skip_to_block(lambda: targetid > block_max_id())
 
-        # Iterate through the IDs in the block until we find or pass the
-        # target
-        while self.is_active() and self.id() < targetid:
-            self.next()
+        # Binary search the IDs in the block for the target (the IDs in a
+        # block are sorted, and the block's maximum ID is at least the target)
+        if self.is_active():
+            if self._ids is None:
+                self._read_ids()
+            self._i = bisect_left(self._ids, targetid, self._i)
+            if self._i == self._blocklength:
+                self._next_block()
 
     def skip_to_quality(self, minquality):
         # Skip blocks until we find one that might exceed the given minimum
@@ -1068,10 +1458,13 @@ class W3LeafMatcher(LeafMatcher):
         return self._maxweight
 
     def _read_data(self):
-        # Load block data tuple from disk
+        # Decode the block data tuple
 
-        datalen = self._nextoffset - self._dataoffset
-        b = self._postfile.get(self._dataoffset, datalen)
+        # Read the data with a single positional read. If the file is memory
+        # mapped, this is a memoryview of the map, which zlib and pickle
+        # accept, so we don't copy the data
+        offset = self._dataoffset
+        b = self._postfile.get_view(offset, self._nextoffset - offset)
 
         # Decompress the pickled data if necessary
         if self._compression:
@@ -1224,7 +1617,7 @@ class W3TermInfo(TermInfo):
             offpos = st.size
             lenpos = st.size + _LONG_SIZE
             terminfo._offset = unpack_long(s[offpos:lenpos])[0]
-            terminfo._length = unpack_int(s[lenpos:lenpos + _INT_SIZE])
+            terminfo._length = unpack_int(s[lenpos:lenpos + _INT_SIZE])[0]
 
         return terminfo
 
@@ -1260,6 +1653,7 @@ class W3Segment(base.Segment):
         self._doccount = doccount
         self._deleted = deleted
         self.compound = False
+        self.indexsort = None
 
     def codec(self, **kwargs):
         return self._codec
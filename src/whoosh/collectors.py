@@ -76,16 +76,19 @@ generally a good idea to create a new collector for each search.
 """
 
 import os
+import sys
 import threading
 from array import array
 from bisect import insort
 from collections import defaultdict
 from heapq import heapify, heappush, heapreplace
+from itertools import islice
 
 from whoosh import sorting
 from whoosh.compat import abstractmethod, iteritems, itervalues, xrange
 from whoosh.searching import Results, TimeLimit
 from whoosh.util import now
+from whoosh.util.loading import optional_numpy
 
 
 # Functions
@@ -219,8 +222,10 @@ class Collector(object):
         """This method is called for every matched document. It should do the
         work of adding a matched document to the results, and it should return
         an object to use as a "sorting key" for the given document (such as the
-        document's score, a key generated by a facet, or just None). Subclasses
-        must implement this method.
+        document's score, a key generated by a facet, or just None). A
+        collector that only works out sort keys at the end may return None
+        here, in which case a wrapping collector that needs the key should call
+        :meth:`Collector.sort_key`. Subclasses must implement this method.
 
         If you want the score for the current document, use
         ``self.matcher.score()``.
@@ -424,16 +429,21 @@ class TopCollector(ScoredCollector):
     """A collector that only returns the top "N" scored results.
     """
 
-    def __init__(self, limit=10, usequality=True, **kwargs):
+    def __init__(self, limit=10, usequality=True, search_after=None,
+                 **kwargs):
         """
         :param limit: the maximum number of results to return.
         :param usequality: whether to use block-quality optimizations. This may
             be useful for debugging.
+        :param search_after: an optional ``(score, docnum)`` cursor (see
+            :meth:`whoosh.searching.Results.next_cursor`). If given, only
+            documents that rank after the cursor are kept.
         """
 
         ScoredCollector.__init__(self, **kwargs)
         self.limit = limit
         self.usequality = usequality
+        self.search_after = search_after
         self.total = 0
 
     def _use_block_quality(self):
@@ -462,6 +472,14 @@ class TopCollector(ScoredCollector):
         items = self.items
         self.total += 1
 
+        # Higher scores rank first, then lower document numbers, so skip
+        # documents that rank at or before the cursor
+        after = self.search_after
+        if after is not None and (score > after[0] or
+                                  (score == after[0]
+                                   and global_docnum <= after[1])):
+            return 0
+
         # Document numbers are negated before putting them in the heap so that
         # higher document numbers have lower "priority" in the queue. Lower
         # document numbers should always come before higher document numbers
@@ -511,14 +529,29 @@ class UnlimitedCollector(ScoredCollector):
     """A collector that returns **all** scored results.
     """
 
-    def __init__(self, reverse=False):
+    def __init__(self, reverse=False, search_after=None):
+        """
+        :param reverse: if True, put the lowest scoring documents first.
+        :param search_after: an optional ``(score, docnum)`` cursor (see
+            :meth:`whoosh.searching.Results.next_cursor`). If given, only
+            documents that rank after the cursor are kept.
+        """
+
         ScoredCollector.__init__(self)
         self.reverse = reverse
+        self.search_after = search_after
 
     # ScoredCollector.collect calls this
     def _collect(self, global_docnum, score):
-        self.items.append((score, global_docnum))
         self.docset.add(global_docnum)
+        after = self.search_after
+        if after is not None:
+            # Compare using the same key the results are sorted by
+            key = (0 - score, global_docnum)
+            cursorkey = (0 - after[0], after[1])
+            if key <= cursorkey if not self.reverse else key >= cursorkey:
+                return 0 - score
+        self.items.append((score, global_docnum))
         # Negate score to act as sort key so higher scores appear first
         return 0 - score
 
@@ -536,19 +569,51 @@ class SortingCollector(Collector):
     """A collector that returns results sorted by a given
     :class:`whoosh.sorting.Facet` object. See :doc:`/facets` for more
     information.
+
+    If a ``limit`` is given, the collector only keeps the best ``limit``
+    documents as it goes, instead of remembering and sorting every match, and
+    it doesn't keep a set of every matched document (``Results.docs()`` will
+    re-run the query if you ask for it).
+
+    If NumPy is installed and all the sort keys come from numeric or bytes
+    columns, the collector only records the matching document numbers, and
+    sorts them at the end using array operations on the columns' global
+    ordinals (or, for numeric columns with many distinct values, the column
+    values themselves). If a ``limit`` is given, the recorded document numbers are cut
+    down to the top ``limit`` whenever the buffer fills up.
+
+    If the first sort facet is a :class:`whoosh.sorting.FieldFacet` on the
+    field the index was sorted by when it was written (see the ``indexsort``
+    argument to :class:`whoosh.writing.SegmentWriter`), in the same direction,
+    the collector stops reading each sorted segment once it has the top
+    ``limit`` matches from that segment.
     """
 
-    def __init__(self, sortedby, limit=10, reverse=False):
+    # The smallest number of docnums to buffer before trimming them
+    _batch_min = 65536
+
+    def __init__(self, sortedby, limit=10, reverse=False, bounded=True,
+                 search_after=None):
         """
         :param sortedby: see :doc:`/facets`.
         :param reverse: If True, reverse the overall results. Note that you
             can reverse individual facets in a multi-facet sort key as well.
+        :param bounded: if True (the default) and a ``limit`` is given, only
+            keep the best ``limit`` documents while collecting. Documents that
+            fall out of the top N are forgotten, so set this to False if the
+            collector will be wrapped by a collector that removes documents
+            (such as :class:`CollapseCollector`).
+        :param search_after: an optional ``(sortkey, docnum)`` cursor (see
+            :meth:`whoosh.searching.Results.next_cursor`). If given, only
+            documents that sort after the cursor are kept.
         """
 
         Collector.__init__(self)
         self.sortfacet = sorting.MultiFacet.from_sortedby(sortedby)
         self.limit = limit
         self.reverse = reverse
+        self.bounded = bounded
+        self.search_after = search_after
 
     def prepare(self, top_searcher, q, context):
         self.categorizer = self.sortfacet.categorizer(top_searcher)
@@ -559,39 +624,370 @@ class SortingCollector(Collector):
 
         # List of (sortkey, docnum) pairs
         self.items = []
+        self.total = 0
+
+        # If the sort keys can all be derived from column ordinals or column
+        # values, just record the docnums and sort them all at once in
+        # results()
+        self._batchkeys = self._batch_keys()
+        self._docnums = array("i") if self._batchkeys else None
+        # Global docnums removed from the batch by a wrapping collector, which
+        # are taken out of _docnums when it's trimmed or at finish()
+        self._removed = set()
+        # Whether _docnums was trimmed to the top N (so it no longer contains
+        # every matched document)
+        self._trimmed = False
+
+        # If some segments are sorted in the same order as the primary sort
+        # key, we can stop reading those segments after the first N matches
+        self._indexsort = self._matching_index_sort()
+        self._sorted = False
+        self._terminated = False
+        if self._indexsort or self.search_after is not None:
+            self._batchkeys = self._docnums = None
+
+        # When only keeping the top N, documents that sort after this
+        # (sortkey, docnum) pair can be ignored
+        self._heap = bool(self.limit and self.bounded and not self._batchkeys)
+        self._cutoff = None
+
+    def _primary_categorizer(self):
+        catter = self.categorizer
+        if isinstance(catter, sorting.MultiFacet.MultiCategorizer):
+            return catter.catters[0]
+        return catter
+
+    def _matching_index_sort(self):
+        # Returns the (fieldname, reverse) index sort that would put documents
+        # in the same order as the primary sort key, if any segment in the
+        # searcher was sorted that way, otherwise None
+        if not (self.limit and self.bounded):
+            return None
+
+        facet = self.sortfacet.facets[0]
+        if type(facet) is not sorting.FieldFacet or facet.allow_overlap:
+            return None
+        indexsort = (facet.fieldname, facet.reverse != self.reverse)
+
+        for reader, _ in self.top_searcher.reader().leaf_readers():
+            segment = reader.segment()
+            if segment is not None and segment.index_sort() == indexsort:
+                return indexsort
+        return None
+
+    def _batch_keys(self):
+        # Returns a list of (keyfn, values, count, reverse) tuples, one for
+        # each sort key, where values is a NumPy array of each document's
+        # ordinal (count is the number of ordinals) or raw column value (count
+        # is None), and keyfn turns an item of the array into the sort key.
+        # Returns None if any of the keys can't be computed from an array
+        numpy = optional_numpy()
+        if numpy is None:
+            return None
+
+        catter = self.categorizer
+        if isinstance(catter, sorting.MultiFacet.MultiCategorizer):
+            catters = catter.catters
+        else:
+            catters = [catter]
+
+        batchkeys = []
+        for c in catters:
+            ok = c.ordinal_keys()
+            if ok is not None:
+                gords, reverse = ok
+                ords = numpy.frombuffer(gords.ords, dtype=gords.ords.typecode)
+                batchkeys.append((c.ordinal_key, ords, len(gords.values),
+                                  reverse))
+                continue
+
+            ak = c.array_keys()
+            if ak is None:
+                return None
+            values, reverse = ak
+            batchkeys.append((c.array_key, values, None, reverse))
+        return batchkeys
 
     def set_subsearcher(self, subsearcher, offset):
         Collector.set_subsearcher(self, subsearcher, offset)
         self.categorizer.set_searcher(subsearcher, offset)
 
+        segment = subsearcher.reader().segment()
+        self._sorted = bool(self._indexsort and segment is not None
+                            and segment.index_sort() == self._indexsort)
+
+    def computes_count(self):
+        # If we stopped reading a sorted segment early, we don't know how many
+        # documents matched
+        return not self._terminated
+
+    def all_ids(self):
+        if self._docnums is not None and not self._trimmed:
+            return self._docnums
+        elif self._heap or self._docnums is not None:
+            # We didn't keep track of every matched document, so we need to
+            # re-run the search
+            return self.top_searcher.docs_for_query(self.q)
+        return self.docset
+
+    def count(self):
+        if self._docnums is not None:
+            return self.total - len(self._removed)
+        elif self._terminated:
+            return ilen(self.all_ids())
+        elif self._heap:
+            return self.total
+        return len(self.docset)
+
     def sort_key(self, sub_docnum):
         return self.categorizer.key_for(self.matcher, sub_docnum)
 
+    def collect_matches(self):
+        if self._docnums is not None:
+            # We don't need the sort keys until the end, just the docnums
+            offset = self.offset
+            docids = (offset + sub_docnum for sub_docnum in self.matches())
+            size = self._batch_size()
+            while True:
+                docnums = self._docnums
+                before = len(docnums)
+                docnums.extend(islice(docids, size - before))
+                self.total += len(docnums) - before
+                if len(docnums) < size:
+                    break
+                self._trim_batch()
+        elif self._sorted:
+            self._collect_sorted_matches()
+        else:
+            Collector.collect_matches(self)
+
+    def _collect_sorted_matches(self):
+        # The documents in this segment are in the order of the primary sort
+        # key, so once we have N matches, the only other documents that can
+        # make the top N are ones with the same primary key as the Nth match
+        collect = self.collect
+        catter = self._primary_categorizer()
+        limit = self.limit
+        offset = self.offset
+        matched = 0
+        lastkey = None
+        for sub_docnum in self.matches():
+            sortkey = collect(sub_docnum)
+            if not self._is_after(sortkey, offset + sub_docnum):
+                continue
+            matched += 1
+            if matched >= limit:
+                key = catter.key_for(self.matcher, sub_docnum)
+                if matched == limit:
+                    lastkey = key
+                elif key != lastkey:
+                    self._terminated = True
+                    break
+
+    def _is_after(self, sortkey, global_docnum):
+        # Returns True if the document sorts after the search_after cursor
+        after = self.search_after
+        if after is None:
+            return True
+        item = (sortkey, global_docnum)
+        return item < tuple(after) if self.reverse else item > tuple(after)
+
     def collect(self, sub_docnum):
         global_docnum = self.offset + sub_docnum
+        if self._docnums is not None:
+            # The sort keys are computed for the top N at the end
+            docnums = self._docnums
+            docnums.append(global_docnum)
+            self.total += 1
+            if len(docnums) >= self._batch_size():
+                self._trim_batch()
+            return None
+
         sortkey = self.sort_key(sub_docnum)
-        self.items.append((sortkey, global_docnum))
-        self.docset.add(global_docnum)
+        if self._heap:
+            self.total += 1
+            if not self._is_after(sortkey, global_docnum):
+                return sortkey
+            item = (sortkey, global_docnum)
+            cutoff = self._cutoff
+            if (cutoff is None
+                    or (item > cutoff if self.reverse else item < cutoff)):
+                items = self.items
+                items.append(item)
+                if len(items) >= self.limit * 2:
+                    self._trim()
+        else:
+            if self._is_after(sortkey, global_docnum):
+                self.items.append((sortkey, global_docnum))
+            self.docset.add(global_docnum)
         return sortkey
 
+    def _trim(self):
+        # Throw away everything but the top N items, and remember the worst
+        # of the remaining items so we can ignore anything that sorts after it
+        items = self.items
+        items.sort(reverse=self.reverse)
+        del items[self.limit:]
+        self._cutoff = items[-1]
+
+    def remove(self, global_docnum):
+        if self._docnums is not None:
+            self._removed.add(global_docnum)
+        elif self._heap:
+            # The document may not be in the list since we forget documents
+            # that don't make the top N
+            items = self.items
+            for i in xrange(len(items)):
+                if items[i][1] == global_docnum:
+                    items.pop(i)
+                    return
+        else:
+            Collector.remove(self, global_docnum)
+
+    def _batch_size(self):
+        # The number of docnums to buffer before trimming them to the top N
+        if self.limit and self.bounded:
+            return max(self.limit * 8, self._batch_min)
+        return sys.maxsize
+
+    def _batch_docnums(self):
+        # Returns the buffered docnums as a NumPy array, without any removed
+        # documents
+        numpy = optional_numpy()
+        docnums = numpy.frombuffer(self._docnums, dtype=self._docnums.typecode)
+        if self._removed:
+            removed = numpy.fromiter(self._removed, dtype=docnums.dtype,
+                                     count=len(self._removed))
+            docnums = docnums[numpy.isin(docnums, removed, invert=True)]
+        return docnums
+
+    def _trim_batch(self):
+        # Throw away every buffered docnum except the top N
+        docnums = self._batch_docnums()
+        top = self._batch_top(docnums)
+        self._docnums = array(self._docnums.typecode, docnums[top].tolist())
+        self._trimmed = True
+
+    def finish(self):
+        Collector.finish(self)
+        if self._docnums is not None and self._removed:
+            self._docnums = array(self._docnums.typecode,
+                                  self._batch_docnums().tolist())
+
+    def _batch_top(self, docnums):
+        # Returns the indices of the top N docnums in the given array, in
+        # sorted order
+        numpy = optional_numpy()
+        size = len(docnums)
+        limit = min(self.limit or size, size)
+        if not limit:
+            return numpy.arange(0)
+
+        # Get the ordinals of each document for each key, flipped if the key
+        # is reversed, so that lower values always sort first
+        columns = []
+        for _, values, count, reverse in self._batchkeys:
+            ords = values[docnums]
+            if count is None:
+                # Raw column values: shift them so they start at 0
+                lo, hi = int(ords.min()), int(ords.max())
+                if hi - lo < 2 ** 63:
+                    if ords.dtype == numpy.uint64:
+                        ords = ords - numpy.uint64(lo)
+                    else:
+                        ords = ords.astype(numpy.int64) - lo
+                    count = hi - lo + 1
+                else:
+                    uniques, ords = numpy.unique(ords, return_inverse=True)
+                    count = len(uniques)
+            ords = ords.astype(numpy.int64)
+            if reverse:
+                ords = (count - 1) - ords
+            columns.append((ords, count))
+
+        doccount = self.top_searcher.doc_count_all()
+        space = doccount
+        for _, count in columns:
+            space *= count
+
+        if space < 2 ** 62:
+            # The keys and the docnum fit in a single integer, so we can use
+            # argpartition to find the top N without sorting everything
+            combined = numpy.zeros(size, dtype=numpy.int64)
+            for ords, count in columns:
+                combined = combined * count + ords
+            combined = combined * doccount + docnums
+            if self.reverse:
+                combined = 0 - combined
+
+            if limit < size:
+                top = numpy.argpartition(combined, limit - 1)[:limit]
+                top = top[numpy.argsort(combined[top])]
+            else:
+                top = numpy.argsort(combined)
+        else:
+            # lexsort uses the last key as the primary key
+            keys = [docnums.astype(numpy.int64)]
+            keys.extend(ords for ords, _ in reversed(columns))
+            if self.reverse:
+                keys = [0 - k for k in keys]
+            top = numpy.lexsort(keys)[:limit]
+        return top
+
+    def _batch_items(self):
+        docnums = self._batch_docnums()
+        top = self._batch_top(docnums)
+
+        # Only compute the actual sort keys for the top N documents
+        batchkeys = self._batchkeys
+        multi = isinstance(self.categorizer,
+                           sorting.MultiFacet.MultiCategorizer)
+        items = []
+        for docnum in docnums[top].tolist():
+            keys = tuple(keyfn(values[docnum].item())
+                         for keyfn, values, _, _ in batchkeys)
+            items.append((keys if multi else keys[0], docnum))
+        return items
+
     def results(self):
+        if self._docnums is not None:
+            return self._results(self._batch_items())
+
         items = self.items
         items.sort(reverse=self.reverse)
         if self.limit:
             items = items[:self.limit]
+
+        if self._heap:
+            return self._results(items)
         return self._results(items, docset=self.docset)
 
 
 class UnsortedCollector(Collector):
+    def __init__(self, search_after=None):
+        """
+        :param search_after: an optional ``(None, docnum)`` cursor (see
+            :meth:`whoosh.searching.Results.next_cursor`). If given, only
+            documents after the cursor are kept.
+        """
+
+        Collector.__init__(self)
+        self.search_after = search_after
+
     def prepare(self, top_searcher, q, context):
         Collector.prepare(self, top_searcher, q, context.set(weighting=None))
         self.items = []
 
     def collect(self, sub_docnum):
         global_docnum = self.offset + sub_docnum
-        self.items.append((None, global_docnum))
+        after = self.search_after
+        if after is None or global_docnum > after[1]:
+            self.items.append((None, global_docnum))
         self.docset.add(global_docnum)
 
+    def sort_key(self, sub_docnum):
+        return None
+
     def results(self):
         items = self.items
         return self._results(items, docset=self.docset)
@@ -795,26 +1191,54 @@ class FacetCollector(WrappingCollector):
         # - Create a categorizer (to generate document keys)
         self.facetmaps = {}
         self.categorizers = {}
+        # Facets that are counted by column ordinal instead of by key
+        self.ordinalcounts = {}
 
         # Set needs_current to True if any of the categorizers require the
         # current document to work
         needs_current = context.needs_current
         for facetname, facet in facets.items():
-            self.facetmaps[facetname] = facet.map(self.maptype)
+            facetmap = facet.map(self.maptype)
+            facetmap.prepare(top_searcher)
+            self.facetmaps[facetname] = facetmap
 
             ctr = facet.categorizer(top_searcher)
             self.categorizers[facetname] = ctr
-            needs_current = needs_current or ctr.needs_current
+
+            counts = self._ordinal_counts(facetmap, ctr)
+            if counts is not None:
+                self.ordinalcounts[facetname] = counts
+            else:
+                needs_current = needs_current or ctr.needs_current
         context = context.set(needs_current=needs_current)
+        # Whether any facet needs the sort key of each document
+        self._keyed = len(self.ordinalcounts) < len(self.categorizers)
 
         self.child.prepare(top_searcher, q, context)
 
+    @staticmethod
+    def _ordinal_counts(facetmap, categorizer):
+        # If we only need to count the documents in each group of a
+        # column-backed facet, we don't need a key for each document, we can
+        # just count the global ordinals of the column values in an array
+        if type(facetmap) is not sorting.Count or categorizer.allow_overlap:
+            return None
+        if not isinstance(categorizer, sorting.ColumnCategorizer):
+            return None
+
+        gords = categorizer.ordinals()
+        if gords is None:
+            return None
+        return sorting.OrdinalCounts(gords)
+
     def set_subsearcher(self, subsearcher, offset):
         WrappingCollector.set_subsearcher(self, subsearcher, offset)
 
         # Tell each categorizer about the new subsearcher and offset
-        for categorizer in itervalues(self.categorizers):
-            categorizer.set_searcher(self.child.subsearcher, self.child.offset)
+        for name, categorizer in iteritems(self.categorizers):
+            if name not in self.ordinalcounts:
+                categorizer.set_searcher(self.child.subsearcher,
+                                         self.child.offset)
 
     def collect(self, sub_docnum):
         matcher = self.child.matcher
@@ -823,9 +1247,18 @@ class FacetCollector(WrappingCollector):
         # We want the sort key for the document so we can (by default) sort
         # the facet groups
         sortkey = self.child.collect(sub_docnum)
+        if sortkey is None and self._keyed:
+            # The child may not work out sort keys until the end
+            sortkey = self.child.sort_key(sub_docnum)
+
+        ordinalcounts = self.ordinalcounts
+        for counts in itervalues(ordinalcounts):
+            counts.add(global_docnum)
 
         # For each facet we're grouping by
         for name, categorizer in iteritems(self.categorizers):
+            if name in ordinalcounts:
+                continue
             add = self.facetmaps[name].add
 
             # We have to do more work if the facet allows overlapping groups
@@ -839,6 +1272,17 @@ class FacetCollector(WrappingCollector):
 
         return sortkey
 
+    def finish(self):
+        WrappingCollector.finish(self)
+
+        # Translate the ordinal counts into groups
+        for name, counts in iteritems(self.ordinalcounts):
+            categorizer = self.categorizers[name]
+            facetmap = self.facetmaps[name]
+            for ordinal, count in counts.items():
+                facetmap.add_count(categorizer.ordinal_name(ordinal), count)
+        self.ordinalcounts = {}
+
     def results(self):
         r = self.child.results()
         r._facetmaps = self.facetmaps
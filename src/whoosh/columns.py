@@ -47,23 +47,28 @@ and ``reader()`` to return a ``ColumnReader`` object.
 """
 
 from __future__ import division, with_statement
-import struct, warnings
+import struct, threading, warnings
 from array import array
 from bisect import bisect_right
+from collections import defaultdict, OrderedDict
 
 try:
     import zlib
 except ImportError:
     zlib = None
 
-from whoosh.compat import b, bytes_type, BytesIO
-from whoosh.compat import array_tobytes, xrange
+from datetime import datetime
+
+from whoosh.compat import b, bytes_type, text_type, integer_types, BytesIO
+from whoosh.compat import array_tobytes, iteritems, izip, xrange
 from whoosh.compat import dumps, loads
-from whoosh.filedb.structfile import StructFile
+from whoosh.filedb.structfile import BufferReader, StructFile
 from whoosh.idsets import BitSet, OnDiskBitSet
 from whoosh.system import emptybytes
+from whoosh.util.loading import optional_numpy
 from whoosh.util.numeric import typecode_max, typecode_min
 from whoosh.util.numlists import GrowableArray
+from whoosh.util.times import datetime_to_long, long_to_datetime
 from whoosh.util.varints import varint, read_varint
 
 
@@ -131,6 +136,22 @@ class ColumnWriter(object):
     def add(self, docnum, value):
         raise NotImplementedError
 
+    def track_zones(self, zonesize):
+        """Asks the writer to keep a :class:`ZoneMap` of the minimum and
+        maximum values in each run of ``zonesize`` documents. Writers of
+        column types that can't be summarized this way ignore this.
+        """
+
+        pass
+
+    def zone_map(self):
+        """Returns the :class:`ZoneMap` of the values written to this column,
+        or None if the writer isn't keeping one. This should be called after
+        ``finish()``.
+        """
+
+        return None
+
     def finish(self, docnum):
         pass
 
@@ -151,6 +172,24 @@ class ColumnReader(object):
     def sort_key(self, docnum):
         return self[docnum]
 
+    def values(self, docnums):
+        """Returns a list of the values of the given documents, in the same
+        order as ``docnums``. Column types that store values in blocks
+        override this to read each block only once.
+        """
+
+        return [self[docnum] for docnum in docnums]
+
+    def as_array(self):
+        """Returns the values of all the documents in the column, indexed by
+        document number. Readers of fixed-width columns return a read-only
+        NumPy array that points straight at the column data where possible,
+        for vectorized computations over the whole column. The default
+        implementation returns a list.
+        """
+
+        return list(self)
+
     def __iter__(self):
         for i in xrange(self._doccount):
             yield self[i]
@@ -378,6 +417,32 @@ class FixedBytesColumn(Column):
             pos = self._basepos + self._fixedlen * docnum
             return self._dbfile.get(pos, self._fixedlen)
 
+        def _view(self, np, dtype):
+            # Returns a NumPy array of the given type over the column data,
+            # padded with the default for documents after the last stored
+            # value
+            count = min(self._count, self._doccount)
+            size = count * self._fixedlen
+            arr = np.frombuffer(self._dbfile.get_view(self._basepos, size),
+                                dtype=dtype)
+            if count < self._doccount:
+                default = np.frombuffer(self._defaultbytes, dtype=dtype)
+                arr = np.concatenate([arr] + [default] *
+                                     (self._doccount - count))
+            return arr
+
+        def as_array(self):
+            """Returns a read-only two-dimensional NumPy array of bytes (with
+            one row of ``fixedlen`` bytes per document) pointing at the
+            column data, or a list of byte strings if NumPy isn't available.
+            """
+
+            np = optional_numpy()
+            if np is None:
+                return list(self)
+            return self._view(np, np.uint8).reshape(self._doccount,
+                                                     self._fixedlen)
+
         def __iter__(self):
             count = self._count
             default = self._default
@@ -532,23 +597,26 @@ class RefBytesColumn(Column):
             self._unpack = st.unpack
             self._itemsize = st.size
 
-            dbfile.seek(basepos + doccount * self._itemsize)
-            self._uniques = self._read_uniques()
+            # Read the list of unique values (between the refs and the
+            # typecode byte at the end) in one positional read
+            upos = basepos + doccount * self._itemsize
+            ubytes = dbfile.get_view(upos, basepos + length - 1 - upos)
+            ufile = StructFile(BufferReader(ubytes))
+            self._uniques = self._read_uniques(ufile)
 
         def __repr__(self):
             return "<RefBytes.Reader>"
 
-        def _read_uniques(self):
-            dbfile = self._dbfile
+        def _read_uniques(self, f):
             fixedlen = self._fixedlen
 
-            ucount = dbfile.read_varint()
+            ucount = f.read_varint()
             length = fixedlen
             uniques = []
             for _ in xrange(ucount):
                 if not fixedlen:
-                    length = dbfile.read_varint()
-                uniques.append(dbfile.read(length))
+                    length = f.read_varint()
+                uniques.append(f.read(length))
             return uniques
 
         def __getitem__(self, docnum):
@@ -568,9 +636,30 @@ class RefBytesColumn(Column):
                 ref = unpack(get(pos, itemsize))[0]
                 yield uniques[ref]
 
+        def uniques(self):
+            """Returns the list of unique values in this column. The numbers
+            returned by :meth:`refs` are indexes into this list.
+            """
+
+            return self._uniques
+
+        def refs(self):
+            """Returns an array containing the reference number of each
+            document's value.
+            """
+
+            return self._dbfile.get_array(self._basepos, self._typecode,
+                                          self._doccount)
+
 
 # Numeric column
 
+# Maps struct typecodes to NumPy kinds
+_numpy_kinds = {"b": "i", "h": "i", "i": "i", "l": "i", "q": "i",
+                "B": "u", "H": "u", "I": "u", "L": "u", "Q": "u",
+                "f": "f", "d": "f"}
+
+
 class NumericColumn(FixedBytesColumn):
     """Stores numbers (integers and floats) as compact binary.
     """
@@ -611,10 +700,24 @@ class NumericColumn(FixedBytesColumn):
             self._fixedlen = struct.calcsize(typecode)
             self._count = 0
 
+            self._typecode = typecode
+            self._zones = None
+
         def __repr__(self):
             return "<Numeric.Writer>"
 
+        def track_zones(self, zonesize):
+            self._zones = ZoneMap(self._typecode, zonesize)
+
+        def zone_map(self):
+            return self._zones
+
         def add(self, docnum, v):
+            zones = self._zones
+            if zones is not None:
+                # Documents without values have the default value
+                zones.fill(docnum, self._default)
+                zones.add(docnum, v)
             if v == self._default:
                 return
             if docnum > self._count:
@@ -622,6 +725,12 @@ class NumericColumn(FixedBytesColumn):
             self._dbfile.write(self._pack(v))
             self._count = docnum + 1
 
+        def finish(self, doccount):
+            zones = self._zones
+            if zones is not None:
+                # Documents without values have the default value
+                zones.fill(doccount, self._default)
+
     class Reader(FixedBytesColumn.Reader):
         def __init__(self, dbfile, basepos, length, doccount, typecode,
                      default):
@@ -636,10 +745,43 @@ class NumericColumn(FixedBytesColumn):
             self._defaultbytes = struct.pack("!" + typecode, default)
             self._fixedlen = struct.calcsize(typecode)
             self._count = length // self._fixedlen
+            self._array = None
 
         def __repr__(self):
             return "<Numeric.Reader>"
 
+        def as_array(self):
+            """Returns the numbers in the column as a read-only NumPy array,
+            which uses the column data in place when the whole column is
+            stored (and the file is memory mapped). If NumPy isn't available,
+            returns an ``array.array``.
+            """
+
+            if self._array is None:
+                typecode = self._typecode
+                np = optional_numpy()
+                if np is not None:
+                    dtype = np.dtype(">%s%d" % (_numpy_kinds[typecode],
+                                                 self._fixedlen))
+                    self._array = self._view(np, dtype)
+                else:
+                    count = min(self._count, self._doccount)
+                    if array(typecode).itemsize == self._fixedlen:
+                        arr = self._dbfile.get_array(self._basepos, typecode,
+                                                     count)
+                    else:
+                        arr = array(typecode, (self[i] for i in xrange(count)))
+                    arr.extend([self._default] * (self._doccount - count))
+                    self._array = arr
+            return self._array
+
+        def values(self, docnums):
+            np = optional_numpy()
+            if np is None:
+                return FixedBytesColumn.Reader.values(self, docnums)
+            docnums = np.asarray(docnums, dtype=np.intp)
+            return self.as_array()[docnums].tolist()
+
         def __getitem__(self, docnum):
             s = FixedBytesColumn.Reader.__getitem__(self, docnum)
             return self._unpack(s)[0]
@@ -660,6 +802,146 @@ class NumericColumn(FixedBytesColumn):
             self._reverse = True
 
 
+# Zone maps
+
+class ZoneMap(object):
+    """Records the minimum and maximum value in each zone (run of ``zonesize``
+    consecutive documents) of a numeric column, so a search for a range of
+    values can skip the zones (and the segments) that can't contain any
+    matching documents.
+
+    The minimums and maximums are of the values as stored in the column, so
+    for fields such as :class:`whoosh.fields.NUMERIC` you need to convert the
+    range with the field's ``to_column_value()`` method.
+    """
+
+    def __init__(self, typecode, zonesize, mins=None, maxes=None):
+        """
+        :param typecode: the typecode of the numbers in the column.
+        :param zonesize: the number of documents in each zone.
+        :param mins: an array of the minimum value in each zone.
+        :param maxes: an array of the maximum value in each zone.
+        """
+
+        self._typecode = typecode
+        self.zonesize = zonesize
+        self.mins = array(typecode) if mins is None else mins
+        self.maxes = array(typecode) if maxes is None else maxes
+        # The document number after the last document added
+        self._count = len(self.mins) * zonesize
+
+    def __repr__(self):
+        return "<%s %d zones of %d>" % (type(self).__name__, len(self.mins),
+                                        self.zonesize)
+
+    def __len__(self):
+        return len(self.mins)
+
+    def add(self, docnum, v):
+        """Records the value of a document. Documents must be added in
+        order.
+        """
+
+        self._count = docnum + 1
+
+        if v != v:
+            # Don't record NaN, which isn't in any range
+            return
+        zone = docnum // self.zonesize
+        mins = self.mins
+        if zone >= len(mins):
+            self._extend(zone + 1)
+        if v < mins[zone]:
+            mins[zone] = v
+        if v > self.maxes[zone]:
+            self.maxes[zone] = v
+
+    def fill(self, docnum, v):
+        """Records that the documents from the last document added up to (but
+        not including) the given document number have the value ``v``.
+        """
+
+        start = self._count
+        if docnum <= start:
+            return
+        self._count = docnum
+        if v != v:
+            return
+
+        zonesize = self.zonesize
+        self._extend((docnum - 1) // zonesize + 1)
+        mins = self.mins
+        maxes = self.maxes
+        for zone in xrange(start // zonesize, (docnum - 1) // zonesize + 1):
+            if v < mins[zone]:
+                mins[zone] = v
+            if v > maxes[zone]:
+                maxes[zone] = v
+
+    def _extend(self, count):
+        # New zones start "empty", with a minimum above the maximum
+        extra = count - len(self.mins)
+        if extra > 0:
+            typecode = self._typecode
+            if typecode in "fd":
+                low, high = float("-inf"), float("inf")
+            else:
+                low, high = typecode_min[typecode], typecode_max[typecode]
+            self.mins.extend([high] * extra)
+            self.maxes.extend([low] * extra)
+
+    def min_max(self):
+        """Returns a tuple of the minimum and maximum values in the column, or
+        None if the column doesn't have any (non-NaN) values.
+        """
+
+        pairs = [(lo, hi) for lo, hi in izip(self.mins, self.maxes)
+                 if lo <= hi]
+        if not pairs:
+            return None
+        return min(lo for lo, _ in pairs), max(hi for _, hi in pairs)
+
+    def doc_ranges(self, start=None, end=None):
+        """Returns a list of ``(startdoc, enddoc)`` tuples covering the zones
+        that may contain values from ``start`` to ``end`` (inclusive).
+        Neighboring zones are merged into a single tuple. Pass None for
+        ``start`` or ``end`` to leave that end of the range open.
+        """
+
+        zonesize = self.zonesize
+        ranges = []
+        for zone, (lo, hi) in enumerate(izip(self.mins, self.maxes)):
+            if lo > hi:
+                continue
+            if (start is not None and hi < start) or (end is not None
+                                                      and lo > end):
+                continue
+            startdoc = zone * zonesize
+            if ranges and ranges[-1][1] == startdoc:
+                ranges[-1] = (ranges[-1][0], startdoc + zonesize)
+            else:
+                ranges.append((startdoc, startdoc + zonesize))
+        return ranges
+
+    def to_file(self, dbfile):
+        dbfile.write(self._typecode.encode("ascii"))
+        dbfile.write_uint(self.zonesize)
+        dbfile.write_uint(len(self.mins))
+        dbfile.write_array(self.mins)
+        dbfile.write_array(self.maxes)
+
+    @classmethod
+    def from_file(cls, dbfile, basepos):
+        typecode = bytes(dbfile.get(basepos, 1)).decode("ascii")
+        zonesize = dbfile.get_uint(basepos + 1)
+        count = dbfile.get_uint(basepos + 5)
+        pos = basepos + 9
+        mins = dbfile.get_array(pos, typecode, count)
+        maxes = dbfile.get_array(pos + len(mins) * mins.itemsize, typecode,
+                                 count)
+        return cls(typecode, zonesize, mins, maxes)
+
+
 # Column of boolean values
 
 class BitColumn(Column):
@@ -719,10 +1001,9 @@ class BitColumn(Column):
 
             compressed = dbfile.get_byte(basepos + (length - 1))
             if compressed:
-                bbytes = zlib.decompress(dbfile.get(basepos, length - 1))
+                bbytes = zlib.decompress(dbfile.get_view(basepos, length - 1))
                 bitset = BitSet.from_bytes(bbytes)
             else:
-                dbfile.seek(basepos)
                 bitset = OnDiskBitSet(dbfile, basepos, length - 1)
             self._bitset = bitset
 
@@ -821,13 +1102,27 @@ class CompressedBytesColumn(Column):
             return list(self)
 
 
+# Directory offset, number of blocks
+_block_trailer = struct.Struct("<qI")
+
+
 class CompressedBlockColumn(Column):
     """An experimental column type that compresses and decompresses blocks of
     values at a time. This can lead to high compression and decent performance
-    for columns with lots of very short values, but random access times are
-    usually terrible.
+    for columns with lots of very short values.
+
+    The column ends with a directory of the first document number and position
+    of each block, which the reader loads the first time it needs it and
+    searches with a binary search. The reader keeps the most recently
+    decompressed block in memory, so reading neighboring documents only
+    decompresses the block once.
     """
 
+    # Columns pickled before the block directory was added don't have this
+    # attribute, so the class default makes their readers walk the block
+    # headers instead
+    _directory = False
+
     def __init__(self, level=3, blocksize=32, module="zlib"):
         """
         :param level: the compression level to use.
@@ -840,20 +1135,27 @@ class CompressedBlockColumn(Column):
         self._level = level
         self._blocksize = blocksize
         self._module = module
+        self._directory = True
 
     def writer(self, dbfile):
-        return self.Writer(dbfile, self._level, self._blocksize, self._module)
+        return self.Writer(dbfile, self._level, self._blocksize, self._module,
+                           self._directory)
 
     def reader(self, dbfile, basepos, length, doccount):
-        return self.Reader(dbfile, basepos, length, doccount, self._module)
+        return self.Reader(dbfile, basepos, length, doccount, self._module,
+                           self._directory)
 
     class Writer(ColumnWriter):
-        def __init__(self, dbfile, level, blocksize, module):
+        def __init__(self, dbfile, level, blocksize, module, directory=True):
             self._dbfile = dbfile
+            self._basepos = dbfile.tell()
             self._blocksize = blocksize * 1024
             self._level = level
             self._compress = __import__(module).compress
+            self._directory = directory
 
+            self._startdocs = array("I")
+            self._offsets = array("q")
             self._reset()
 
         def __repr__(self):
@@ -869,6 +1171,8 @@ class CompressedBlockColumn(Column):
             block = self._compress(self._block, self._level)
             header = (self._startdoc, self._lastdoc, len(block),
                       tuple(self._lengths))
+            self._startdocs.append(self._startdoc)
+            self._offsets.append(dbfile.tell() - self._basepos)
             dbfile.write_pickle(header)
             dbfile.write(block)
 
@@ -888,73 +1192,449 @@ class CompressedBlockColumn(Column):
             if self._startdoc is not None:
                 self._emit()
 
+            if self._directory:
+                dbfile = self._dbfile
+                dirpos = dbfile.tell() - self._basepos
+                dbfile.write_array(self._startdocs)
+                dbfile.write_array(self._offsets)
+                dbfile.write(_block_trailer.pack(dirpos,
+                                                 len(self._startdocs)))
+
     class Reader(ColumnReader):
-        def __init__(self, dbfile, basepos, length, doccount, module):
+        def __init__(self, dbfile, basepos, length, doccount, module,
+                     directory=True):
             ColumnReader.__init__(self, dbfile, basepos, length, doccount)
             self._decompress = __import__(module).decompress
+            self._directory = directory
 
-            self._blocks = []
-            dbfile.seek(basepos)
-            pos = 0
-            while pos < length:
-                startdoc, enddoc, blocklen, lengths = dbfile.read_pickle()
-                here = dbfile.tell()
-                self._blocks.append((startdoc, enddoc, here, blocklen,
-                                     lengths))
-                dbfile.seek(blocklen, 1)
-                pos = here + blocklen
+            # The block directory is loaded the first time it's needed
+            self._startdocs = None
+            self._offsets = None
+            # A tuple of (block number, dictionary of values) for the most
+            # recently decompressed block
+            self._last = (None, None)
 
         def __repr__(self):
             return "<CompressedBlock.Reader>"
 
+        def _load_directory(self):
+            dbfile = self._dbfile
+            basepos = self._basepos
+            if self._directory:
+                tsize = _block_trailer.size
+                trailer = dbfile.get(basepos + self._length - tsize, tsize)
+                dirpos, count = _block_trailer.unpack(trailer)
+                pos = basepos + dirpos
+                startdocs = dbfile.get_array(pos, "I", count)
+                pos += count * startdocs.itemsize
+                offsets = dbfile.get_array(pos, "q", count)
+            else:
+                # Walk the block headers (block positions are relative to the
+                # start of the column)
+                startdocs = array("I")
+                offsets = array("q")
+                pos = 0
+                while pos < self._length:
+                    header, here = dbfile.get_pickle(basepos + pos)
+                    startdocs.append(header[0])
+                    offsets.append(pos)
+                    pos = here - basepos + header[2]
+            self._offsets = offsets
+            self._startdocs = startdocs
+
+        def _block_count(self):
+            if self._startdocs is None:
+                self._load_directory()
+            return len(self._startdocs)
+
         def _find_block(self, docnum):
-            # TODO: use binary search instead of linear
-            for i, b in enumerate(self._blocks):
-                if docnum < b[0]:
-                    return None
-                elif docnum <= b[1]:
-                    return i
-            return None
+            if self._startdocs is None:
+                self._load_directory()
+            blocknum = bisect_right(self._startdocs, docnum) - 1
+            if blocknum < 0:
+                return None
+            return blocknum
 
         def _get_block(self, blocknum):
-            block = self._blocks[blocknum]
-            pos = block[2]
-            blocklen = block[3]
-            lengths = block[4]
+            lastnum, values = self._last
+            if lastnum == blocknum:
+                return values
 
-            data = self._decompress(self._dbfile.get(self._basepos + pos,
-                                                     blocklen))
+            dbfile = self._dbfile
+            header, pos = dbfile.get_pickle(self._basepos +
+                                            self._offsets[blocknum])
+            _, _, blocklen, lengths = header
+            data = self._decompress(dbfile.get_view(pos, blocklen))
             values = {}
             base = 0
             for docnum, vlen in lengths:
                 values[docnum] = data[base:base + vlen]
                 base += vlen
+
+            self._last = (blocknum, values)
             return values
 
         def __getitem__(self, docnum):
             i = self._find_block(docnum)
             if i is None:
                 return emptybytes
-            return self._get_block(i)[docnum]
+            return self._get_block(i).get(docnum, emptybytes)
 
         def __iter__(self):
-            last = -1
-            for i, block in enumerate(self._blocks):
-                startdoc = block[0]
-                enddoc = block[1]
-                if startdoc > (last + 1):
-                    for _ in xrange(startdoc - last):
-                        yield emptybytes
+            docnum = 0
+            count = self._block_count()
+            for i in xrange(count):
                 values = self._get_block(i)
-                for docnum in xrange(startdoc, enddoc + 1):
-                    if docnum in values:
-                        yield values[docnum]
-                    else:
-                        yield emptybytes
-                last = enddoc
-            if enddoc < self._doccount - 1:
-                for _ in xrange(self._doccount - enddoc):
+                if i + 1 < count:
+                    enddoc = self._startdocs[i + 1]
+                else:
+                    enddoc = self._doccount
+                while docnum < enddoc:
+                    yield values.get(docnum, emptybytes)
+                    docnum += 1
+            while docnum < self._doccount:
+                yield emptybytes
+                docnum += 1
+
+
+# Packed block column
+
+# Dictionary offset, dictionary length, number of blocks
+_packed_trailer = struct.Struct("<qII")
+
+# Preset dictionaries need Python 3.3+
+try:
+    _zdict_supported = zlib is not None and bool(zlib.compressobj(zdict=b"x"))
+except TypeError:
+    _zdict_supported = False
+
+
+def _train_zdict(samples, size, gramsize=8):
+    """Builds a preset compression dictionary (at most ``size`` bytes long)
+    from a list of sample byte strings, by collecting the runs of bytes that
+    are repeated across many of the samples.
+    """
+
+    if len(samples) < 2:
+        return None
+
+    # Count the number of samples each n-gram appears in
+    counts = defaultdict(int)
+    for v in samples:
+        for gram in set(v[i:i + gramsize]
+                        for i in xrange(len(v) - gramsize + 1)):
+            counts[gram] += 1
+    threshold = max(2, len(samples) // 8)
+
+    # Find the runs of bytes covered by common n-grams
+    runs = {}
+    for v in samples:
+        start = end = None
+        for i in xrange(len(v) - gramsize + 1):
+            if counts[v[i:i + gramsize]] >= threshold:
+                if start is None or i > end:
+                    if start is not None:
+                        runs[v[start:end]] = 0
+                    start = i
+                end = i + gramsize
+        if start is not None:
+            runs[v[start:end]] = 0
+    if not runs:
+        return None
+
+    # Score each run by how often it appears, and put the most common runs at
+    # the end of the dictionary, since zlib can refer to them most cheaply
+    for run in runs:
+        runs[run] = counts[run[:gramsize]] * len(run)
+    ordered = sorted(runs, key=lambda run: runs[run])
+    zdict = emptybytes.join(ordered)
+    return zdict[-size:]
+
+
+class PackedBlockColumn(Column):
+    """Stores variable-length byte strings by compressing small runs of
+    consecutive documents together, so short values that compress badly on
+    their own (such as pickled stored fields) can share repeated bytes with
+    their neighbors.
+
+    By default the column also trains a preset dictionary (zlib's ``zdict``)
+    from the first values written to it and uses it to compress every block,
+    which helps a lot when the values share structure, for example dictionary
+    keys. The column stores an index of the first document number in each
+    block so a value can be found with a binary search, and the reader keeps
+    the most recently decompressed blocks in a small cache, so reading
+    neighboring documents (for example, iterating through a page of search
+    results) only decompresses each block once.
+
+    The default value is an empty bytestring (``b''``).
+    """
+
+    _default = emptybytes
+
+    def __init__(self, level=6, blockdocs=16, blocksize=32, dictsize=8,
+                 cachesize=16):
+        """
+        :param level: the zlib compression level to use.
+        :param blockdocs: the maximum number of documents in a block.
+        :param blocksize: the maximum size (in KB) of a block before it's
+            compressed. A block is written when it reaches either limit.
+        :param dictsize: the maximum size (in KB) of the preset dictionary.
+            Use 0 to not use a preset dictionary.
+        :param cachesize: the number of decompressed blocks each reader keeps
+            in memory.
+        """
+
+        self._level = level
+        self._blockdocs = blockdocs
+        self._blocksize = blocksize
+        self._dictsize = dictsize
+        self._cachesize = cachesize
+
+    def writer(self, dbfile):
+        return self.Writer(dbfile, self._level, self._blockdocs,
+                           self._blocksize, self._dictsize)
+
+    def reader(self, dbfile, basepos, length, doccount):
+        return self.Reader(dbfile, basepos, length, doccount, self._cachesize)
+
+    class Writer(ColumnWriter):
+        def __init__(self, dbfile, level, blockdocs, blocksize, dictsize):
+            self._dbfile = dbfile
+            self._basepos = dbfile.tell()
+            self._level = level
+            self._blockdocs = blockdocs
+            self._blocksize = blocksize * 1024
+            self._dictsize = dictsize * 1024 if _zdict_supported else 0
+            self._zdict = None
+
+            # While the dictionary is being trained, values are kept in
+            # memory instead of being written to blocks
+            self._training = bool(self._dictsize)
+            self._samples = []
+            self._samplesize = 0
+
+            self._startdocs = array("I")
+            self._offsets = array("q")
+            self._startdoc = None
+            self._values = []
+            self._size = 0
+
+        def __repr__(self):
+            return "<PackedBlock.Writer>"
+
+        def add(self, docnum, v):
+            if self._training:
+                self._samples.append((docnum, v))
+                self._samplesize += len(v)
+                if self._samplesize >= self._dictsize * 4:
+                    self._train()
+                return
+            self._add(docnum, v)
+
+        def _add(self, docnum, v):
+            if (self._startdoc is not None
+                    and docnum - self._startdoc >= self._blockdocs):
+                # The document doesn't fit in the current block, so start a
+                # new block instead of filling the gap with empty values
+                self._emit()
+
+            values = self._values
+            if self._startdoc is None:
+                self._startdoc = docnum
+            else:
+                # Fill in documents without values
+                gap = docnum - self._startdoc - len(values)
+                if gap:
+                    values.extend(emptybytes for _ in xrange(gap))
+            values.append(v)
+            self._size += len(v)
+
+            if len(values) >= self._blockdocs or self._size >= self._blocksize:
+                self._emit()
+
+        def _train(self):
+            samples = self._samples
+            self._zdict = _train_zdict([v for _, v in samples], self._dictsize)
+            self._training = False
+            self._samples = None
+            for docnum, v in samples:
+                self._add(docnum, v)
+
+        def _emit(self):
+            values = self._values
+            count = len(values)
+            header = struct.pack("<H%dI" % count, count,
+                                 *[len(v) for v in values])
+            data = emptybytes.join([header] + values)
+            if self._zdict:
+                comp = zlib.compressobj(self._level, zlib.DEFLATED,
+                                        zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL,
+                                        zlib.Z_DEFAULT_STRATEGY, self._zdict)
+                data = comp.compress(data) + comp.flush()
+            else:
+                data = zlib.compress(data, self._level)
+
+            dbfile = self._dbfile
+            self._startdocs.append(self._startdoc)
+            self._offsets.append(dbfile.tell() - self._basepos)
+            dbfile.write(data)
+
+            self._startdoc = None
+            self._values = []
+            self._size = 0
+
+        def finish(self, doccount):
+            if self._training:
+                self._train()
+            if self._values:
+                self._emit()
+
+            dbfile = self._dbfile
+            zdict = self._zdict or emptybytes
+            # The end of the last block
+            self._offsets.append(dbfile.tell() - self._basepos)
+            dictpos = dbfile.tell() - self._basepos
+            dbfile.write(zdict)
+            dbfile.write_array(self._startdocs)
+            dbfile.write_array(self._offsets)
+            dbfile.write(_packed_trailer.pack(dictpos, len(zdict),
+                                              len(self._startdocs)))
+
+    class Reader(ColumnReader):
+        def __init__(self, dbfile, basepos, length, doccount, cachesize):
+            ColumnReader.__init__(self, dbfile, basepos, length, doccount)
+            self._cachesize = cachesize
+            self._cache = OrderedDict()
+            self._lock = threading.Lock()
+
+            tsize = _packed_trailer.size
+            trailer = dbfile.get(basepos + length - tsize, tsize)
+            dictpos, dictlen, count = _packed_trailer.unpack(trailer)
+            self._zdict = None
+            if dictlen:
+                self._zdict = bytes(dbfile.get(basepos + dictpos, dictlen))
+            pos = basepos + dictpos + dictlen
+            self._startdocs = dbfile.get_array(pos, "I", count)
+            pos += count * self._startdocs.itemsize
+            self._offsets = dbfile.get_array(pos, "q", count + 1)
+
+        def __repr__(self):
+            return "<PackedBlock.Reader>"
+
+        def _decode(self, blocknum, data=None):
+            # Returns a tuple of (first docnum, list of value end offsets,
+            # decompressed data). If the compressed data isn't passed in, it's
+            # read from the file
+            if data is None:
+                start = self._offsets[blocknum]
+                end = self._offsets[blocknum + 1]
+                data = self._dbfile.get_view(self._basepos + start,
+                                             end - start)
+            if self._zdict:
+                decomp = zlib.decompressobj(zdict=self._zdict)
+                data = decomp.decompress(data) + decomp.flush()
+            else:
+                data = zlib.decompress(data)
+
+            count = struct.unpack_from("<H", data)[0]
+            ends = []
+            pos = 2 + count * 4
+            for vlen in struct.unpack_from("<%dI" % count, data, 2):
+                pos += vlen
+                ends.append(pos)
+            return self._startdocs[blocknum], ends, data
+
+        def _cached(self, blocknum):
+            cache = self._cache
+            with self._lock:
+                block = cache.get(blocknum)
+                if block is not None:
+                    # Move the block to the end of the LRU order
+                    del cache[blocknum]
+                    cache[blocknum] = block
+                return block
+
+        def _remember(self, blocknum, block):
+            cache = self._cache
+            with self._lock:
+                cache[blocknum] = block
+                while len(cache) > self._cachesize:
+                    cache.popitem(last=False)
+
+        def _block(self, blocknum):
+            block = self._cached(blocknum)
+            if block is None:
+                block = self._decode(blocknum)
+                self._remember(blocknum, block)
+            return block
+
+        def _value(self, block, docnum):
+            startdoc, ends, data = block
+            i = docnum - startdoc
+            if i >= len(ends):
+                return emptybytes
+            start = ends[i - 1] if i else 2 + len(ends) * 4
+            return data[start:ends[i]]
+
+        def __getitem__(self, docnum):
+            blocknum = bisect_right(self._startdocs, docnum) - 1
+            if blocknum < 0:
+                return emptybytes
+            return self._value(self._block(blocknum), docnum)
+
+        def values(self, docnums):
+            startdocs = self._startdocs
+            blocknums = [bisect_right(startdocs, docnum) - 1
+                         for docnum in docnums]
+
+            # Find the blocks that aren't in the cache and group them into
+            # runs of neighboring blocks, so each run is read from the file
+            # with a single call
+            blocks = {}
+            runs = []
+            for blocknum in sorted(set(blocknums)):
+                if blocknum < 0:
+                    continue
+                block = self._cached(blocknum)
+                if block is not None:
+                    blocks[blocknum] = block
+                elif runs and runs[-1][-1] == blocknum - 1:
+                    runs[-1].append(blocknum)
+                else:
+                    runs.append([blocknum])
+
+            offsets = self._offsets
+            for run in runs:
+                runstart = offsets[run[0]]
+                view = self._dbfile.get_view(self._basepos + runstart,
+                                             offsets[run[-1] + 1] - runstart)
+                for blocknum in run:
+                    start = offsets[blocknum] - runstart
+                    end = offsets[blocknum + 1] - runstart
+                    block = self._decode(blocknum, view[start:end])
+                    self._remember(blocknum, block)
+                    blocks[blocknum] = block
+
+            return [self._value(blocks[blocknum], docnum) if blocknum >= 0
+                    else emptybytes
+                    for docnum, blocknum in izip(docnums, blocknums)]
+
+        def __iter__(self):
+            # Decode the blocks directly instead of going through the cache,
+            # so a full scan doesn't push out the cached blocks
+            docnum = 0
+            for blocknum in xrange(len(self._startdocs)):
+                block = self._decode(blocknum)
+                startdoc, ends, _ = block
+                while docnum < startdoc:
                     yield emptybytes
+                    docnum += 1
+                for docnum in xrange(startdoc, startdoc + len(ends)):
+                    yield self._value(block, docnum)
+                docnum += 1
+            while docnum < self._doccount:
+                yield emptybytes
+                docnum += 1
 
 
 class StructColumn(FixedBytesColumn):
@@ -1031,6 +1711,90 @@ class EmptyColumnReader(ColumnReader):
         return self
 
 
+class GlobalOrdinals(object):
+    """Maps each unique value of a bytes column (such as
+    :class:`VarBytesColumn` or :class:`RefBytesColumn`) across all the
+    segments of an index to an "ordinal", the position of the value in the
+    sorted list of unique values.
+
+    Because ordinals sort in the same order as the values they represent,
+    sorting and grouping can compare small integers instead of byte strings,
+    and only translate the ordinals back into values for the documents or
+    groups that are actually returned.
+
+    You should usually get an instance of this object from
+    :meth:`whoosh.reading.IndexReader.column_ordinals`, which caches it on the
+    reader.
+    """
+
+    def __init__(self, values, ords):
+        """
+        :param values: the sorted list of unique values.
+        :param ords: an array containing the ordinal of each document's value,
+            indexed by document number.
+        """
+
+        self.values = values
+        self.ords = ords
+
+    def __repr__(self):
+        return "<%s %d values>" % (self.__class__.__name__, len(self.values))
+
+    def __len__(self):
+        return len(self.ords)
+
+    @classmethod
+    def from_readers(cls, creaders):
+        """Builds the ordinal mapping from a list of untranslated column
+        readers, one for each segment, in document number order.
+        """
+
+        # Find the unique values in each segment. For RefBytes columns we can
+        # just use the column's unique list instead of reading every value
+        segvalues = []
+        seen = set()
+        for cr in creaders:
+            if isinstance(cr, RefBytesColumn.Reader):
+                vs = cr.uniques()
+            else:
+                vs = list(cr)
+            segvalues.append(vs)
+            seen.update(vs)
+
+        values = sorted(seen)
+        ordmap = dict((v, i) for i, v in enumerate(values))
+
+        # Use the smallest array type that can hold the largest ordinal
+        maxord = len(values) - 1
+        for typecode in "BHi":
+            if maxord <= typecode_max[typecode]:
+                break
+        ords = array(typecode)
+
+        for cr, vs in izip(creaders, segvalues):
+            if isinstance(cr, RefBytesColumn.Reader):
+                # Translate the segment's reference numbers into global
+                # ordinals
+                refmap = [ordmap[v] for v in vs]
+                ords.extend(refmap[ref] for ref in cr.refs())
+            else:
+                ords.extend(ordmap[v] for v in vs)
+
+        return cls(values, ords)
+
+    def ordinal(self, docnum):
+        """Returns the ordinal of the given document's value.
+        """
+
+        return self.ords[docnum]
+
+    def value(self, ordinal):
+        """Returns the column value corresponding to the given ordinal.
+        """
+
+        return self.values[ordinal]
+
+
 class MultiColumnReader(ColumnReader):
     """Serializes access to multiple column readers, making them appear to be
     one large column.
@@ -1053,6 +1817,8 @@ class MultiColumnReader(ColumnReader):
         else:
             assert len(offsets) == len(readers)
             self._doc_offsets = offsets
+            if readers:
+                self._doccount = offsets[-1] + len(readers[-1])
 
     def _document_reader(self, docnum):
         return max(0, bisect_right(self._doc_offsets, docnum) - 1)
@@ -1066,6 +1832,57 @@ class MultiColumnReader(ColumnReader):
         x, y = self._reader_and_docnum(docnum)
         return self._readers[x][y]
 
+    def values(self, docnums):
+        # Group the docnums by sub-reader, so each reader can use its own
+        # values() method
+        docnums = list(docnums)
+        groups = defaultdict(list)
+        for i, docnum in enumerate(docnums):
+            x, y = self._reader_and_docnum(docnum)
+            groups[x].append((i, y))
+
+        result = [None] * len(docnums)
+        for x, pairs in iteritems(groups):
+            values = self._readers[x].values([y for _, y in pairs])
+            for (i, _), v in izip(pairs, values):
+                result[i] = v
+        return result
+
+    def as_array(self):
+        """Returns the concatenation of the arrays returned by the
+        sub-readers' ``as_array()`` methods, so the value of each document is
+        at its document number in the combined column. This copies the
+        values.
+        """
+
+        arrays = [r.as_array() for r in self._readers]
+        np = optional_numpy()
+        if np is not None:
+            likes = [a for a in arrays if isinstance(a, np.ndarray)]
+            if likes:
+                like = likes[0]
+                parts = []
+                for a in arrays:
+                    if isinstance(a, np.ndarray):
+                        pass
+                    elif like.ndim == 2:
+                        # A list of byte strings from a reader of a segment
+                        # without the column, e.g. EmptyColumnReader
+                        a = np.frombuffer(emptybytes.join(a), dtype=like.dtype)
+                        a = a.reshape(-1, like.shape[1])
+                    else:
+                        a = np.asarray(a, dtype=like.dtype)
+                    parts.append(a)
+                return np.concatenate(parts)
+        typecodes = [a.typecode for a in arrays if isinstance(a, array)]
+        if typecodes:
+            result = array(typecodes[0])
+        else:
+            result = []
+        for a in arrays:
+            result.extend(a)
+        return result
+
     def __iter__(self):
         for r in self._readers:
             for v in r:
@@ -1081,15 +1898,20 @@ class TranslatingColumnReader(ColumnReader):
     it the the user.
     """
 
-    def __init__(self, reader, translate):
+    def __init__(self, reader, translate, translate_array=None):
         """
         :param reader: the underlying ColumnReader object to get values from.
         :param translate: a function that takes a value from the underlying
             reader and returns a translated value.
+        :param translate_array: an optional function that takes the array
+            returned by the underlying reader's ``as_array()`` method and
+            returns an array of translated values, for example using
+            vectorized NumPy operations.
         """
 
         self._reader = reader
         self._translate = translate
+        self._translate_array = translate_array
 
     def raw_column(self):
         """Returns the underlying column reader.
@@ -1106,6 +1928,17 @@ class TranslatingColumnReader(ColumnReader):
     def sort_key(self, docnum):
         return self._reader.sort_key(docnum)
 
+    def values(self, docnums):
+        translate = self._translate
+        return [translate(v) for v in self._reader.values(docnums)]
+
+    def as_array(self):
+        arr = self._reader.as_array()
+        if self._translate_array is not None:
+            return self._translate_array(arr)
+        translate = self._translate
+        return [translate(v) for v in arr]
+
     def __iter__(self):
         translate = self._translate
         return (translate(v) for v in self._reader)
@@ -1227,6 +2060,384 @@ class PickleColumn(WrappedColumn):
                     yield loads(v)
 
 
+# Stored field serializers
+
+class StoredSerializer(object):
+    """Base class for objects used by :class:`StoredFieldsColumn` to convert a
+    document's dictionary of stored field values to and from bytes.
+    """
+
+    def __reduce__(self):
+        # Don't pickle the decoding caches along with the codec
+        return (self.__class__, ())
+
+    def dumps(self, values):
+        """Returns a bytestring encoding the given non-empty dictionary of
+        stored field values.
+        """
+
+        raise NotImplementedError
+
+    def loads(self, data, fieldnames=None):
+        """Returns the dictionary of stored field values encoded in the given
+        bytestring.
+
+        :param fieldnames: if given, a set of field names. Only the values of
+            these fields are decoded and returned.
+        """
+
+        raise NotImplementedError
+
+
+class PickleSerializer(StoredSerializer):
+    """Pickles each stored value separately, after a small table of field
+    names and value lengths. This can store any picklable value, but reading
+    pays the cost of unpickling each value, and you have to trust the index
+    files as much as you would trust code.
+    """
+
+    def __init__(self):
+        # Most documents have the same few combinations of fields, so cache
+        # the decoded names for each combination
+        self._names = {}
+
+    def dumps(self, values):
+        names = []
+        pickles = []
+        lengths = []
+        for name, value in values.items():
+            name = name.encode("utf8")
+            value = dumps(value, 2)
+            names.append(name)
+            pickles.append(value)
+            lengths.extend((len(name), len(value)))
+        header = struct.pack("<H" + "HI" * len(names), len(names), *lengths)
+        return emptybytes.join([header] + names + pickles)
+
+    def _table(self, data):
+        # Returns a list of (name, start, end) tuples for the values in a
+        # record
+        count = struct.unpack_from("<H", data)[0]
+        lengths = struct.unpack_from("<" + "HI" * count, data, 2)
+        pos = 2 + count * 6
+        end = pos + sum(lengths[0::2])
+        namebytes = bytes(data[pos:end])
+        names = self._names.get(namebytes)
+        if names is None:
+            names = []
+            for namelen in lengths[0::2]:
+                names.append(data[pos:pos + namelen].decode("utf8"))
+                pos += namelen
+            if len(self._names) < 1024:
+                self._names[namebytes] = names
+
+        table = []
+        pos = end
+        for name, vlen in izip(names, lengths[1::2]):
+            table.append((name, pos, pos + vlen))
+            pos += vlen
+        return table
+
+    def loads(self, data, fieldnames=None):
+        return dict((name, loads(data[start:end]))
+                    for name, start, end in self._table(data)
+                    if fieldnames is None or name in fieldnames)
+
+
+_typed_long = struct.Struct("<q")
+_typed_double = struct.Struct("<d")
+_typed_len = struct.Struct("<I")
+_typed_pair = struct.Struct("<HH")
+# Struct codes of the value kinds stored in the fixed-size part of a record
+_typed_fixed = {"q": "q", "d": "d", "?": "?", "D": "q"}
+_typed_min = typecode_min["q"]
+_typed_max = typecode_max["q"]
+
+
+def _typed_kind(value):
+    # Returns a tuple of (kind, payload) for a stored value, where kind is a
+    # one-character string. The payload is the value itself for the kinds in
+    # _typed_fixed, and a bytestring for the others. Only the exact types are
+    # encoded natively, so subclasses keep their type by being pickled
+    t = type(value)
+    if t is text_type:
+        try:
+            return "s", value.encode("utf8")
+        except UnicodeEncodeError:
+            # Strings with lone surrogates can't be encoded as UTF-8
+            return "p", dumps(value, 2)
+    elif t is bytes_type:
+        return "b", value
+    elif t is bool:
+        return "?", value
+    elif t in integer_types and _typed_min <= value <= _typed_max:
+        return "q", value
+    elif t is float:
+        return "d", value
+    elif value is None:
+        return "N", None
+    elif t is datetime and value.tzinfo is None:
+        return "D", datetime_to_long(value)
+    elif t is list:
+        return "l", _typed_list(value)
+    elif t is dict:
+        return "m", _typed_list([x for item in value.items() for x in item])
+    else:
+        return "p", dumps(value, 2)
+
+
+def _typed_list(values):
+    out = [_typed_len.pack(len(values))]
+    for value in values:
+        data = _typed_dumps(value)
+        out.append(_typed_len.pack(len(data)))
+        out.append(data)
+    return emptybytes.join(out)
+
+
+def _typed_dumps(value):
+    # Encodes a single value as its kind character followed by its payload
+    kind, payload = _typed_kind(value)
+    if kind in _typed_fixed:
+        payload = struct.pack("<" + _typed_fixed[kind], payload)
+    elif kind == "N":
+        payload = emptybytes
+    return kind.encode("ascii") + payload
+
+
+def _typed_loads_list(data):
+    count = _typed_len.unpack_from(data)[0]
+    values = []
+    pos = 4
+    for _ in xrange(count):
+        end = pos + 4 + _typed_len.unpack_from(data, pos)[0]
+        values.append(_typed_loads(data[pos + 4:end]))
+        pos = end
+    return values
+
+
+def _typed_loads(data):
+    # Decodes a value encoded by _typed_dumps
+    kind = data[:1]
+    if kind == b("s"):
+        return data[1:].decode("utf8")
+    elif kind == b("b"):
+        return bytes(data[1:])
+    elif kind == b("q"):
+        return _typed_long.unpack_from(data, 1)[0]
+    elif kind == b("d"):
+        return _typed_double.unpack_from(data, 1)[0]
+    elif kind == b("?"):
+        return data[1:2] != b("\x00")
+    elif kind == b("N"):
+        return None
+    elif kind == b("D"):
+        return long_to_datetime(_typed_long.unpack_from(data, 1)[0])
+    elif kind == b("l"):
+        return _typed_loads_list(data[1:])
+    elif kind == b("m"):
+        items = _typed_loads_list(data[1:])
+        return dict(izip(items[0::2], items[1::2]))
+    elif kind == b("p"):
+        return loads(data[1:])
+    else:
+        raise ValueError("Unknown stored value kind %r" % kind)
+
+
+class TypedSerializer(StoredSerializer):
+    """Encodes stored values of common types (unicode and byte strings,
+    integers, floats, booleans, None, naive datetimes, and lists and
+    dictionaries of these) in a compact binary format that's faster to decode
+    than pickles. Values of other types (including subclasses of these types,
+    and strings that can't be encoded as UTF-8) are pickled, and are unpickled
+    when they're read, so stored fields should only be read from trusted
+    indexes, the same as with :class:`PickleSerializer`.
+
+    Each record starts with a header describing the names and types of the
+    fields, which is the same for most documents, so the reader caches the
+    decoding plan for each header and decodes all the numbers, booleans and
+    dates in a record with a single ``struct`` call.
+    """
+
+    def __init__(self):
+        self._layouts = {}
+
+    def dumps(self, values):
+        # Put the variable-length values first, then the fixed-size values,
+        # then the Nones, so the reader can unpack the lengths and the
+        # fixed-size values together
+        var = []
+        fixed = []
+        nones = []
+        for name, value in values.items():
+            kind, payload = _typed_kind(value)
+            if kind == "N":
+                nones.append((name, kind, None))
+            elif kind in _typed_fixed:
+                fixed.append((name, kind, payload))
+            else:
+                var.append((name, kind, payload))
+        fields = var + fixed + nones
+
+        names = [name.encode("utf8") for name, _, _ in fields]
+        layout = emptybytes.join(
+            ["".join(kind for _, kind, _ in fields).encode("ascii"),
+             struct.pack("<%dH" % len(names), *[len(n) for n in names])]
+            + names)
+        code = "<" + "I" * len(var) + "".join(_typed_fixed[kind]
+                                              for _, kind, _ in fixed)
+        body = struct.pack(code, *([len(payload) for _, _, payload in var] +
+                                   [payload for _, _, payload in fixed]))
+        return emptybytes.join([_typed_pair.pack(len(fields), len(layout)),
+                                layout, body]
+                               + [payload for _, _, payload in var])
+
+    def _layout(self, data):
+        count, size = _typed_pair.unpack_from(data)
+        key = bytes(data[4:4 + size])
+        layout = self._layouts.get(key)
+        if layout is None:
+            kinds = key[:count].decode("ascii")
+            lengths = struct.unpack_from("<%dH" % count, key, count)
+            names = []
+            pos = count * 3
+            for length in lengths:
+                names.append(key[pos:pos + length].decode("utf8"))
+                pos += length
+
+            nvar = len([k for k in kinds if k not in _typed_fixed
+                        and k != "N"])
+            nfixed = len([k for k in kinds if k in _typed_fixed])
+            body = struct.Struct("<" + "I" * nvar + "".join(
+                _typed_fixed[k] for k in kinds[nvar:nvar + nfixed]))
+            dates = [name for name, kind in izip(names, kinds) if kind == "D"]
+            layout = (4 + size, body, list(izip(names[:nvar], kinds[:nvar])),
+                      names[nvar:nvar + nfixed], names[nvar + nfixed:], dates)
+            if len(self._layouts) < 1024:
+                self._layouts[key] = layout
+        return layout
+
+    def loads(self, data, fieldnames=None):
+        start, body, var, fixednames, nonenames, dates = self._layout(data)
+        values = body.unpack_from(data, start)
+        nvar = len(var)
+        pos = start + body.size
+
+        out = {}
+        for (name, kind), length in izip(var, values):
+            end = pos + length
+            if fieldnames is None or name in fieldnames:
+                if kind == "s":
+                    out[name] = data[pos:end].decode("utf8")
+                elif kind == "b":
+                    out[name] = bytes(data[pos:end])
+                else:
+                    out[name] = _typed_loads(kind.encode("ascii") +
+                                             data[pos:end])
+            pos = end
+        out.update(izip(fixednames, values[nvar:]))
+        for name in nonenames:
+            out[name] = None
+        for name in dates:
+            out[name] = long_to_datetime(out[name])
+
+        if fieldnames is not None and (fixednames or nonenames):
+            for name in fixednames + nonenames:
+                if name not in fieldnames:
+                    del out[name]
+        return out
+
+
+class StoredFieldsColumn(WrappedColumn):
+    """Stores a dictionary of stored field values for each document using the
+    wrapped column (usually a :class:`PackedBlockColumn`).
+
+    Unlike :class:`PickleColumn`, which pickles the whole dictionary, this
+    column encodes each value separately after a small table of field names
+    and value lengths, so the reader can decode only the fields a caller asks
+    for (see :meth:`StoredFieldsColumn.Reader.project`) without decoding the
+    others, such as a large stored body.
+    """
+
+    _default = None
+    # Columns unpickled from indexes written by older versions don't have
+    # this attribute set by __init__, so they fall back to pickled values
+    _serializer = PickleSerializer()
+
+    def __init__(self, child, serializer=None):
+        """
+        :param child: the column used to store the encoded records.
+        :param serializer: a :class:`StoredSerializer` object used to encode
+            the values. The default is a :class:`TypedSerializer`.
+        """
+
+        self._child = child
+        self._serializer = serializer or TypedSerializer()
+
+    def writer(self, *args, **kwargs):
+        return self.Writer(self._child.writer(*args, **kwargs),
+                           self._serializer)
+
+    def reader(self, *args, **kwargs):
+        return self.Reader(self._child.reader(*args, **kwargs),
+                           self._serializer)
+
+    class Writer(WrappedColumnWriter):
+        def __init__(self, child, serializer):
+            self._child = child
+            self._serializer = serializer
+
+        def __repr__(self):
+            return "<StoredFields.Writer>"
+
+        def add(self, docnum, v):
+            if not v:
+                self._child.add(docnum, emptybytes)
+            else:
+                self._child.add(docnum, self._serializer.dumps(v))
+
+    class Reader(WrappedColumnReader):
+        def __init__(self, child, serializer):
+            self._child = child
+            self._serializer = serializer
+
+        def __repr__(self):
+            return "<StoredFields.Reader>"
+
+        def _decode(self, data, fieldnames=None):
+            if not data:
+                return None
+            return self._serializer.loads(data, fieldnames)
+
+        def __getitem__(self, docnum):
+            return self._decode(self._child[docnum])
+
+        def values(self, docnums, fieldnames=None):
+            """Returns a list of the stored field dictionaries for the given
+            documents, in the same order as ``docnums``.
+
+            :param fieldnames: if given, only decode the values of the fields
+                with these names.
+            """
+
+            if fieldnames is not None:
+                fieldnames = frozenset(fieldnames)
+            return [self._decode(data, fieldnames)
+                    for data in self._child.values(docnums)]
+
+        def project(self, docnum, fieldnames):
+            """Returns a dictionary of the values of the given fields in the
+            given document, without decoding the values of any other fields.
+            Returns None if the document has no stored values.
+            """
+
+            return self._decode(self._child[docnum], frozenset(fieldnames))
+
+        def __iter__(self):
+            for data in self._child:
+                yield self._decode(data)
+
+
 # List columns
 
 class ListColumn(WrappedColumn):
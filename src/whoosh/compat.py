@@ -35,7 +35,11 @@ if sys.version_info[0] < 3:
     text_type = unicode
     bytes_type = str
     unichr = unichr
-    from urllib import urlretrieve
+
+    def urlretrieve(*args, **kwargs):
+        from urllib import urlretrieve as _urlretrieve
+        return _urlretrieve(*args, **kwargs)
+
     import Queue as queue
 
     def byte(num):
@@ -83,7 +87,12 @@ else:
     text_type = str
     bytes_type = bytes
     unichr = chr
-    from urllib.request import urlretrieve
+
+    def urlretrieve(*args, **kwargs):
+        # urllib.request is slow to import and rarely needed
+        from urllib.request import urlretrieve as _urlretrieve
+        return _urlretrieve(*args, **kwargs)
+
     import queue
 
     def byte(num):
@@ -95,6 +95,11 @@ class FieldType(object):
         index format as the term vector format. Any flase value means don't
         store term vectors for this field.
 
+    * completion (boolean): whether the codec should precompute the most
+      frequent terms under each short prefix of this field's terms, so
+      :meth:`whoosh.reading.IndexReader.most_frequent_terms` can answer
+      autocomplete-style prefix queries without scanning the term list.
+
     The constructor for the base field type simply lets you supply your own
     attribute values.  Subclasses may configure some or all of this for you.
     """
@@ -104,16 +109,18 @@ class FieldType(object):
     multitoken_query = "default"
     sortable_typecode = None
     column_type = None
+    completion = False
 
     def __init__(self, format, analyzer, scorable=False,
                  stored=False, unique=False, multitoken_query="default",
-                 sortable=False, vector=None):
+                 sortable=False, vector=None, completion=False):
         self.format = format
         self.analyzer = analyzer
         self.scorable = scorable
         self.stored = stored
         self.unique = unique
         self.multitoken_query = multitoken_query
+        self.completion = completion
         self.set_sortable(sortable)
 
         if isinstance(vector, formats.Format):
@@ -218,6 +225,15 @@ class FieldType(object):
     def from_column_value(self, value):
         return self.from_bytes(value)
 
+    def from_column_array(self, values):
+        """Takes an array of values from this field's column, as returned by
+        :meth:`whoosh.columns.ColumnReader.as_array`, and returns a sequence
+        of the corresponding field values. The default implementation calls
+        :meth:`FieldType.from_column_value` on each value and returns a list.
+        """
+
+        return [self.from_column_value(v) for v in values]
+
     # Columns/sorting
 
     def set_sortable(self, sortable):
@@ -408,6 +424,9 @@ class FieldWrapper(FieldType):
     def from_column_value(self, value):
         return self.subfield.from_column_value(value)
 
+    def from_column_array(self, values):
+        return self.subfield.from_column_array(values)
+
     # Sorting/columns
 
     def set_sortable(self, sortable):
@@ -463,10 +482,12 @@ class ID(FieldType):
     """
 
     def __init__(self, stored=False, unique=False, field_boost=1.0,
-                 sortable=False, analyzer=None):
+                 sortable=False, analyzer=None, completion=False):
         """
         :param stored: Whether the value of this field is stored with the
             document.
+        :param completion: if True, precompute the most frequent terms under
+            each short prefix for fast autocompletion.
         """
 
         self.analyzer = analyzer or analysis.IDAnalyzer()
@@ -474,6 +495,7 @@ class ID(FieldType):
         self.format = formats.Existence(field_boost=field_boost)
         self.stored = stored
         self.unique = unique
+        self.completion = completion
         self.set_sortable(sortable)
 
 
@@ -709,6 +731,31 @@ class NUMERIC(FieldType):
         x = from_sortable(self.numtype, self.bits, self.signed, x)
         return self.unprepare_number(x)
 
+    def from_column_array(self, values):
+        if not hasattr(values, "dtype"):
+            return FieldType.from_column_array(self, values)
+        elif self.decimal_places:
+            # NumPy scalars overflow in from_sortable, so convert the values
+            # to Python ints first
+            return FieldType.from_column_array(self, values.tolist())
+
+        # Convert a NumPy array of sortable numbers with vectorized operations
+        # (see whoosh.util.numeric.from_sortable)
+        if self.numtype is float:
+            x = values.astype("u8").view("i8")
+            if self.signed:
+                x ^= -0x8000000000000000
+            x[x < 0] ^= 0x7fffffffffffffff
+            return x.view("f8")
+        elif not self.signed:
+            return values.astype("u8" if self.bits == 64 else "i8")
+        elif self.bits == 64:
+            x = values.astype("u8").view("i8")
+            x ^= -0x8000000000000000
+            return x
+        else:
+            return values.astype("i8") - (1 << self.bits - 1)
+
     def to_bytes(self, x, shift=0):
         # Try to avoid re-encoding; this sucks because on Python 2 we can't
         # tell the difference between a string and encoded bytes, so we have
@@ -836,6 +883,12 @@ class DATETIME(NUMERIC):
     def from_column_value(self, x):
         return long_to_datetime(x)
 
+    def from_column_array(self, values):
+        # Convert NumPy integers to Python ints, which timedelta accepts
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        return [long_to_datetime(x) for x in values]
+
     def to_bytes(self, x, shift=0):
         x = self.prepare_datetime(x)
         return NUMERIC.to_bytes(self, x, shift=shift)
@@ -1010,6 +1063,9 @@ class COLUMN(FieldType):
     def from_bytes(self, b):
         return b
 
+    def from_column_array(self, values):
+        return values
+
 
 class KEYWORD(FieldType):
     """
@@ -1021,13 +1077,15 @@ class KEYWORD(FieldType):
 
     def __init__(self, stored=False, lowercase=False, commas=False,
                  scorable=False, unique=False, field_boost=1.0, sortable=False,
-                 vector=None, analyzer=None):
+                 vector=None, analyzer=None, completion=False):
         """
         :param stored: Whether to store the value of the field with the
             document.
         :param commas: Whether this is a comma-separated field. If this is False
             (the default), it is treated as a space-separated field.
         :param scorable: Whether this field is scorable.
+        :param completion: if True, precompute the most frequent terms under
+            each short prefix for fast autocompletion.
         """
 
         if not analyzer:
@@ -1040,6 +1098,7 @@ class KEYWORD(FieldType):
         self.scorable = scorable
         self.stored = stored
         self.unique = unique
+        self.completion = completion
 
         if isinstance(vector, formats.Format):
             self.vector = vector
@@ -1062,7 +1121,7 @@ class TEXT(FieldType):
     def __init__(self, analyzer=None, phrase=True, chars=False, stored=False,
                  field_boost=1.0, multitoken_query="default", spelling=False,
                  sortable=False, lang=None, vector=None,
-                 spelling_prefix="spell_"):
+                 spelling_prefix="spell_", completion=False):
         """
         :param analyzer: The analysis.Analyzer to use to index the field
             contents. See the analysis module for more information. If you omit
@@ -1091,6 +1150,9 @@ class TEXT(FieldType):
             of :class:`whoosh.formats.Format`, the index will use the object to
             store the term vector. Any other true value (e.g. ``vector=True``)
             will use the field's index format to store the term vector as well.
+        :param completion: if True, precompute the most frequent terms under
+            each short prefix for fast autocompletion (see
+            :meth:`whoosh.reading.IndexReader.most_frequent_terms`).
         """
 
         if analyzer:
@@ -1118,6 +1180,7 @@ class TEXT(FieldType):
 
         self.spelling = spelling
         self.spelling_prefix = spelling_prefix
+        self.completion = completion
         self.multitoken_query = multitoken_query
         self.scorable = True
         self.stored = stored
@@ -118,7 +118,7 @@ class CompoundStorage(FileStorage):
         if self._source:
             # Create a memoryview/buffer from the mmap
             buf = memoryview_(self._source, offset, length)
-            f = BufferFile(buf, name=name)
+            f = BufferFile(buf, name=name, mapped=self._source, offset=offset)
         elif hasattr(self._file, "subset"):
             f = self._file.subset(offset, length, name=name)
         else:
@@ -30,7 +30,8 @@ import errno, os, sys, tempfile
 from threading import Lock
 
 from whoosh.compat import BytesIO, memoryview_
-from whoosh.filedb.structfile import BufferFile, StructFile
+from whoosh.filedb.structfile import BufferFile, PositionalFile, PooledFile
+from whoosh.filedb.structfile import StructFile
 from whoosh.index import _DEF_INDEX_NAME, EmptyIndexError
 from whoosh.util import random_name
 from whoosh.util.filelock import FileLock
@@ -384,7 +385,8 @@ class FileStorage(Storage):
 
     supports_mmap = True
 
-    def __init__(self, path, supports_mmap=True, readonly=False, debug=False):
+    def __init__(self, path, supports_mmap=True, readonly=False, debug=False,
+                 handle_pool=None):
         """
         :param path: a path to a directory.
         :param supports_mmap: if True (the default), use the ``mmap`` module to
@@ -393,11 +395,21 @@ class FileStorage(Storage):
             instead of with ``mmap``.
         :param readonly: If ``True``, the object will raise an exception if you
             attempt to create or rename a file.
+        :param handle_pool: an optional
+            :class:`whoosh.filedb.structfile.HandlePool` object. If you pass a
+            pool, files opened for reading share a bounded number of file
+            descriptors from the pool instead of each keeping one open (and
+            compound segment files are read from the pool instead of being
+            memory mapped). This is useful when a process keeps many indexes
+            open at once. Since pooled files don't keep their descriptors
+            open, a reader on this storage can't read segment files that a
+            later commit has deleted.
         """
 
         self.folder = path
         self.supports_mmap = supports_mmap
         self.readonly = readonly
+        self.handle_pool = handle_pool
         self._debug = debug
         self.locks = {}
 
@@ -498,10 +510,17 @@ class FileStorage(Storage):
         :param name: the name of the file to open.
         :param kwargs: additional keyword arguments are passed through to the
             :class:`~whoosh.filedb.structfile.StructFile` initializer.
-        :return: a :class:`whoosh.filedb.structfile.StructFile` instance.
+        :return: a :class:`whoosh.filedb.structfile.PositionalFile` instance,
+            whose ``get*`` methods are safe to call from multiple threads.
         """
 
-        f = StructFile(open(self._fpath(name), "rb"), name=name, **kwargs)
+        path = self._fpath(name)
+        if self.handle_pool is not None:
+            if not os.path.exists(path):
+                raise IOError(errno.ENOENT, "No such file", path)
+            return PooledFile(self.handle_pool, path, name=name, **kwargs)
+
+        f = PositionalFile(open(path, "rb"), name=name, **kwargs)
         return f
 
     def _fpath(self, fname):
@@ -25,11 +25,19 @@
 # those of the authors and should not be interpreted as representing official
 # policies, either expressed or implied, of Matt Chaput.
 
+import os
+import threading
 from array import array
+from collections import OrderedDict
 from copy import copy
 from struct import calcsize
 
-from whoosh.compat import BytesIO, bytes_type
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+from whoosh.compat import bytes_type
 from whoosh.compat import dump as dump_pickle
 from whoosh.compat import load as load_pickle
 from whoosh.compat import array_frombytes, array_tobytes
@@ -52,6 +60,15 @@ _ORDERMAP = {"little": "<", "big": ">"}
 _types = (("sbyte", "b"), ("ushort", "H"), ("int", "i"),
           ("long", "q"), ("float", "f"))
 
+# os.pread is not available on Windows, os.preadv is also not available on
+# macOS or before Python 3.7
+_pread = getattr(os, "pread", None)
+_preadv = getattr(os, "preadv", None)
+_fadvise = getattr(os, "posix_fadvise", None)
+_FADV_WILLNEED = getattr(os, "POSIX_FADV_WILLNEED", None)
+_O_BINARY = getattr(os, "O_BINARY", 0)
+_PAGESIZE = getattr(mmap, "PAGESIZE", 4096)
+
 
 # Main function
 
@@ -349,31 +366,478 @@ class StructFile(object):
         self.seek(position)
         return self.read_array(typecode, length)
 
+    def get_view(self, position, length):
+        """Returns a bytes-like object containing the given range of the file.
+        Subclasses backed by a buffer return a ``memoryview`` slice of the
+        buffer instead of copying the bytes, so only use this method when
+        the consumer accepts buffers (for example ``zlib.decompress()``,
+        ``pickle.loads()``, ``struct.unpack_from()``, or
+        ``array.frombytes()``) and doesn't keep the result around.
+        """
+
+        return self.get(position, length)
+
+    def prefetch(self, position=0, length=None):
+        """Tells the operating system that the given range of the file will
+        be read soon, so it can start loading it into memory in the
+        background. The default implementation does nothing.
+
+        :param position: the start of the range.
+        :param length: the length of the range, or None to prefetch to the
+            end of the file.
+        """
+
+        pass
+
+    def get_varint(self, position):
+        """Returns a ``(value, endposition)`` tuple for the variable-length
+        encoded unsigned integer at the given position.
+        """
+
+        f = PositionReader(self, position)
+        return read_varint(f.read), f.tell()
+
+    def get_pickle(self, position):
+        """Returns a ``(object, endposition)`` tuple for the pickled object at
+        the given position.
+        """
+
+        f = PositionReader(self, position)
+        return load_pickle(f), f.tell()
+
+
+class PositionReader(object):
+    """A minimal read-only file-like object that reads from a position in a
+    :class:`StructFile` using the file's ``get()`` method, so that parsing a
+    structure with a stream-based function (such as ``pickle.load``) doesn't
+    use the file's shared position.
+    """
+
+    def __init__(self, dbfile, position, bufsize=4096):
+        self._dbfile = dbfile
+        self._pos = position
+        self._bufsize = bufsize
+        self._buf = b""
+        self._bufstart = position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return self._read_all()
+
+        i = self._pos - self._bufstart
+        if i < 0 or i + size > len(self._buf):
+            # Read ahead so that parsing doesn't cost one read per call
+            self._buf = self._dbfile.get(self._pos, max(size, self._bufsize))
+            self._bufstart = self._pos
+            i = 0
+        b = self._buf[i:i + size]
+        self._pos += len(b)
+        return b
+
+    def _read_all(self):
+        chunks = []
+        while True:
+            chunk = self.read(self._bufsize)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def readline(self):
+        line = []
+        while True:
+            c = self.read(1)
+            line.append(c)
+            if not c or c == b"\n":
+                break
+        return b"".join(line)
+
+    def seek(self, where, whence=0):
+        if whence == 1:
+            where += self._pos
+        elif whence == 2:
+            where += self._dbfile.size()
+        self._pos = where
+        return where
+
+    def tell(self):
+        return self._pos
+
+
+class BufferReader(object):
+    """A minimal read-only file-like object over a bytes-like object, such as
+    a ``memoryview``. Unlike ``BytesIO``, this doesn't copy the buffer.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._pos = 0
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            yield line
+
+    def read(self, size=-1):
+        pos = self._pos
+        end = len(self._buf) if size is None or size < 0 else pos + size
+        b = bytes_type(self._buf[pos:end])
+        self._pos += len(b)
+        return b
+
+    def readline(self, size=-1):
+        line = []
+        while size < 0 or len(line) < size:
+            c = self.read(1)
+            line.append(c)
+            if not c or c == b"\n":
+                break
+        return b"".join(line)
+
+    def seek(self, where, whence=0):
+        if whence == 1:
+            where += self._pos
+        elif whence == 2:
+            where += len(self._buf)
+        self._pos = where
+        return where
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._buf = None
+
+
+class PositionalFile(StructFile):
+    """A :class:`StructFile` for an operating system file, whose ``get*``
+    methods read from an absolute position using ``os.pread`` instead of
+    seeking and reading. Since these methods don't use or move the file's
+    shared position, many threads can read from the same open file at once.
+    (On platforms without ``os.pread``, the reads are serialized with a lock
+    instead.)
+
+    The stream methods (``read()``, ``seek()``, etc.) still use the shared
+    position, so only use them when one thread has the file to itself, for
+    example while opening a reader. Codec readers should only use the
+    ``get*`` methods once they're open.
+    """
+
+    def __init__(self, fileobj, name=None, onclose=None, fd=None, offset=0,
+                 length=None, lock=None):
+        """
+        :param fileobj: the file object to wrap.
+        :param fd: the operating system file descriptor to read from. The
+            default is ``fileobj.fileno()``.
+        :param offset: the position in the file descriptor's file of
+            position 0 in this file.
+        :param length: the number of bytes in this file after ``offset``, or
+            None to read to the end of the underlying file.
+        :param lock: a lock to share with other files on the same file
+            descriptor (only used when ``os.pread`` is not available).
+        """
+
+        StructFile.__init__(self, fileobj, name=name, onclose=onclose)
+        self._fd = fileobj.fileno() if fd is None else fd
+        self._offset = offset
+        self._length = length
+        self._lock = lock or threading.Lock()
+
+    def subset(self, position, length, name=None):
+        from whoosh.filedb.compound import SubFile
+
+        name = name or self._name
+        offset = self._offset + position
+        return PositionalFile(SubFile(self.file, position, length), name=name,
+                              fd=self._fd, offset=offset, length=length,
+                              lock=self._lock)
+
+    def size(self):
+        if self._length is not None:
+            return self._length
+        return os.fstat(self._fd).st_size - self._offset
+
+    def get(self, position, length):
+        return self._get(self._fd, position, length)
+
+    def get_array(self, position, typecode, length):
+        return self._get_array(self._fd, position, typecode, length)
+
+    def prefetch(self, position=0, length=None):
+        self._prefetch(self._fd, position, length)
+
+    def _seek_and_read(self, fd, position, length):
+        with self._lock:
+            self.file.seek(position)
+            return self.file.read(length)
+
+    def _get(self, fd, position, length):
+        if self._length is not None:
+            length = max(0, min(length, self._length - position))
+
+        if _pread is None:
+            return self._seek_and_read(fd, position, length)
+
+        pos = self._offset + position
+        b = _pread(fd, length, pos)
+        # pread may return fewer bytes than requested (e.g. if interrupted)
+        while len(b) < length:
+            more = _pread(fd, length - len(b), pos + len(b))
+            if not more:
+                break
+            b += more
+        return b
+
+    def _get_array(self, fd, position, typecode, length):
+        size = length * _SIZEMAP[typecode]
+        if _preadv is not None and (self._length is None or
+                                    position + size <= self._length):
+            # Read directly into the array's memory instead of into a bytes
+            # object that then has to be copied into the array
+            a = array(typecode, [0]) * length
+            if _preadv(fd, [a], self._offset + position) != size:
+                a = None
+        else:
+            a = None
+
+        if a is None:
+            a = array(typecode)
+            array_frombytes(a, self._get(fd, position, size))
+        if IS_LITTLE:
+            a.byteswap()
+        return a
+
+    def _prefetch(self, fd, position, length):
+        if _fadvise is None:
+            return
+        if length is None:
+            if self._length is None:
+                # A length of 0 means "to the end of the file"
+                length = 0
+            else:
+                length = self._length - position
+        _fadvise(fd, self._offset + position, length, _FADV_WILLNEED)
+
+
+class HandlePool(object):
+    """Shares a bounded number of open operating system file handles between
+    :class:`PooledFile` objects, so that having many readers open (for
+    example, readers for many indexes in the same process) doesn't run out of
+    file descriptors.
+
+    The pool keeps at most ``limit`` files open, closing the least recently
+    used handles that aren't in the middle of a read when it goes over the
+    limit, and reopening files by path when they're read again. (A handle
+    that's being read from is never closed, so the limit can be exceeded
+    briefly by concurrent reads.)
+
+    >>> pool = HandlePool(limit=512)
+    >>> storage = FileStorage("indexdir", handle_pool=pool)
+
+    A single pool can (and usually should) be shared between storage objects.
+
+    Note that since a closed handle is reopened by path, a reader whose
+    segment files were deleted (for example, by a merge in another process)
+    can't read them again once their handles have been closed. Only use a
+    pool with readers that are refreshed before old segment files are
+    cleaned up.
+    """
+
+    def __init__(self, limit=256):
+        """
+        :param limit: the maximum number of idle file handles to keep open.
+        """
+
+        self.limit = limit
+        self._handles = OrderedDict()  # Maps path -> [fd, number of users]
+        self._lock = threading.Lock()
+        # Used to serialize seek/read pairs when os.pread is not available
+        self.iolock = threading.Lock()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def acquire(self, path):
+        """Returns an open file descriptor for the given path. You must call
+        :meth:`HandlePool.release` with the same path when you're done with
+        the descriptor.
+        """
+
+        with self._lock:
+            # Remove and re-add the entry to move it to the end of the
+            # ordered dictionary (most recently used)
+            entry = self._handles.pop(path, None)
+            if entry is None:
+                entry = [os.open(path, os.O_RDONLY | _O_BINARY), 0]
+            entry[1] += 1
+            self._handles[path] = entry
+            self._trim()
+            return entry[0]
+
+    def release(self, path):
+        with self._lock:
+            entry = self._handles.get(path)
+            if entry is not None:
+                entry[1] -= 1
+            self._trim()
+
+    def _trim(self):
+        handles = self._handles
+        if len(handles) <= self.limit:
+            return
+        # Close idle handles from least to most recently used
+        for path in list(handles):
+            fd, users = handles[path]
+            if not users:
+                os.close(fd)
+                del handles[path]
+                if len(handles) <= self.limit:
+                    break
+
+    def close_idle(self):
+        """Closes all open handles that aren't being read from.
+        """
+
+        with self._lock:
+            for path in list(self._handles):
+                fd, users = self._handles[path]
+                if not users:
+                    os.close(fd)
+                    del self._handles[path]
+
+
+class PooledFile(PositionalFile):
+    """A :class:`PositionalFile` that doesn't keep its own file descriptor
+    open, but instead borrows one from a :class:`HandlePool` for each read.
+
+    Since the stream methods (``read()``, ``seek()``, etc.) are implemented
+    on top of ``get()``, they don't keep a handle open either.
+    """
+
+    def __init__(self, pool, path, name=None, onclose=None, offset=0,
+                 length=None):
+        """
+        :param pool: the :class:`HandlePool` to get file descriptors from.
+        :param path: the path of the file to read.
+        :param offset: the position in the file of position 0 in this file.
+        :param length: the number of bytes in this file after ``offset``, or
+            None to read to the end of the file.
+        """
+
+        StructFile.__init__(self, PositionReader(self, 0), name=name,
+                            onclose=onclose)
+        self._pool = pool
+        self._path = path
+        self._fd = None
+        self._offset = offset
+        self._length = length
+        self._lock = pool.iolock
+
+    def subset(self, position, length, name=None):
+        return PooledFile(self._pool, self._path, name=name or self._name,
+                          offset=self._offset + position, length=length)
+
+    def size(self):
+        if self._length is not None:
+            return self._length
+        return os.path.getsize(self._path) - self._offset
+
+    def _seek_and_read(self, fd, position, length):
+        with self._lock:
+            os.lseek(fd, self._offset + position, os.SEEK_SET)
+            return os.read(fd, length)
+
+    def get(self, position, length):
+        pool = self._pool
+        fd = pool.acquire(self._path)
+        try:
+            return self._get(fd, position, length)
+        finally:
+            pool.release(self._path)
+
+    def get_array(self, position, typecode, length):
+        pool = self._pool
+        fd = pool.acquire(self._path)
+        try:
+            return self._get_array(fd, position, typecode, length)
+        finally:
+            pool.release(self._path)
+
+    def prefetch(self, position=0, length=None):
+        pool = self._pool
+        fd = pool.acquire(self._path)
+        try:
+            self._prefetch(fd, position, length)
+        finally:
+            pool.release(self._path)
+
 
 class BufferFile(StructFile):
-    def __init__(self, buf, name=None, onclose=None):
+    def __init__(self, buf, name=None, onclose=None, mapped=None, offset=0):
+        """
+        :param buf: the bytes-like object to read.
+        :param mapped: if ``buf`` is a view of a memory map, the ``mmap``
+            object, used by :meth:`BufferFile.prefetch`.
+        :param offset: the position of ``buf`` in the memory map.
+        """
+
         self._buf = buf
         self._name = name
-        self.file = BytesIO(buf)
+        # Don't wrap the buffer in BytesIO, since that copies the buffer
+        self.file = BufferReader(buf)
         self.onclose = onclose
+        self._mapped = mapped
+        self._offset = offset
 
         self.is_real = False
         self.is_closed = False
 
     def subset(self, position, length, name=None):
         name = name or self._name
-        return BufferFile(self.get(position, length), name=name)
+        return BufferFile(self.get_view(position, length), name=name,
+                          mapped=self._mapped, offset=self._offset + position)
+
+    def prefetch(self, position=0, length=None):
+        if self._mapped is None:
+            return
+        if length is None:
+            length = len(self._buf) - position
+        if length <= 0:
+            return
+
+        madvise = getattr(self._mapped, "madvise", None)
+        willneed = getattr(mmap, "MADV_WILLNEED", None)
+        if madvise is not None and willneed is not None:
+            # The start of the range must be aligned to a page boundary
+            start = self._offset + position
+            aligned = start - start % _PAGESIZE
+            madvise(willneed, aligned, length + start - aligned)
+        else:
+            # Fault in the pages by touching one byte on each page
+            view = self.get_view(position, length)
+            bytes_type(view[::_PAGESIZE])
 
     def get(self, position, length):
         return bytes_type(self._buf[position:position + length])
 
+    def get_view(self, position, length):
+        return self._buf[position:position + length]
+
     def get_array(self, position, typecode, length):
         a = array(typecode)
-        array_frombytes(a, self.get(position, length * _SIZEMAP[typecode]))
+        array_frombytes(a, self.get_view(position,
+                                         length * _SIZEMAP[typecode]))
         if IS_LITTLE:
             a.byteswap()
         return a
 
+    def get_pickle(self, position):
+        f = BufferReader(self._buf)
+        f.seek(position)
+        return load_pickle(f), f.tell()
+
 
 class ChecksumFile(StructFile):
     def __init__(self, *args, **kwargs):
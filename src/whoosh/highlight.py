@@ -259,9 +259,57 @@ def set_matched_filter_phrases(tokens, text, terms, phrases):
         yield t
 
 
+def _word_start(text, pos, limit):
+    # Returns the position of the start of the first word at or after pos,
+    # looking no further than limit. Fragments built from character offsets
+    # use this to avoid starting in the middle of a word
+    if pos <= 0:
+        return 0
+    while pos < limit and text[pos - 1].isalnum():
+        pos += 1
+    while pos < limit and not text[pos].isalnum():
+        pos += 1
+    return pos
+
+
+def _word_end(text, pos, low, high):
+    # Returns the position of the end of the last word before pos. If pos is
+    # in the middle of a word, tries to finish the word without going past
+    # high, and otherwise goes back to the end of the previous word, without
+    # going back past low
+    textlen = len(text)
+    if pos >= textlen:
+        return textlen
+    end = pos
+    if text[pos - 1].isalnum():
+        while end < high and end < textlen and text[end].isalnum():
+            end += 1
+        if end < textlen and text[end].isalnum():
+            end = pos
+            while end > low and text[end - 1].isalnum():
+                end -= 1
+    while end > low and not text[end - 1].isalnum():
+        end -= 1
+    return end
+
+
+def _sentence_end(text, i, sentencechars):
+    # Returns True if the character at i ends a sentence. Runs of sentence
+    # end characters, such as "...", don't count
+    return (text[i] in sentencechars
+            and not (i + 1 < len(text) and text[i + 1] in sentencechars)
+            and not (i > 0 and text[i - 1] in sentencechars))
+
+
 # Fragmenters
 
 class Fragmenter(object):
+    # If True, the highlighting functions take the first fragments that score
+    # at least the minimum score, instead of the best fragments in the whole
+    # text, so they can stop fragmenting (and tokenizing) the text as soon as
+    # they have enough
+    stream = False
+
     def must_retokenize(self):
         """Returns True if this fragmenter requires retokenized text.
 
@@ -349,18 +397,72 @@ class SentenceFragmenter(Fragmenter):
     does NOT remove stop words, for example::
 
         sa = StandardAnalyzer(stoplist=None)
+
+    For very long documents, use ``retokenize=False`` (if the field stores
+    characters in its postings or vectors) so the fragmenter only looks at the
+    text around the matched terms, and/or ``stream=True`` so highlighting
+    stops at the first ``top`` good fragments.
     """
 
     def __init__(self, maxchars=200, sentencechars=".!?",
-                 charlimit=DEFAULT_CHARLIMIT):
+                 charlimit=DEFAULT_CHARLIMIT, retokenize=True, stream=False):
         """
         :param maxchars: The maximum number of characters allowed in a
             fragment.
+        :param charlimit: the maximum number of characters of the text to
+            examine, or None to examine the whole text.
+        :param retokenize: if False, and the field stores the character
+            offsets of terms in its postings or term vectors, build the
+            fragments by looking for the sentence boundaries around the
+            matched terms, instead of retokenizing the text.
+        :param stream: if True, highlighting stops at the first fragments
+            that score at least the minimum score, instead of looking for the
+            best fragments in the text.
         """
 
         self.maxchars = maxchars
         self.sentencechars = frozenset(sentencechars)
         self.charlimit = charlimit
+        self.retokenize = retokenize
+        self.stream = stream
+
+    def must_retokenize(self):
+        return self.retokenize
+
+    def fragment_matches(self, text, tokens):
+        maxchars = self.maxchars
+        sentencechars = self.sentencechars
+        charlimit = self.charlimit
+        textlen = len(text)
+
+        i = 0
+        while i < len(tokens):
+            t = tokens[i]
+            if charlimit and t.endchar > charlimit:
+                break
+
+            # Look back from the match for the end of the previous sentence
+            start = t.startchar
+            limit = max(0, t.endchar - maxchars)
+            while start > limit and not _sentence_end(text, start - 1,
+                                                      sentencechars):
+                start -= 1
+            start = _word_start(text, start, t.startchar)
+
+            # Look forward from the match for the end of the sentence
+            end = t.endchar
+            limit = min(textlen, start + maxchars)
+            while end < limit and not _sentence_end(text, end, sentencechars):
+                end += 1
+            end = _word_end(text, end, t.endchar, end)
+
+            # Add any other matches in the same sentence
+            j = i + 1
+            while j < len(tokens) and tokens[j].endchar <= end:
+                j += 1
+            yield mkfrag(text, [tk.copy() for tk in tokens[i:j]],
+                         startchar=start, endchar=end)
+            i = j
 
     def fragment_tokens(self, text, tokens):
         maxchars = self.maxchars
@@ -418,19 +520,70 @@ class SentenceFragmenter(Fragmenter):
 class ContextFragmenter(Fragmenter):
     """Looks for matched terms and aggregates them with their surrounding
     context.
+
+    For very long documents, use ``retokenize=False`` (if the field stores
+    characters in its postings or vectors) so the fragmenter only looks at the
+    text around the matched terms, and/or ``stream=True`` so highlighting
+    stops at the first ``top`` good fragments.
     """
 
-    def __init__(self, maxchars=200, surround=20, charlimit=DEFAULT_CHARLIMIT):
+    def __init__(self, maxchars=200, surround=20, charlimit=DEFAULT_CHARLIMIT,
+                 retokenize=True, stream=False):
         """
         :param maxchars: The maximum number of characters allowed in a
             fragment.
         :param surround: The number of extra characters of context to add both
             before the first matched term and after the last matched term.
+        :param charlimit: the maximum number of characters of the text to
+            examine, or None to examine the whole text.
+        :param retokenize: if False, and the field stores the character
+            offsets of terms in its postings or term vectors, build the
+            fragments from the text around the matched terms instead of
+            retokenizing the text.
+        :param stream: if True, highlighting stops at the first fragments
+            that score at least the minimum score, instead of looking for the
+            best fragments in the text.
         """
 
         self.maxchars = maxchars
         self.surround = surround
         self.charlimit = charlimit
+        self.retokenize = retokenize
+        self.stream = stream
+
+    def must_retokenize(self):
+        return self.retokenize
+
+    def fragment_matches(self, text, tokens):
+        maxchars = self.maxchars
+        surround = self.surround
+        charlimit = self.charlimit
+
+        i = 0
+        while i < len(tokens):
+            t = tokens[i]
+            if charlimit and t.endchar > charlimit:
+                break
+
+            # Add following matches that are within the surrounding context of
+            # the previous match, as long as the fragment isn't too long
+            left = t.startchar
+            right = t.endchar
+            j = i + 1
+            while j < len(tokens):
+                ec = tokens[j].endchar
+                if (ec - right > surround or ec - left > maxchars or
+                        (charlimit and ec > charlimit)):
+                    break
+                right = max(right, ec)
+                j += 1
+
+            # Add the context around the matches, without cutting words
+            start = _word_start(text, max(0, left - surround), left)
+            end = _word_end(text, right + surround, right, left + maxchars)
+            yield mkfrag(text, [tk.copy() for tk in tokens[i:j]],
+                         startchar=start, endchar=end)
+            i = j
 
     def fragment_tokens(self, text, tokens):
         maxchars = self.maxchars
@@ -509,7 +662,7 @@ class PinpointFragmenter(Fragmenter):
     """
 
     def __init__(self, maxchars=200, surround=20, autotrim=False,
-                 charlimit=DEFAULT_CHARLIMIT):
+                 charlimit=DEFAULT_CHARLIMIT, stream=False):
         """
         :param maxchars: The maximum number of characters allowed in a
             fragment.
@@ -519,12 +672,16 @@ class PinpointFragmenter(Fragmenter):
             after the last space in the fragments, to try to avoid truncated
             words at the start and end. For short fragments or fragments with
             long runs between spaces this may give strange results.
+        :param stream: if True, highlighting stops at the first fragments
+            that score at least the minimum score, instead of looking for the
+            best fragments in the text.
         """
 
         self.maxchars = maxchars
         self.surround = surround
         self.autotrim = autotrim
         self.charlimit = charlimit
+        self.stream = stream
 
     def must_retokenize(self):
         return False
@@ -877,10 +1034,21 @@ class GenshiFormatter(Formatter):
 
 # Highlighting
 
-def top_fragments(fragments, count, scorer, order, minscore=1):
-    scored_fragments = ((scorer(f), f) for f in fragments)
-    scored_fragments = nlargest(count, scored_fragments)
-    best_fragments = [sf for score, sf in scored_fragments if score >= minscore]
+def top_fragments(fragments, count, scorer, order, minscore=1, stream=False):
+    if stream:
+        # Take the first fragments that score well enough, and stop pulling
+        # fragments (and so tokens) from the fragmenter once we have enough
+        best_fragments = []
+        for f in fragments:
+            if scorer(f) >= minscore:
+                best_fragments.append(f)
+                if len(best_fragments) >= count:
+                    break
+    else:
+        scored_fragments = ((scorer(f), f) for f in fragments)
+        scored_fragments = nlargest(count, scored_fragments)
+        best_fragments = [sf for score, sf in scored_fragments
+                          if score >= minscore]
     best_fragments.sort(key=order)
     return best_fragments
 
@@ -904,7 +1072,8 @@ def highlight(text, terms, analyzer, fragmenter, formatter, top=3,
     tokens = analyzer(text, chars=True, mode=mode, removestops=False)
     tokens = set_matched_filter(tokens, termset)
     fragments = fragmenter.fragment_tokens(text, tokens)
-    fragments = top_fragments(fragments, top, scorer, order, minscore)
+    fragments = top_fragments(fragments, top, scorer, order, minscore,
+                              stream=getattr(fragmenter, "stream", False))
     return formatter(text, fragments)
 
 
@@ -936,6 +1105,48 @@ class Highlighter(object):
         field = results.searcher.schema[fieldname]
         return field.supports("characters")
 
+    def can_read_vector(self, results, fieldname):
+        # Can we get the start and end chars of the matched terms from each
+        # hit's term vector, instead of retokenizing the text or reading the
+        # postings of every matched term?
+
+        if self.always_retokenize:
+            return False
+        if self.fragmenter.must_retokenize():
+            # No, the configured fragmenter needs all the tokens in the text
+            return False
+        # Only if the field was configured to store vectors with characters
+        vformat = results.searcher.schema[fieldname].vector
+        return bool(vformat) and vformat.supports("characters")
+
+    @staticmethod
+    def _vector_tokens(searcher, docnum, fieldname, words, charlimit=None):
+        # Reads the document's term vector once and returns a list of Token
+        # objects for the occurrences of the given words, sorted by start char
+
+        tokens = []
+        if not searcher.has_vector(docnum, fieldname):
+            return tokens
+
+        m = searcher.vector(docnum, fieldname)
+        # The vector is sorted by term, so skip to each word in order
+        for word in sorted(words):
+            if not m.is_active():
+                break
+            m.skip_to(word)
+            if not m.is_active() or m.id() != word:
+                continue
+            for pos, startchar, endchar in m.value_as("characters"):
+                if charlimit and endchar > charlimit:
+                    break
+                tokens.append(Token(text=word, pos=pos, startchar=startchar,
+                                    endchar=endchar, matched=True))
+
+        # Sort by start char, with the longest token first where more than one
+        # word matched at the same place
+        tokens.sort(key=lambda t: (t.startchar, t.startchar - t.endchar))
+        return tokens
+
     @staticmethod
     def _load_chars(results, fieldname, texts, to_bytes):
         # For each docnum, create a mapping of text -> [(startchar, endchar)]
@@ -1008,8 +1219,17 @@ class Highlighter(object):
         # Convert bytes to unicode
         words = frozenset(from_bytes(term[1]) for term in bterms)
 
+        if not strict_phrase and self.can_read_vector(results, fieldname):
+            # Get the character offsets of the matched terms from the hit's
+            # term vector
+            charlimit = getattr(self.fragmenter, "charlimit", None)
+            tokens = self._vector_tokens(results.searcher, hitobj.docnum,
+                                         fieldname, words, charlimit)
+            tokens = [next(group) for _, group
+                      in groupby(tokens, lambda t: t.startchar)]
+            fragments = self.fragmenter.fragment_matches(text, tokens)
         # If we can do "pinpoint" highlighting...
-        if self.can_load_chars(results, fieldname):
+        elif self.can_load_chars(results, fieldname):
             # Build the docnum->[(startchar, endchar),] map
             if fieldname not in results._char_cache:
                 self._load_chars(results, fieldname, words, to_bytes)
@@ -1049,6 +1269,8 @@ class Highlighter(object):
             fragments = self.fragmenter.fragment_tokens(text, tokens)
 
         fragments = top_fragments(fragments, top, self.scorer, self.order,
-                                  minscore=minscore)
+                                  minscore=minscore,
+                                  stream=getattr(self.fragmenter, "stream",
+                                                 False))
         output = self.formatter.format(fragments)
         return output
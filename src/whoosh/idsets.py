@@ -279,10 +279,11 @@ class OnDiskBitSet(BaseBitSet):
         return self._dbfile.get_byte(self._basepos + n)
 
     def _iter_bytes(self):
-        dbfile = self._dbfile
-        dbfile.seek(self._basepos)
-        for _ in xrange(self._bytecount):
-            yield dbfile.read_byte()
+        # Read the bytes with one positional read instead of seeking, so
+        # multiple threads can iterate over sets in the same file
+        for byte in bytearray(self._dbfile.get_view(self._basepos,
+                                                    self._bytecount)):
+            yield byte
 
 
 class BitSet(BaseBitSet):
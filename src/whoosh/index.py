@@ -216,8 +216,14 @@ def version(storage, indexname=None):
 
 class Index(object):
     """Represents an indexed collection of documents.
+
+    If you set the ``resultcache`` attribute to a
+    :class:`whoosh.searching.ResultCache` object, searchers returned by
+    :meth:`Index.searcher` will use it to cache search results.
     """
 
+    resultcache = None
+
     def close(self):
         """Closes any open resources held by the Index object itself. This may
         not close all resources being used everywhere, for example by a
@@ -317,6 +323,7 @@ class Index(object):
         """
 
         from whoosh.searching import Searcher
+        kwargs.setdefault("resultcache", self.resultcache)
         return Searcher(self.reader(), fromindex=self, **kwargs)
 
     def field_length(self, fieldname):
@@ -419,8 +426,14 @@ class FileIndex(Index):
         self._schema = schema
         self.indexname = indexname
 
+        # Remember the latest generation number we've seen and the last TOC
+        # we read, so checking for changes and opening readers doesn't have
+        # to list the storage and unpickle the TOC every time
+        self._lastgen = None
+        self._toc = None
+
         # Try reading the TOC to see if it's possible
-        TOC.read(self.storage, self.indexname, schema=self._schema)
+        self._read_toc()
 
     @classmethod
     def create(cls, storage, schema, indexname=_DEF_INDEX_NAME):
@@ -438,7 +451,27 @@ class FileIndex(Index):
     # remove_field
 
     def latest_generation(self):
-        return TOC._latest_generation(self.storage, self.indexname)
+        storage = self.storage
+        indexname = self.indexname
+        gen = self._lastgen
+        if gen is not None:
+            # Generations are numbered consecutively, so instead of listing
+            # the storage we can check if the next generation's TOC exists
+            tocexists = storage.file_exists
+            if tocexists(TOC._filename(indexname, gen + 1)):
+                gen += 1
+                while tocexists(TOC._filename(indexname, gen + 1)):
+                    gen += 1
+                self._lastgen = gen
+                return gen
+            elif tocexists(TOC._filename(indexname, gen)):
+                return gen
+
+        # We haven't looked before, or the generation we knew about is gone
+        # (for example, the index was recreated), so list the storage
+        gen = TOC._latest_generation(storage, indexname)
+        self._lastgen = gen if gen >= 0 else None
+        return gen
 
     # refresh
     # up_to_date
@@ -472,8 +505,21 @@ class FileIndex(Index):
 
         return self.storage.lock(self.indexname + "_" + name)
 
-    def _read_toc(self):
-        return TOC.read(self.storage, self.indexname, schema=self._schema)
+    def _read_toc(self, cached=True):
+        # Returns the TOC of the latest generation. If cached is True, the TOC
+        # may be shared with other callers, so don't modify it
+        gen = self.latest_generation()
+        if gen < 0:
+            raise EmptyIndexError("Index %r does not exist in %r"
+                                  % (self.indexname, self.storage))
+
+        toc = self._toc
+        if not cached or toc is None or toc.generation != gen:
+            toc = TOC.read(self.storage, self.indexname, gen,
+                           schema=self._schema)
+            if cached:
+                self._toc = toc
+        return toc
 
     def _segments(self):
         return self._read_toc().segments
@@ -500,8 +546,10 @@ class FileIndex(Index):
         from whoosh.reading import SegmentReader, MultiReader, EmptyReader
 
         if reuse:
-            # Merge segments with reuse segments
-            segments.extend([segment for segment in reuse.segments() if segment not in segments])
+            # Merge segments with reuse segments (without modifying the
+            # original list, which may belong to a cached TOC)
+            segments = segments + [segment for segment in reuse.segments()
+                                   if segment not in segments]
 
         reusable = {}
         try:
@@ -123,9 +123,9 @@ def stemmer_for_language(lang):
         from .isri import ISRIStemmer
         return ISRIStemmer().stem
 
-    from .snowball import classes as snowball_classes
-    if tlc in snowball_classes:
-        return snowball_classes[tlc]().stem
+    from . import snowball
+    if tlc in snowball.languages:
+        return snowball.stemmer_class(tlc)().stem
 
     raise NoStemmer("No stemmer available for %r" % lang)
 
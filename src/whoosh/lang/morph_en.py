@@ -887,12 +887,21 @@ rules = (
 
 _partition_size = 20
 _partitions = []
-for p in xrange(0, len(rules) // _partition_size + 1):
-    start = p * _partition_size
-    end = (p + 1) * _partition_size
-    pattern = "|".join("(?P<_g%s>%s)$" % (i, r[0])
-                       for i, r in enumerate(rules[start:end]))
-    _partitions.append(re.compile(pattern))
+
+
+def _compile_partitions():
+    # Compiling the rules is comparatively slow, so it's put off until the
+    # first call to variations()
+    if not _partitions:
+        compiled = []
+        for p in xrange(0, len(rules) // _partition_size + 1):
+            start = p * _partition_size
+            end = (p + 1) * _partition_size
+            pattern = "|".join("(?P<_g%s>%s)$" % (i, r[0])
+                               for i, r in enumerate(rules[start:end]))
+            compiled.append(re.compile(pattern))
+        _partitions[:] = compiled
+    return _partitions
 
 
 def variations(word):
@@ -907,7 +916,7 @@ def variations(word):
     if word in _exdict:
         return _exdict[word].split(" ")
 
-    for i, p in enumerate(_partitions):
+    for i, p in enumerate(_compile_partitions()):
         match = p.search(word)
         if match:
             # Get the named group that matched
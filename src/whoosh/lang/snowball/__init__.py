@@ -39,36 +39,53 @@ creating new stemming algorithms. There is more information available at
 http://snowball.tartarus.org/
 """
 
-from .danish import DanishStemmer
-from .dutch import DutchStemmer
-from .english import EnglishStemmer
-from .finnish import FinnishStemmer
-from .french import FrenchStemmer
-from .german import GermanStemmer
-from .hungarian import HungarianStemmer
-from .italian import ItalianStemmer
-from .norwegian import NorwegianStemmer
-from .portugese import PortugueseStemmer
-from .romanian import RomanianStemmer
-from .russian import RussianStemmer
-from .spanish import SpanishStemmer
-from .swedish import SwedishStemmer
-
-
-# Map two-letter codes to stemming classes
-
-classes = {"da": DanishStemmer,
-           "nl": DutchStemmer,
-           "en": EnglishStemmer,
-           "fi": FinnishStemmer,
-           "fr": FrenchStemmer,
-           "de": GermanStemmer,
-           "hu": HungarianStemmer,
-           "it": ItalianStemmer,
-           "no": NorwegianStemmer,
-           "pt": PortugueseStemmer,
-           "ro": RomanianStemmer,
-           "ru": RussianStemmer,
-           "es": SpanishStemmer,
-           "sv": SwedishStemmer,
-           }
+import sys
+from importlib import import_module
+
+
+# Map two-letter codes to the module and name of the stemming class. The
+# modules are only imported when a stemmer for that language is requested.
+
+_stemmers = {"da": ("danish", "DanishStemmer"),
+             "nl": ("dutch", "DutchStemmer"),
+             "en": ("english", "EnglishStemmer"),
+             "fi": ("finnish", "FinnishStemmer"),
+             "fr": ("french", "FrenchStemmer"),
+             "de": ("german", "GermanStemmer"),
+             "hu": ("hungarian", "HungarianStemmer"),
+             "it": ("italian", "ItalianStemmer"),
+             "no": ("norwegian", "NorwegianStemmer"),
+             "pt": ("portugese", "PortugueseStemmer"),
+             "ro": ("romanian", "RomanianStemmer"),
+             "ru": ("russian", "RussianStemmer"),
+             "es": ("spanish", "SpanishStemmer"),
+             "sv": ("swedish", "SwedishStemmer"),
+             }
+
+languages = frozenset(_stemmers)
+
+
+def stemmer_class(code):
+    """Returns the stemming class for the given two-letter language code,
+    importing only the module for that language. Raises ``KeyError`` if there
+    is no stemmer for the language.
+    """
+
+    modname, clsname = _stemmers[code]
+    return getattr(import_module("." + modname, __name__), clsname)
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name == "classes":
+            # Map two-letter codes to stemming classes
+            return dict((code, stemmer_class(code)) for code in _stemmers)
+        for code, (_, clsname) in _stemmers.items():
+            if clsname == name:
+                return stemmer_class(code)
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+else:
+    # Module-level __getattr__ is not available, so import everything
+    classes = dict((code, stemmer_class(code)) for code in _stemmers)
+    globals().update((cls.__name__, cls) for cls in classes.values())
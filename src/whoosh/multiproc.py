@@ -156,6 +156,12 @@ class SubWriterTask(Process):
 class MpWriter(SegmentWriter):
     def __init__(self, ix, procs=None, batchsize=100, subargs=None,
                  multisegment=False, **kwargs):
+        # The sub-writers' segments are concatenated when they're merged into
+        # one segment, so an index sort only applies if they're kept separate
+        if not multisegment and any(args.get("indexsort") is not None
+                                    for args in (kwargs, subargs or {})):
+            raise ValueError("indexsort requires multisegment=True")
+
         # This is the "main" writer that will aggregate the results created by
         # the sub-tasks
         SegmentWriter.__init__(self, ix, **kwargs)
@@ -166,7 +172,7 @@ class MpWriter(SegmentWriter):
         self.batchsize = batchsize
         # You can use keyword arguments or the "subargs" argument to pass
         # keyword arguments to the sub-writers
-        self.subargs = subargs if subargs else kwargs
+        self.subargs = dict(subargs) if subargs else kwargs
         # If multisegment is True, don't merge the segments created by the
         # sub-writers, just add them directly to the TOC
         self.multisegment = multisegment
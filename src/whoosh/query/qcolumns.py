@@ -25,8 +25,11 @@
 # those of the authors and should not be interpreted as representing official
 # policies, either expressed or implied, of Matt Chaput.
 
-from whoosh.matching import ConstantScoreMatcher, NullMatcher, ReadTooFar
+from whoosh.compat import xrange
+from whoosh.matching import ConstantScoreMatcher, ListMatcher, NullMatcher
+from whoosh.matching import ReadTooFar
 from whoosh.query import Query
+from whoosh.util.loading import optional_numpy
 
 
 class ColumnQuery(Query):
@@ -53,8 +56,66 @@ class ColumnQuery(Query):
     def is_leaf(self):
         return True
 
-    def matcher(self, searcher, context=None):
+    def estimate_size(self, ixreader):
+        return ixreader.doc_count()
+
+    def _bounds(self, fieldobj):
+        # Returns the smallest and largest column values (as stored in the
+        # column) a matching document can have, for skipping parts of the
+        # column using zone maps, or None if the query can't tell
+        condition = self.condition
+        if callable(condition):
+            return None
+        try:
+            v = fieldobj.to_column_value(condition)
+        except Exception:
+            return None
+        return v, v
+
+    def _matcher(self, searcher, comp, translate=True, mask=None):
+        # If mask is given, it's a function that takes a NumPy array of column
+        # values and returns a boolean array of which values match
         fieldname = self.fieldname
+        reader = searcher.reader()
+        if not reader.has_column(fieldname):
+            return NullMatcher()
+
+        runs = None
+        bounds = self._bounds(searcher.schema[fieldname])
+        if bounds is not None:
+            start, end = bounds
+            # Skip the segment if its values are all outside the range
+            colrange = reader.column_range(fieldname)
+            if colrange is not None and not _overlaps(colrange, start, end):
+                return NullMatcher()
+
+            # Only look at the zones of the column that might match
+            zones = reader.zone_map(fieldname)
+            if zones is not None:
+                runs = zones.doc_ranges(start, end)
+                if not runs:
+                    return NullMatcher()
+
+        creader = reader.column_reader(fieldname, translate=translate)
+        # The column has values for deleted documents
+        is_deleted = reader.is_deleted if reader.has_deletions() else None
+
+        np = optional_numpy() if mask is not None else None
+        if np is not None:
+            arr = creader.as_array()
+            if isinstance(arr, np.ndarray):
+                # Check the values with vectorized operations
+                if runs is None:
+                    runs = [(0, len(arr))]
+                ids = [np.flatnonzero(mask(arr[start:end])) + start
+                       for start, end in runs]
+                ids = np.concatenate(ids).tolist()
+                if is_deleted:
+                    ids = [docnum for docnum in ids if not is_deleted(docnum)]
+                return ListMatcher(ids, all_weights=1.0)
+        return ColumnMatcher(creader, comp, runs, is_deleted)
+
+    def matcher(self, searcher, context=None):
         condition = self.condition
         if callable(condition):
             comp = condition
@@ -64,26 +125,167 @@ class ColumnQuery(Query):
                 # debug prints here if necessary ;)
                 return v == condition
 
-        reader = searcher.reader()
-        if not reader.has_column(fieldname):
+        return self._matcher(searcher, comp)
+
+
+class ColumnRange(ColumnQuery):
+    """Matches documents whose value in a field's column is within a range.
+    Unlike :class:`ColumnQuery` with a callable condition, this query can use
+    the minimum and maximum column values recorded for each segment and each
+    zone of the column (see :class:`whoosh.columns.ZoneMap`) to skip the parts
+    of the index that can't contain any matches, which makes it a useful
+    filter on numeric and date fields with sortable columns, especially when
+    the values are correlated with the order documents were added (for
+    example, timestamps).
+
+    Documents without a value in the field have the column's default value
+    (for :class:`whoosh.fields.NUMERIC` fields, the largest possible number
+    unless you gave the field a ``default``), and match if it's in the range.
+
+    >>> # Match documents where the "price" column is from 10 to 20
+    >>> q = ColumnRange("price", 10, 20)
+    """
+
+    def __init__(self, fieldname, start, end, startexcl=False, endexcl=False):
+        """
+        :param fieldname: the name of the field to look in. If the field does
+            not have a column, this query will not match anything.
+        :param start: match values equal to or greater than this value, or
+            None for no lower limit.
+        :param end: match values equal to or less than this value, or None for
+            no upper limit.
+        :param startexcl: if True, the range start is exclusive.
+        :param endexcl: if True, the range end is exclusive.
+        """
+
+        self.fieldname = fieldname
+        self.start = start
+        self.end = end
+        self.startexcl = startexcl
+        self.endexcl = endexcl
+
+    def __repr__(self):
+        return "%s(%r, %r, %r, %s, %s)" % (self.__class__.__name__,
+                                           self.fieldname, self.start,
+                                           self.end, self.startexcl,
+                                           self.endexcl)
+
+    def __eq__(self, other):
+        return (other and self.__class__ is other.__class__
+                and self.fieldname == other.fieldname
+                and self.start == other.start and self.end == other.end
+                and self.startexcl == other.startexcl
+                and self.endexcl == other.endexcl)
+
+    def __hash__(self):
+        return (hash(self.fieldname) ^ hash(self.start) ^ hash(self.end)
+                ^ hash(self.startexcl) ^ hash(self.endexcl))
+
+    def _bounds(self, fieldobj):
+        start = self.start
+        if start is not None:
+            start = fieldobj.to_column_value(start)
+        end = self.end
+        if end is not None:
+            end = fieldobj.to_column_value(end)
+        return start, end
+
+    def matcher(self, searcher, context=None):
+        fieldname = self.fieldname
+        if fieldname not in searcher.schema:
             return NullMatcher()
 
-        creader = reader.column_reader(fieldname)
-        return ColumnMatcher(creader, comp)
+        # Compare the untranslated column values, so the values don't have to
+        # be converted
+        start, end = self._bounds(searcher.schema[fieldname])
+        startexcl = self.startexcl
+        endexcl = self.endexcl
+
+        def comp(v):
+            if start is not None and (v < start or (startexcl and v == start)):
+                return False
+            if end is not None and (v > end or (endexcl and v == end)):
+                return False
+            return True
+
+        def mask(arr):
+            m = None
+            if start is not None:
+                m = arr > start if startexcl else arr >= start
+            if end is not None:
+                m2 = arr < end if endexcl else arr <= end
+                m = m2 if m is None else m & m2
+            if m is None:
+                m = arr == arr
+            return m
+
+        return self._matcher(searcher, comp, translate=False, mask=mask)
+
+
+class RawColumnRange(ColumnRange):
+    """A :class:`ColumnRange` whose start and end are values as stored in the
+    column (for example, the "sortable" representation of a number in a
+    :class:`whoosh.fields.NUMERIC` field), instead of field values. This is
+    used by :class:`whoosh.query.NumericRange` to search the column instead of
+    the field's terms.
+    """
+
+    def _bounds(self, fieldobj):
+        return self.start, self.end
+
+
+def _overlaps(colrange, start, end):
+    # Returns True if the (min, max) range of column values overlaps the range
+    # from start to end (inclusive, None meaning open)
+    lo, hi = colrange
+    return ((start is None or hi >= start) and (end is None or lo <= end))
 
 
 class ColumnMatcher(ConstantScoreMatcher):
-    def __init__(self, creader, condition):
+    def __init__(self, creader, condition, runs=None, exclude=None):
+        """
+        :param creader: the column reader to get values from.
+        :param condition: a function that takes a column value and returns
+            True if the document matches.
+        :param runs: an optional list of ``(startdoc, enddoc)`` tuples. If
+            this is given, only the documents in these ranges are checked.
+        :param exclude: an optional function that takes a document number and
+            returns True if the document should be skipped, for example
+            because it's deleted.
+        """
+
+        ConstantScoreMatcher.__init__(self)
         self.creader = creader
         self.condition = condition
+        self._runs = runs
+        self._exclude = exclude
+        self._runi = 0
         self._i = 0
         self._find_next()
 
     def _find_next(self):
         condition = self.condition
         creader = self.creader
+        doccount = len(creader)
+        runs = self._runs
+        exclude = self._exclude
 
-        while self._i < len(creader) and not condition(creader[self._i]):
+        while self._i < doccount:
+            if runs is not None:
+                # Move to the next run containing a document at or after the
+                # current document
+                while self._runi < len(runs) and runs[self._runi][1] <= self._i:
+                    self._runi += 1
+                if self._runi >= len(runs):
+                    self._i = doccount
+                    break
+                self._i = max(self._i, runs[self._runi][0])
+                if self._i >= doccount:
+                    break
+
+            if condition(creader[self._i]) and not (exclude and
+                                                    exclude(self._i)):
+                break
             self._i += 1
 
     def is_active(self):
@@ -97,6 +299,7 @@ class ColumnMatcher(ConstantScoreMatcher):
 
     def reset(self):
         self._i = 0
+        self._runi = 0
         self._find_next()
 
     def id(self):
@@ -104,9 +307,18 @@ class ColumnMatcher(ConstantScoreMatcher):
 
     def all_ids(self):
         condition = self.condition
-        for docnum, v in enumerate(self.creader):
-            if condition(v):
-                yield docnum
+        creader = self.creader
+        exclude = self._exclude
+        runs = self._runs
+        if runs is None:
+            runs = [(0, len(creader))]
+
+        for startdoc, enddoc in runs:
+            enddoc = min(enddoc, len(creader))
+            for docnum in xrange(startdoc, enddoc):
+                if condition(creader[docnum]) and not (exclude and
+                                                       exclude(docnum)):
+                    yield docnum
 
     def supports(self, astype):
         return False
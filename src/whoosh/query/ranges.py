@@ -224,8 +224,25 @@ class NumericRange(RangeMixin, qcore.Query):
 
     >>> # Match numbers from 10 to 5925 in the "number" field.
     >>> nr = NumericRange("number", 10, 5925)
+
+    If the field is sortable (so it has a column of values), then for each
+    segment the query estimates whether it's cheaper to read the postings of
+    the terms covering the range, or to check the values in the column
+    (skipping the parts of the column that can't match, see
+    :class:`whoosh.columns.ZoneMap`), and uses the cheaper one. The column is
+    only used for segments where it holds the indexed value of every document
+    (see :meth:`whoosh.reading.IndexReader.is_partial_column`), and when the
+    query uses a constant score.
     """
 
+    # Relative costs used to choose between the terms and the column, in units
+    # of reading one posting: the cost of looking up each term in the
+    # expansion, and the cost of checking each document's value in the column
+    # with and without NumPy
+    term_cost = 30.0
+    column_cost = 0.001
+    python_column_cost = 0.4
+
     def __init__(self, fieldname, start, end, startexcl=False, endexcl=False,
                  boost=1.0, constantscore=True):
         """
@@ -265,7 +282,7 @@ class NumericRange(RangeMixin, qcore.Query):
         return self._compile_query(ixreader).estimate_min_size(ixreader)
 
     def docs(self, searcher):
-        q = self._compile_query(searcher.reader())
+        q = self._plan(searcher.reader())
         return q.docs(searcher)
 
     def _compile_query(self, ixreader):
@@ -310,8 +327,91 @@ class NumericRange(RangeMixin, qcore.Query):
             q = wrappers.ConstantScoreQuery(q, self.boost)
         return q
 
+    def _column_bounds(self, ixreader):
+        # Returns the range as a (start, end) tuple of values as stored in the
+        # field's column, or None if the column can't be used instead of the
+        # terms
+        from whoosh.fields import DATETIME
+        from whoosh.util.numeric import to_sortable
+
+        fieldname = self.fieldname
+        field = ixreader.schema[fieldname]
+        if (field.numtype is not int or not field.column_type
+                or not ixreader.has_column(fieldname)
+                or ixreader.is_partial_column(fieldname)):
+            return None
+
+        if isinstance(field, DATETIME):
+            # DATETIME columns hold the (positive) numbers themselves
+            start = 0 if self.start is None else self.start
+            end = field.max_value if self.end is None else self.end
+            return start, end
+
+        start = field.min_value if self.start is None else self.start
+        end = field.max_value if self.end is None else self.end
+        return (to_sortable(int, field.bits, field.signed,
+                            field.prepare_number(start)),
+                to_sortable(int, field.bits, field.signed,
+                            field.prepare_number(end)))
+
+    def _plan(self, ixreader):
+        # Returns the query to run on the given reader: either the expansion
+        # into terms, or a search of the column if that looks cheaper
+        from whoosh.query.qcolumns import RawColumnRange
+        from whoosh.util.loading import optional_numpy
+
+        q = self._compile_query(ixreader)
+        if q is qcore.NullQuery or not self.constantscore:
+            return q
+        bounds = self._column_bounds(ixreader)
+        if bounds is None:
+            return q
+        start, end = bounds
+        fieldname = self.fieldname
+
+        colrange = ixreader.column_range(fieldname)
+        if colrange is not None and (colrange[1] < start or colrange[0] > end):
+            # No document in the reader has a value in the range
+            return qcore.NullQuery
+
+        # Documents without a value have the column's default value, so the
+        # column can't be used if the default is in the range
+        default = ixreader.schema[fieldname].column_type.default_value()
+        if start <= default <= end:
+            return q
+
+        # The cost of the terms is the number of terms plus the number of
+        # postings to read
+        termcount = postcount = 0
+        for leaf in q.leaves():
+            for fname, btext in leaf.expanded_terms(ixreader):
+                termcount += 1
+                postcount += ixreader.doc_frequency(fname, btext)
+        termcost = termcount * self.term_cost + postcount
+
+        # The cost of the column is the number of documents in the zones of
+        # the column that might match
+        doccount = ixreader.doc_count_all()
+        zones = ixreader.zone_map(fieldname)
+        if zones is not None:
+            scancount = sum(min(e, doccount) - s
+                            for s, e in zones.doc_ranges(start, end))
+        else:
+            scancount = doccount
+        if optional_numpy() is not None:
+            colcost = scancount * self.column_cost
+        else:
+            colcost = scancount * self.python_column_cost
+
+        if colcost >= termcost:
+            return q
+        startexcl = self.startexcl and self.start is not None
+        endexcl = self.endexcl and self.end is not None
+        colq = RawColumnRange(fieldname, start, end, startexcl, endexcl)
+        return wrappers.ConstantScoreQuery(colq, self.boost)
+
     def matcher(self, searcher, context=None):
-        q = self._compile_query(searcher.reader())
+        q = self._plan(searcher.reader())
         return q.matcher(searcher, context)
 
 
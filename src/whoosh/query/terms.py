@@ -33,7 +33,6 @@ import re
 from whoosh import matching
 from whoosh.analysis import Token
 from whoosh.compat import bytes_type, text_type, u
-from whoosh.lang.morph_en import variations
 from whoosh.query import qcore
 
 
@@ -511,6 +510,8 @@ class Variations(ExpandingTerm):
         return hash(self.fieldname) ^ hash(self.text) ^ hash(self.boost)
 
     def _btexts(self, ixreader):
+        from whoosh.lang.morph_en import variations
+
         fieldname = self.fieldname
         to_bytes = ixreader.schema[fieldname].to_bytes
         for word in variations(self.text):
@@ -30,13 +30,17 @@
 
 from math import log
 from bisect import bisect_right
+from collections import defaultdict
 from heapq import heapify, heapreplace, heappop, nlargest
 
-from cached_property import cached_property
+try:
+    from functools import cached_property
+except ImportError:
+    from cached_property import cached_property
 
 from whoosh import columns
 from whoosh.compat import abstractmethod
-from whoosh.compat import xrange, zip_, next, iteritems
+from whoosh.compat import izip, xrange, zip_, next, iteritems
 from whoosh.filedb.filestore import OverlayStorage
 from whoosh.matching import MultiMatcher
 from whoosh.support.levenshtein import distance
@@ -199,6 +203,29 @@ class IndexReader(object):
 
         pass
 
+    def warm(self, fields=None, columns=None):
+        """Opens this reader's files and asks the operating system to start
+        loading the given parts of them into memory (for example, using
+        ``madvise(MADV_WILLNEED)`` on memory mapped files), so the first
+        searches don't have to wait on disk reads. This is useful to prepare
+        a reader before it starts serving latency-sensitive searches.
+
+        >>> reader = myindex.reader()
+        >>> reader.warm(fields=["title", "content"], columns=["date"])
+
+        Loading happens in the background, so this method returns before the
+        data is actually in memory.
+
+        :param fields: a list of field names whose terms and postings should
+            be loaded. The default (None) loads all fields.
+        :param columns: a list of field names whose columns (for sorting,
+            faceting, etc.) should be loaded. The default (None) loads all
+            columns, including the stored fields and field lengths. Use an
+            empty list to not load any columns.
+        """
+
+        pass
+
     def generation(self):
         """Returns the generation of the index being read, or -1 if the backend
         is not versioned.
@@ -341,15 +368,38 @@ class IndexReader(object):
         raise NotImplementedError
 
     @abstractmethod
-    def stored_fields(self, docnum):
+    def stored_fields(self, docnum, fieldnames=None):
         """Returns the stored fields for the given document number.
 
-        :param numerickeys: use field numbers as the dictionary keys instead of
-            field names.
+        :param fieldnames: if given, only return the values of the fields with
+            these names. When the index stores fields in a format that allows
+            it, the other fields' values aren't even decoded, so this can save
+            a lot of time if a document has large stored fields you don't
+            need.
         """
 
         raise NotImplementedError
 
+    def stored_fields_many(self, docnums, fieldnames=None):
+        """Returns a list of the stored fields for each of the given document
+        numbers, in the same order as ``docnums``.
+
+        The documents are read in document number order (and grouped by
+        segment), so this is usually much faster than calling
+        :meth:`IndexReader.stored_fields` for each document in turn, for
+        example to display a page of search results.
+
+        :param docnums: a sequence of document numbers.
+        :param fieldnames: if given, only return the values of the fields with
+            these names.
+        """
+
+        docnums = list(docnums)
+        result = [None] * len(docnums)
+        for i in sorted(xrange(len(docnums)), key=docnums.__getitem__):
+            result[i] = self.stored_fields(docnums[i], fieldnames)
+        return result
+
     def all_stored_fields(self):
         """Yields the stored fields for all non-deleted documents.
         """
@@ -548,11 +598,28 @@ class IndexReader(object):
             if k <= maxdist:
                 yield word
 
+    def prefix_top_terms(self, fieldname, prefix):
+        """Returns the precomputed most frequent terms starting with the given
+        prefix as a ``(complete, [(frequency, btext), ...])`` tuple, where the
+        list is sorted from most to least frequent and ``complete`` is True if
+        the list contains every term with the prefix. Returns None if the
+        backend has no precomputed list for this field and prefix (see the
+        ``completion`` field attribute).
+        """
+
+        return None
+
     def most_frequent_terms(self, fieldname, number=5, prefix=''):
         """Returns the top 'number' most frequent terms in the given field as a
         list of (frequency, text) tuples.
         """
 
+        top = self.prefix_top_terms(fieldname, prefix)
+        if top is not None:
+            complete, items = top
+            if complete or number <= len(items):
+                return items[:number]
+
         gen = ((terminfo.weight(), text) for text, terminfo
                in self.iter_prefix(fieldname, prefix))
         return nlargest(number, gen)
@@ -598,10 +665,75 @@ class IndexReader(object):
 
         raise NotImplementedError
 
+    def column_range(self, fieldname):
+        """Returns a tuple of the minimum and maximum values in the given
+        field's column, as stored in the column (that is, not translated by
+        the field's ``from_column_value()`` method), or None if the range
+        isn't known.
+
+        Queries can use this to skip a whole segment if the values they're
+        looking for are outside the range.
+        """
+
+        return None
+
+    def zone_map(self, fieldname):
+        """Returns a :class:`whoosh.columns.ZoneMap` with the minimum and
+        maximum column value of each run of documents, or None if the codec
+        didn't record one for the given field.
+        """
+
+        return None
+
+    def is_partial_column(self, fieldname):
+        """Returns False if the given field's column is known to hold the
+        indexed value of every document that has a value in the field, so
+        the column can be searched instead of the field's terms. Returns True
+        if some documents have values that aren't in the column (for example,
+        documents with several values in the field, since the column only
+        holds the first), or if the codec didn't record this.
+        """
+
+        return True
+
+    def column_ordinals(self, fieldname):
+        """Returns a :class:`whoosh.columns.GlobalOrdinals` object mapping the
+        column values of the given field in every segment of this reader to
+        integers that sort in the same order as the values.
+
+        The mapping is built the first time it is requested and then cached on
+        this reader, so it is shared by every search on this generation of the
+        index.
+
+        :param fieldname: the name of the field for which to get ordinals.
+        """
+
+        try:
+            cache = self._ordinals_cache
+        except AttributeError:
+            cache = self._ordinals_cache = {}
+
+        try:
+            return cache[fieldname]
+        except KeyError:
+            creaders = [r.column_reader(fieldname, translate=False)
+                        for r, _ in self.leaf_readers()]
+            gords = columns.GlobalOrdinals.from_readers(creaders)
+            cache[fieldname] = gords
+            return gords
+
 
 # Segment-based reader
 
 class SegmentReader(IndexReader):
+    """Reads a single segment of an index.
+
+    The reader opens the segment's files when it's created, so it keeps
+    working if a later commit deletes them, but the codec doesn't parse the
+    term index until it's first needed, so opening a reader is cheap. Use
+    :meth:`IndexReader.warm` to load the files ahead of time.
+    """
+
     def __init__(self, storage, schema, segment, generation=None, codec=None):
         self.schema = schema
         self.is_closed = False
@@ -640,20 +772,23 @@ class SegmentReader(IndexReader):
     def storage(self):
         return self._storage
 
+    # The segment object records the document counts, so get them from it
+    # directly instead of opening the segment's files to ask the codec
+
     def has_deletions(self):
         if self.is_closed:
             raise ReaderClosed
-        return self._perdoc.has_deletions()
+        return self._segment.has_deletions()
 
     def doc_count(self):
         if self.is_closed:
             raise ReaderClosed
-        return self._perdoc.doc_count()
+        return self._segment.doc_count()
 
     def doc_count_all(self):
         if self.is_closed:
             raise ReaderClosed
-        return self._perdoc.doc_count_all()
+        return self._segment.doc_count_all()
 
     def is_deleted(self, docnum):
         if self.is_closed:
@@ -689,15 +824,29 @@ class SegmentReader(IndexReader):
 
         self.is_closed = True
 
-    def stored_fields(self, docnum):
+    def warm(self, fields=None, columns=None):
+        if self.is_closed:
+            raise ReaderClosed
+        self._terms.warm(fields)
+        self._perdoc.warm(columns)
+
+    def stored_fields(self, docnum, fieldnames=None):
         if self.is_closed:
             raise ReaderClosed
         assert docnum >= 0
         schema = self.schema
-        sfs = self._perdoc.stored_fields(docnum)
+        sfs = self._perdoc.stored_fields(docnum, fieldnames)
         # Double-check with schema to filter out removed fields
         return dict(item for item in iteritems(sfs) if item[0] in schema)
 
+    def stored_fields_many(self, docnums, fieldnames=None):
+        if self.is_closed:
+            raise ReaderClosed
+        schema = self.schema
+        return [dict(item for item in iteritems(sfs) if item[0] in schema)
+                for sfs in self._perdoc.stored_fields_many(docnums,
+                                                           fieldnames)]
+
     # Delegate doc methods to the per-doc reader
 
     def all_doc_ids(self):
@@ -785,6 +934,11 @@ class SegmentReader(IndexReader):
         self._test_field(fieldname)
         return IndexReader.lexicon(self, fieldname)
 
+    def prefix_top_terms(self, fieldname, prefix):
+        self._test_field(fieldname)
+        prefix = self._text_to_bytes(fieldname, prefix)
+        return self._terms.prefix_top_terms(fieldname, prefix)
+
     def __iter__(self):
         if self.is_closed:
             raise ReaderClosed
@@ -895,10 +1049,39 @@ class SegmentReader(IndexReader):
             # Wrap the column in a Translator to give the caller
             # nice values instead of sortable representations
             fcv = fieldobj.from_column_value
-            creader = columns.TranslatingColumnReader(creader, fcv)
+            fca = fieldobj.from_column_array
+            creader = columns.TranslatingColumnReader(creader, fcv, fca)
 
         return creader
 
+    def column_range(self, fieldname):
+        if self.is_closed:
+            raise ReaderClosed
+
+        column = self.schema[fieldname].column_type
+        if not column:
+            return None
+        if not self._perdoc.has_column(fieldname):
+            # Every document has the default value
+            default = column.default_value()
+            return default, default
+        return self._perdoc.column_range(fieldname)
+
+    def zone_map(self, fieldname):
+        if self.is_closed:
+            raise ReaderClosed
+        if not self.has_column(fieldname):
+            return None
+        return self._perdoc.zone_map(fieldname)
+
+    def is_partial_column(self, fieldname):
+        if self.is_closed:
+            raise ReaderClosed
+        if not self._perdoc.has_column(fieldname):
+            # The field may not have had a column when the segment was written
+            return True
+        return self._perdoc.is_partial_column(fieldname)
+
 
 # Fake IndexReader class for empty indexes
 
@@ -947,7 +1130,7 @@ class EmptyReader(IndexReader):
     def is_deleted(self, docnum):
         return False
 
-    def stored_fields(self, docnum):
+    def stored_fields(self, docnum, fieldnames=None):
         raise KeyError("No document number %s" % docnum)
 
     def all_stored_fields(self):
@@ -1044,6 +1227,10 @@ class MultiReader(IndexReader):
             d.close()
         self.is_closed = True
 
+    def warm(self, fields=None, columns=None):
+        for r in self.readers:
+            r.warm(fields=fields, columns=columns)
+
     def generation(self):
         return self._gen
 
@@ -1142,6 +1329,34 @@ class MultiReader(IndexReader):
     def frequency(self, fieldname, text):
         return sum(r.frequency(fieldname, text) for r in self.readers)
 
+    def prefix_top_terms(self, fieldname, prefix):
+        # Combine the per-segment lists. A term missing from every segment's
+        # list can have a total frequency of at most the sum of the lowest
+        # frequencies in the incomplete lists, so the combined list is only
+        # trustworthy down to that bound
+        tops = [r.prefix_top_terms(fieldname, prefix) for r in self.readers]
+        if not tops or any(top is None for top in tops):
+            return None
+
+        candidates = set()
+        bound = 0
+        for complete, items in tops:
+            candidates.update(btext for _, btext in items)
+            if not complete:
+                bound += items[-1][0]
+
+        frequency = self.frequency
+        items = sorted(((frequency(fieldname, btext), btext)
+                        for btext in candidates), reverse=True)
+        if bound:
+            # Cut the list at the first term that an unlisted term could tie
+            # or beat
+            cut = 0
+            while cut < len(items) and items[cut][0] > bound:
+                cut += 1
+            return False, items[:cut]
+        return True, items
+
     def doc_frequency(self, fieldname, text):
         return sum(r.doc_frequency(fieldname, text) for r in self.readers)
 
@@ -1187,9 +1402,26 @@ class MultiReader(IndexReader):
         segmentnum, segmentdoc = self._segment_and_docnum(docnum)
         return self.readers[segmentnum].is_deleted(segmentdoc)
 
-    def stored_fields(self, docnum):
+    def stored_fields(self, docnum, fieldnames=None):
         segmentnum, segmentdoc = self._segment_and_docnum(docnum)
-        return self.readers[segmentnum].stored_fields(segmentdoc)
+        return self.readers[segmentnum].stored_fields(segmentdoc, fieldnames)
+
+    def stored_fields_many(self, docnums, fieldnames=None):
+        # Group the document numbers by segment
+        docnums = list(docnums)
+        groups = defaultdict(list)
+        for i, docnum in enumerate(docnums):
+            segmentnum, segmentdoc = self._segment_and_docnum(docnum)
+            groups[segmentnum].append((i, segmentdoc))
+
+        result = [None] * len(docnums)
+        for segmentnum in sorted(groups):
+            group = groups[segmentnum]
+            reader = self.readers[segmentnum]
+            sfs = reader.stored_fields_many([d for _, d in group], fieldnames)
+            for (i, _), fields in izip(group, sfs):
+                result[i] = fields
+        return result
 
     # Columns
 
@@ -1198,15 +1430,23 @@ class MultiReader(IndexReader):
 
     def column_reader(self, fieldname, column=None, reverse=False,
                       translate=True):
-        crs = []
-        doc_offsets = []
-        for i, r in enumerate(self.readers):
-            if r.has_column(fieldname):
-                cr = r.column_reader(fieldname, column=column, reverse=reverse,
-                                     translate=translate)
-                crs.append(cr)
-                doc_offsets.append(self.doc_offsets[i])
-        return columns.MultiColumnReader(crs, doc_offsets)
+        if not self.has_column(fieldname):
+            return columns.MultiColumnReader([], [])
+        # Segments without values for the field return readers of the default
+        # value, so the sub-readers cover every document
+        crs = [r.column_reader(fieldname, column=column, reverse=reverse,
+                               translate=translate)
+               for r in self.readers]
+        return columns.MultiColumnReader(crs, self.doc_offsets)
+
+    def column_range(self, fieldname):
+        ranges = [r.column_range(fieldname) for r in self.readers]
+        if not ranges or None in ranges:
+            return None
+        return min(lo for lo, _ in ranges), max(hi for _, hi in ranges)
+
+    def is_partial_column(self, fieldname):
+        return any(r.is_partial_column(fieldname) for r in self.readers)
 
     # Per doc methods
 
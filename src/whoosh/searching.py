@@ -31,10 +31,16 @@
 
 from __future__ import division
 import copy
+import logging
+import sys
+import threading
 import weakref
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
 from math import ceil
 
-from whoosh import classify, highlight, query, scoring
+from whoosh import classify, highlight, query, scoring, sorting
 from whoosh.compat import iteritems, itervalues, iterkeys, xrange
 from whoosh.idsets import DocIdSet, BitSet
 from whoosh.reading import TermNotFound
@@ -103,7 +109,7 @@ class Searcher(object):
     """
 
     def __init__(self, reader, weighting=scoring.BM25F, closereader=True,
-                 fromindex=None, parent=None):
+                 fromindex=None, parent=None, resultcache=None):
         """
         :param reader: An :class:`~whoosh.reading.IndexReader` object for
             the index to search.
@@ -114,12 +120,16 @@ class Searcher(object):
         :param fromindex: An optional reference to the index of the underlying
             reader. This is required for :meth:`Searcher.up_to_date` and
             :meth:`Searcher.refresh` to work.
+        :param resultcache: an optional :class:`ResultCache` object. If given,
+            :meth:`Searcher.search` returns cached results for searches that
+            were already run on the same version of the index.
         """
 
         self.ixreader = reader
         self.is_closed = False
         self._closereader = closereader
         self._ix = fromindex
+        self._resultcache = resultcache
         self._doccount = self.ixreader.doc_count_all()
         # Cache for PostingCategorizer objects (supports fields without columns)
         self._field_caches = {}
@@ -148,7 +158,8 @@ class Searcher(object):
                                  in self.leafreaders]
 
         # Copy attributes/methods from wrapped reader
-        for name in ("stored_fields", "all_stored_fields", "has_vector",
+        for name in ("stored_fields", "stored_fields_many",
+                     "all_stored_fields", "has_vector",
                      "vector", "vector_as", "lexicon", "field_terms",
                      "frequency", "doc_frequency", "term_info",
                      "doc_field_length", "corrector", "iter_docs"):
@@ -249,7 +260,8 @@ class Searcher(object):
         self.is_closed = True
         newreader = self._ix.reader(reuse=self.ixreader)
         return self.__class__(newreader, fromindex=self._ix,
-                              weighting=self.weighting)
+                              weighting=self.weighting,
+                              resultcache=self._resultcache)
 
     def close(self):
         if self._closereader:
@@ -615,12 +627,17 @@ class Searcher(object):
 
             results = searcher.search_page(q, 2, sortedby="date", reverse=True)
 
-        Currently, searching for page 100 with pagelen of 10 takes the same
-        amount of time as using :meth:`Searcher.search` to find the first 1000
-        results. That is, this method does not have any special optimizations
-        or efficiencies for getting a page from the middle of the full results
-        list. (A future enhancement may allow using previous page results to
-        improve the efficiency of finding the next page.)
+        Searching for page 100 with pagelen of 10 takes the same amount of
+        time as using :meth:`Searcher.search` to find the first 1000 results.
+        If you're stepping through the pages in order, pass the cursor from
+        the previous page's :meth:`ResultsPage.next_cursor` as the
+        ``search_after`` keyword argument, and this method will only collect
+        the documents on the requested page::
+
+            page = searcher.search_page(q, 1)
+            while not page.is_last_page():
+                page = searcher.search_page(q, page.pagenum + 1,
+                                            search_after=page.next_cursor())
 
         This method will raise a ``ValueError`` if you ask for a page number
         higher than the number of pages in the resulting query.
@@ -635,6 +652,10 @@ class Searcher(object):
         if pagenum < 1:
             raise ValueError("pagenum must be >= 1")
 
+        if kwargs.get("search_after") is not None:
+            results = self.search(query, limit=pagelen, **kwargs)
+            return ResultsPage(results, pagenum, pagelen, startpage=pagenum)
+
         results = self.search(query, limit=pagenum * pagelen, **kwargs)
         return ResultsPage(results, pagenum, pagelen)
 
@@ -668,7 +689,7 @@ class Searcher(object):
     def collector(self, limit=10, sortedby=None, reverse=False, groupedby=None,
                   collapse=None, collapse_limit=1, collapse_order=None,
                   optimize=True, filter=None, mask=None, terms=False,
-                  maptype=None, scored=True):
+                  maptype=None, scored=True, search_after=None):
         """Low-level method: returns a configured
         :class:`whoosh.collectors.Collector` object based on the given
         arguments. You can use this object with
@@ -703,17 +724,23 @@ class Searcher(object):
             raise ValueError("limit must be >= 1")
 
         if not scored and not sortedby:
-            c = collectors.UnsortedCollector()
+            c = collectors.UnsortedCollector(search_after=search_after)
         elif sortedby:
+            # Collapsing removes documents from the sorting collector, so it
+            # can't forget documents that fall out of the top N
             c = collectors.SortingCollector(sortedby, limit=limit,
-                                            reverse=reverse)
+                                            reverse=reverse,
+                                            bounded=not collapse,
+                                            search_after=search_after)
         elif groupedby or reverse or not limit or limit >= self.doc_count():
             # A collector that gathers every matching document
-            c = collectors.UnlimitedCollector(reverse=reverse)
+            c = collectors.UnlimitedCollector(reverse=reverse,
+                                              search_after=search_after)
         else:
             # A collector that uses block quality optimizations and a heap
             # queue to only collect the top N documents
-            c = collectors.TopCollector(limit, usequality=optimize)
+            c = collectors.TopCollector(limit, usequality=optimize,
+                                        search_after=search_after)
 
         if groupedby:
             c = collectors.FacetCollector(c, groupedby, maptype=maptype)
@@ -775,16 +802,48 @@ class Searcher(object):
             to control which documents are kept when collapsing. The default
             (``collapse_order=None``) uses the results order (e.g. the highest
             scoring documents in a scored search).
+        :param search_after: a cursor returned by
+            :meth:`Results.next_cursor` from a previous search with the same
+            query and options. The results will only contain documents that
+            come after the cursor in the results order, so you can page
+            through a large result set without collecting all the previous
+            pages again. Cursors contain document numbers, so they're only
+            valid for the same searcher (or an index that hasn't changed).
+        :param fields: a list of the names of the stored fields to load for
+            each hit. By default, :meth:`Hit.fields` loads all of a
+            document's stored fields. Limiting the fields means large stored
+            values you don't display (such as the body of a document) aren't
+            read or decoded. Accessing a field that isn't in the list on a
+            :class:`Hit` still works, but loads the value separately.
         :rtype: :class:`Results`
         """
 
+        # The stored field projection doesn't affect which documents match
+        fieldnames = kwargs.pop("fields", None)
+
+        # If this searcher has a result cache, check if the same search was
+        # already run on this version of the index
+        cache = self._resultcache
+        key = None
+        if cache is not None:
+            key = cache.key(self, q, kwargs)
+            if key is not None:
+                r = cache.get(self, q, key, fieldnames)
+                if r is not None:
+                    return r
+
         # Call the collector() method to build a collector based on the
         # parameters passed to this method
         c = self.collector(**kwargs)
         # Call the lower-level method to run the collector
         self.search_with_collector(q, c)
-        # Return the results object from the collector
-        return c.results()
+        # Get the results object from the collector
+        r = c.results()
+        r.fieldnames = fieldnames
+
+        if key is not None:
+            cache.put(key, r)
+        return r
 
     def search_with_collector(self, q, collector, context=None):
         """Low-level method: runs a :class:`whoosh.query.Query` object on this
@@ -940,16 +999,27 @@ class Results(object):
     Note that a Results object keeps a reference to the Searcher that created
     it, so keeping a reference to a Results object keeps the Searcher alive and
     so keeps all files used by it open.
+
+    When you iterate over the results (or a slice of them, or a
+    :class:`ResultsPage`), the stored fields of the hits are loaded together,
+    in groups of up to ``prefetch`` hits, using
+    :meth:`whoosh.reading.IndexReader.stored_fields_many` the first time any
+    hit in the group needs them.
     """
 
+    # The maximum number of hits to load stored fields for at once
+    prefetch = 50
+
     def __init__(self, searcher, q, top_n, docset=None, facetmaps=None,
-                 runtime=0, highlighter=None):
+                 runtime=0, highlighter=None, fieldnames=None):
         """
         :param searcher: the :class:`Searcher` object that produced these
             results.
         :param query: the original query that created these results.
         :param top_n: a list of (score, docnum) tuples representing the top
             N search results.
+        :param fieldnames: the names of the stored fields to load for each
+            hit, or None to load all stored fields.
         """
 
         self.searcher = searcher
@@ -962,6 +1032,9 @@ class Results(object):
         self.collector = None
         self._total = None
         self._char_cache = {}
+        # The names of the stored fields to load for each hit, or None to
+        # load all stored fields
+        self.fieldnames = fieldnames
 
     def __repr__(self):
         return "<Top %s Results for %r runtime=%s>" % (len(self.top_n),
@@ -989,8 +1062,7 @@ class Results(object):
     def __getitem__(self, n):
         if isinstance(n, slice):
             start, stop, step = n.indices(len(self.top_n))
-            return [Hit(self, self.top_n[i][1], i, self.top_n[i][0])
-                    for i in xrange(start, stop, step)]
+            return list(self._hits(xrange(start, stop, step)))
         else:
             if n >= len(self.top_n):
                 raise IndexError("results[%r]: Results only has %s hits"
@@ -1001,8 +1073,24 @@ class Results(object):
         """Yields a :class:`Hit` object for each result in ranked order.
         """
 
-        for i in xrange(len(self.top_n)):
-            yield Hit(self, self.top_n[i][1], i, self.top_n[i][0])
+        return self._hits(xrange(len(self.top_n)))
+
+    def _hits(self, positions):
+        # Yields Hit objects for the given positions, sharing a _HitGroup
+        # between every group of hits so their stored fields can be loaded
+        # together
+        top_n = self.top_n
+        positions = list(positions)
+        size = self.prefetch
+        for gstart in xrange(0, len(positions), size):
+            gpositions = positions[gstart:gstart + size]
+            group = _HitGroup(self, [top_n[i][1] for i in gpositions])
+            for j, i in enumerate(gpositions):
+                score, docnum = top_n[i]
+                hit = Hit(self, docnum, i, score)
+                hit._group = group
+                hit._groupindex = j
+                yield hit
 
     def __contains__(self, docnum):
         """Returns True if the given document number matched the query.
@@ -1028,13 +1116,19 @@ class Results(object):
 
         return ((docnum, score) for score, docnum in self.top_n)
 
-    def fields(self, n):
+    def fields(self, n, fieldnames=None):
         """Returns the stored fields for the document at the ``n`` th position
         in the results. Use :meth:`Results.docnum` if you want the raw
         document number instead of the stored fields.
+
+        :param fieldnames: if given, only load the values of the stored
+            fields with these names. The default is the list of fields passed
+            to :meth:`Searcher.search` with the ``fields`` keyword, if any.
         """
 
-        return self.searcher.stored_fields(self.top_n[n][1])
+        if fieldnames is None:
+            fieldnames = self.fieldnames
+        return self.searcher.stored_fields(self.top_n[n][1], fieldnames)
 
     def facet_names(self):
         """Returns the available facet names, for use with the ``groups()``
@@ -1139,6 +1233,20 @@ class Results(object):
 
         return len(self.top_n)
 
+    def next_cursor(self):
+        """Returns a cursor representing the last scored document in these
+        results, which you can pass as the ``search_after`` keyword argument
+        to :meth:`Searcher.search` to get the next set of results. Returns
+        None if there are no scored documents.
+
+        The cursor is a ``(sortkey, docnum)`` tuple, where ``sortkey`` is the
+        score in a scored search or the sort key in a sorted search.
+        """
+
+        if not self.top_n:
+            return None
+        return tuple(self.top_n[-1])
+
     def docs(self):
         """Returns a set-like object containing the document numbers that
         matched the query.
@@ -1383,16 +1491,42 @@ class Hit(object):
         self.docnum = docnum
         self.score = score
         self._fields = None
+        # A _HitGroup object the Results object may set so the stored fields
+        # of many hits are loaded at once
+        self._group = None
+        self._groupindex = None
 
-    def fields(self):
+    def fields(self, fieldnames=None):
         """Returns a dictionary of the stored fields of the document this
         object represents.
+
+        :param fieldnames: if given, only load the values of the stored
+            fields with these names. The default is the list of fields passed
+            to :meth:`Searcher.search` with the ``fields`` keyword, if any,
+            otherwise all stored fields.
         """
 
+        if fieldnames is not None:
+            if self._fields is not None and self.results.fieldnames is None:
+                # All the fields are already loaded
+                return dict((k, self._fields[k]) for k in fieldnames
+                            if k in self._fields)
+            return self.searcher.stored_fields(self.docnum, fieldnames)
+
         if self._fields is None:
-            self._fields = self.searcher.stored_fields(self.docnum)
+            if self._group is not None:
+                self._fields = self._group.fields(self._groupindex)
+            else:
+                self._fields = self.searcher.stored_fields(
+                    self.docnum, self.results.fieldnames)
         return self._fields
 
+    def _unloaded_field(self, fieldname):
+        # Returns True if the given field might be stored but wasn't loaded
+        # because the results are limited to certain fields
+        fieldnames = self.results.fieldnames
+        return fieldnames is not None and fieldname not in fieldnames
+
     def matched_terms(self):
         """Returns the set of ``("fieldname", "text")`` tuples representing
         terms from the query that matched in this document. You can
@@ -1505,6 +1639,11 @@ class Hit(object):
         if fieldname in self.fields():
             return self._fields[fieldname]
 
+        if self._unloaded_field(fieldname):
+            extra = self.fields([fieldname])
+            if fieldname in extra:
+                return extra[fieldname]
+
         reader = self.reader
         if reader.has_column(fieldname):
             cr = reader.column_reader(fieldname)
@@ -1514,6 +1653,7 @@ class Hit(object):
 
     def __contains__(self, key):
         return (key in self.fields()
+                or (self._unloaded_field(key) and key in self.fields([key]))
                 or self.reader.has_column(key))
 
     def items(self):
@@ -1535,7 +1675,10 @@ class Hit(object):
         return itervalues(self.fields())
 
     def get(self, key, default=None):
-        return self.fields().get(key, default)
+        fields = self.fields()
+        if key not in fields and self._unloaded_field(key):
+            fields = self.fields([key])
+        return fields.get(key, default)
 
     def __setitem__(self, key, value):
         raise NotImplementedError("You cannot modify a search result")
@@ -1550,6 +1693,23 @@ class Hit(object):
         raise NotImplementedError("You cannot modify a search result")
 
 
+class _HitGroup(object):
+    # Loads the stored fields of a group of hits from the same Results object
+    # the first time any of the hits needs them
+
+    def __init__(self, results, docnums):
+        self.results = results
+        self.docnums = docnums
+        self._fields = None
+
+    def fields(self, i):
+        if self._fields is None:
+            results = self.results
+            self._fields = results.searcher.stored_fields_many(
+                self.docnums, results.fieldnames)
+        return self._fields[i]
+
+
 class ResultsPage(object):
     """Represents a single page out of a longer list of results, as returned
     by :func:`whoosh.searching.Searcher.search_page`. Supports a subset of the
@@ -1595,11 +1755,14 @@ class ResultsPage(object):
 
     """
 
-    def __init__(self, results, pagenum, pagelen=10):
+    def __init__(self, results, pagenum, pagelen=10, startpage=1):
         """
         :param results: a :class:`~whoosh.searching.Results` object.
         :param pagenum: which page of the results to use, numbered from ``1``.
         :param pagelen: the number of hits per page.
+        :param startpage: the page number of the first hit in ``results``.
+            This is only different from ``1`` if the results were collected
+            after a ``search_after`` cursor.
         """
 
         self.results = results
@@ -1612,13 +1775,17 @@ class ResultsPage(object):
         self.pagenum = min(self.pagecount, pagenum)
 
         offset = (self.pagenum - 1) * pagelen
+        # The position of the page's first hit in the results object
+        self._start = offset - (startpage - 1) * pagelen
         if (offset + pagelen) > self.total:
             pagelen = self.total - offset
         self.offset = offset
+        if startpage > 1:
+            pagelen = min(pagelen, results.scored_length() - self._start)
         self.pagelen = pagelen
 
     def __getitem__(self, n):
-        offset = self.offset
+        offset = self._start
         if isinstance(n, slice):
             start, stop, step = n.indices(self.pagelen)
             return self.results.__getitem__(slice(start + offset,
@@ -1627,7 +1794,8 @@ class ResultsPage(object):
             return self.results.__getitem__(n + offset)
 
     def __iter__(self):
-        return iter(self.results[self.offset:self.offset + self.pagelen])
+        start = self._start
+        return iter(self.results[start:start + self.pagelen])
 
     def __len__(self):
         return self.total
@@ -1638,16 +1806,556 @@ class ResultsPage(object):
     def score(self, n):
         """Returns the score of the hit at the nth position on this page.
         """
-        return self.results.score(n + self.offset)
+        return self.results.score(n + self._start)
 
     def docnum(self, n):
         """Returns the document number of the hit at the nth position on this
         page.
         """
-        return self.results.docnum(n + self.offset)
+        return self.results.docnum(n + self._start)
 
     def is_last_page(self):
         """Returns True if this object represents the last page of results.
         """
 
         return self.pagecount == 0 or self.pagenum == self.pagecount
+
+    def next_cursor(self):
+        """Returns a cursor representing the last hit on this page, which you
+        can pass as the ``search_after`` keyword argument to
+        :meth:`Searcher.search_page` to get the next page without collecting
+        this one again. Returns None if the page is empty.
+        """
+
+        if self.pagelen <= 0:
+            return None
+        return tuple(self.results.top_n[self._start + self.pagelen - 1])
+
+
+# Searcher management
+
+class SearcherManager(object):
+    """Shares searchers for the latest version of an index between threads,
+    for example the request handlers of a web application::
+
+        manager = SearcherManager(myindex, refresh_interval=5.0)
+
+        def handle_request(request):
+            with manager.searcher() as s:
+                return s.search(parse(request["q"]))
+
+    Each call to :meth:`SearcherManager.acquire` returns the current searcher
+    and increments its reference count, and :meth:`SearcherManager.release`
+    decrements it. When the manager switches to a newer version of the index,
+    the old searcher stays open until every thread that acquired it releases
+    it.
+
+    When the manager opens a searcher for a new version of the index, it
+    reuses the open readers of segments that haven't changed (along with
+    any caches they hold), so refreshing after a small commit only opens the
+    new segments.
+
+    If you pass ``refresh_interval``, a background thread checks for a new
+    version of the index at that interval. You can also call
+    :meth:`SearcherManager.request_refresh` (for example, from a file system
+    change notification or after committing a writer) to wake the thread up
+    immediately, or call :meth:`SearcherManager.maybe_refresh` yourself.
+    Errors in the background thread are logged to the ``whoosh.searching``
+    logger and the thread tries again at the next interval.
+    """
+
+    def __init__(self, ix, refresh_interval=None, **kwargs):
+        """
+        :param ix: the :class:`whoosh.index.Index` to search.
+        :param refresh_interval: if not None, the number of seconds between
+            checks for a new version of the index in a background thread.
+        :param kwargs: additional keyword arguments are passed to the
+            :class:`Searcher` objects the manager creates.
+        """
+
+        self.ix = ix
+        self.searcher_args = kwargs
+        self.refresh_interval = refresh_interval
+        self.is_closed = False
+
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        # Maps each open searcher to its reference count (the current
+        # searcher holds an extra reference for the manager)
+        self._refs = {}
+        # Maps (segment ID, deleted count, field names) keys to [reader,
+        # refcount] lists, where the refcount is the number of open searchers
+        # using the reader
+        self._segreaders = {}
+        self._searcher_keys = {}
+        self._current = None
+        self._generation = None
+
+        self._swap(*self._open_searcher())
+
+        self._thread = None
+        self._wakeup = threading.Event()
+        if refresh_interval is not None:
+            self._thread = threading.Thread(target=self._run,
+                                            name="SearcherManager")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        # Background thread that refreshes the searcher periodically
+        while True:
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if self.is_closed:
+                break
+            try:
+                self.maybe_refresh()
+            except Exception:
+                # Don't let a temporary error (for example, reading the TOC
+                # while a writer is replacing it) stop the refreshing
+                logging.getLogger("whoosh.searching").exception(
+                    "Error refreshing searcher")
+
+    def _open_searcher(self):
+        # Returns a (searcher, keys) tuple for the latest version of the index,
+        # where keys is the list of segment reader keys used by the searcher
+        from whoosh.reading import SegmentReader, MultiReader, EmptyReader
+
+        ix = self.ix
+        toc = ix._read_toc()
+        schema = toc.schema
+        storage = ix.storage
+        # Readers can be reused if the segment, its deletions, and the schema
+        # haven't changed
+        names = tuple(schema.names())
+        keys = [(seg.segment_id(), seg.deleted_count(), names)
+                for seg in toc.segments]
+
+        with self._lock:
+            reusable = dict((key, self._segreaders[key][0])
+                            for key in keys if key in self._segreaders)
+            # Take a reference to the reused readers right away, so they can't
+            # be closed before the new searcher is installed
+            for key in reusable:
+                self._segreaders[key][1] += 1
+
+        readers = []
+        opened = []
+        try:
+            for key, segment in zip(keys, toc.segments):
+                if key in reusable:
+                    readers.append(reusable[key])
+                else:
+                    r = SegmentReader(storage, schema, segment,
+                                      generation=toc.generation)
+                    readers.append(r)
+                    opened.append((key, r))
+        except Exception:
+            for _, r in opened:
+                r.close()
+            self._decref_readers(reusable)
+            raise
+
+        with self._lock:
+            for key, r in opened:
+                self._segreaders[key] = [r, 1]
+
+        if not readers:
+            reader = EmptyReader(schema)
+        else:
+            # Always use a MultiReader, since a reused SegmentReader has the
+            # generation of the index it was opened for
+            reader = MultiReader(readers, generation=toc.generation)
+        searcher = Searcher(reader, fromindex=ix, closereader=False,
+                            **self.searcher_args)
+        return searcher, keys, toc.generation
+
+    def _decref_readers(self, keys):
+        with self._lock:
+            for key in keys:
+                entry = self._segreaders[key]
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._segreaders[key]
+                    entry[0].close()
+
+    def _swap(self, searcher, keys, generation):
+        # Makes the given searcher the current searcher
+        with self._lock:
+            old = self._current
+            self._current = searcher
+            self._generation = generation
+            self._refs[searcher] = 1
+            self._searcher_keys[searcher] = keys
+            if old is not None:
+                self._decref(old)
+
+    def _decref(self, searcher):
+        with self._lock:
+            self._refs[searcher] -= 1
+            if self._refs[searcher] <= 0:
+                del self._refs[searcher]
+                searcher.close()
+                self._decref_readers(self._searcher_keys.pop(searcher))
+
+    def acquire(self):
+        """Returns the current :class:`Searcher`. You must pass the searcher to
+        :meth:`SearcherManager.release` when you're done with it, and you
+        should not close it yourself.
+        """
+
+        with self._lock:
+            if self.is_closed:
+                raise Exception("This SearcherManager is closed")
+            searcher = self._current
+            self._refs[searcher] += 1
+            return searcher
+
+    def release(self, searcher):
+        """Releases a searcher returned by :meth:`SearcherManager.acquire`. If
+        the searcher is no longer current and this was the last reference to
+        it, the searcher and any readers only it used are closed.
+        """
+
+        self._decref(searcher)
+
+    @contextmanager
+    def searcher(self):
+        """A context manager that acquires the current searcher and releases it
+        at the end of the block::
+
+            with manager.searcher() as s:
+                results = s.search(myquery)
+        """
+
+        searcher = self.acquire()
+        try:
+            yield searcher
+        finally:
+            self.release(searcher)
+
+    def maybe_refresh(self):
+        """If the index has changed since the current searcher was opened,
+        opens a searcher for the new version of the index and makes it
+        current. Returns True if the searcher was refreshed.
+        """
+
+        # Only one thread needs to refresh at a time
+        with self._refresh_lock:
+            if (self.is_closed
+                    or self.ix.latest_generation() == self._generation):
+                return False
+            searcher, keys, generation = self._open_searcher()
+            self._swap(searcher, keys, generation)
+            return True
+
+    def request_refresh(self):
+        """Tells the background thread (if ``refresh_interval`` was given) to
+        check for a new version of the index right away. If there is no
+        background thread, this refreshes the searcher in the calling thread.
+        """
+
+        if self._thread is None:
+            self.maybe_refresh()
+        else:
+            self._wakeup.set()
+
+    def close(self):
+        """Stops the background thread and releases the manager's reference
+        to the current searcher. Searchers that are still acquired are closed
+        when they're released.
+        """
+
+        with self._lock:
+            if self.is_closed:
+                return
+            self.is_closed = True
+        if self._thread is not None:
+            self._wakeup.set()
+            self._thread.join()
+        with self._refresh_lock:
+            self._decref(self._current)
+
+
+# Result cache
+
+def _freeze(value):
+    # Converts a search option into a hashable value for a cache key, or
+    # raises TypeError if that's not possible
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in iteritems(value)))
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    hash(value)
+    return value
+
+
+def _sizeof(value):
+    # Estimates the memory used by a cached value
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    elif isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in iteritems(value))
+    return size
+
+
+class CachedFacetMap(sorting.FacetMap):
+    """A facet map holding the groups of a cached search.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+
+    def add(self, groupname, docid, sortkey):
+        raise Exception("Cached facet maps are read-only")
+
+    def as_dict(self):
+        return dict(self.groups)
+
+
+class CachedSearch(object):
+    """Stands in for the collector of a :class:`Results` object returned from
+    a :class:`ResultCache`.
+    """
+
+    def __init__(self, searcher, q, total, filter=None, mask=None,
+                 cache=None, key=None):
+        self.top_searcher = searcher
+        self.q = q
+        self.total = total
+        self.filter = filter
+        self.mask = mask
+        self.cache = cache
+        self.key = key
+
+    def computes_count(self):
+        return self.total is not None
+
+    def count(self):
+        if self.total is None:
+            # The original search didn't know the total, so count the matching
+            # documents now and remember the count in the cache
+            self.total = sum(1 for _ in self.all_ids())
+            if self.cache is not None:
+                self.cache._set_total(self.key, self.total)
+        return self.total
+
+    def all_ids(self):
+        # The cache doesn't keep every matching document, so re-run the
+        # search without scoring to find them
+        c = self.top_searcher.collector(limit=None, scored=False,
+                                        filter=self.filter, mask=self.mask)
+        self.top_searcher.search_with_collector(self.q, c)
+        return c.all_ids()
+
+
+class ResultCache(object):
+    """Caches the results of searches, so that running the same search again
+    on the same version of the index doesn't have to re-run the query. Pass
+    an instance to :meth:`whoosh.index.Index.searcher` (or set the
+    ``resultcache`` attribute on the index) to use it::
+
+        cache = ResultCache(maxbytes=16 * 1024 * 1024)
+        with myindex.searcher(resultcache=cache) as s:
+            results = s.search(myquery)
+
+    Cache entries are keyed by the index, the normalized query, the
+    searcher's weighting model, the arguments to :meth:`Searcher.search`, and
+    the segments (and deletions) of the searcher's reader, so searches on a
+    newer version of the index never see stale results. Entries for old
+    versions of an index are thrown away when a search is cached for a newer
+    version of the same index.
+
+    The cache keeps the ranked ``(score, docnum)`` pairs and the groups of any
+    facets. It also keeps the total number of matching documents if the
+    search knew it; otherwise the total is counted the first time a cached
+    result's length is requested, and remembered. When the cache is over its
+    ``maxbytes`` budget, the least recently used entries are dropped.
+
+    Searches that use ``terms=True``, ``collapse``, or a filter or mask that
+    isn't a query object are never cached. The object is thread-safe, so one
+    cache can be shared by many searchers.
+    """
+
+    def __init__(self, maxbytes=32 * 1024 * 1024):
+        """
+        :param maxbytes: the approximate maximum amount of memory the cached
+            results may use.
+        """
+
+        self.maxbytes = maxbytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    @staticmethod
+    def _index_key(searcher):
+        # Returns a hashable value identifying the index the searcher came
+        # from, so one cache can be shared by searchers on different indexes
+        ix = getattr(searcher, "_ix", None)
+        if ix is None:
+            return None
+        storage = getattr(ix, "storage", None)
+        # In-memory storages don't have a folder, so use the object's identity
+        folder = getattr(storage, "folder", None) or id(storage)
+        return type(storage).__name__, folder, getattr(ix, "indexname", None)
+
+    @staticmethod
+    def _reader_key(reader):
+        # Returns a hashable value representing the version of the index the
+        # reader is reading, or None if it can't be identified
+        segments = []
+        for r, _ in reader.leaf_readers():
+            segment = r.segment()
+            if segment is None:
+                return None
+            segments.append((segment.segment_id(), segment.deleted_count()))
+        return reader.generation(), tuple(segments)
+
+    def key(self, searcher, q, kwargs):
+        """Returns the cache key for running the given query with the given
+        :meth:`Searcher.search` keyword arguments, or None if the search
+        can't be cached.
+        """
+
+        if kwargs.get("terms") or kwargs.get("collapse"):
+            return None
+        for name in ("filter", "mask"):
+            value = kwargs.get(name)
+            if value is not None and not isinstance(value, query.Query):
+                return None
+
+        readerkey = self._reader_key(searcher.reader())
+        if readerkey is None:
+            return None
+        readerkey = (self._index_key(searcher),) + readerkey
+
+        weighting = searcher.weighting
+        try:
+            options = _freeze(kwargs)
+            wkey = (type(weighting), _freeze(vars(weighting)))
+        except TypeError:
+            return None
+        return readerkey, q.normalize(), wkey, options
+
+    def get(self, searcher, q, key, fieldnames=None):
+        """Returns a :class:`Results` object for the given query and key (from
+        :meth:`ResultCache.key`) using the given searcher, or None if the
+        results aren't in the cache. Each call returns a new object, so
+        callers can't see each other's changes (such as ``fieldnames``).
+
+        :param fieldnames: the stored field names to load for each hit (see
+            the ``fields`` argument to :meth:`Searcher.search`).
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            # Move the entry to the end of the LRU order
+            entry, size = self._entries.pop(key)
+            self._entries[key] = (entry, size)
+            self.hits += 1
+
+        keys, docnums, total, docset, groups, options = entry
+        if keys is None:
+            keys = [None] * len(docnums)
+        items = list(zip(keys, docnums))
+        if docset is not None:
+            docset = set(docset)
+        facetmaps = dict((name, CachedFacetMap(g))
+                         for name, g in iteritems(groups))
+
+        r = Results(searcher, q, items, docset=docset, facetmaps=facetmaps,
+                    fieldnames=fieldnames)
+        r.collector = CachedSearch(searcher, q, total, cache=self, key=key,
+                                   **options)
+        return r
+
+    def put(self, key, results):
+        """Adds the given :class:`Results` object to the cache under the given
+        key (from :meth:`ResultCache.key`).
+        """
+
+        top_n = results.top_n
+        docnums = array("i", (docnum for _, docnum in top_n))
+        keys = [key for key, _ in top_n]
+        if all(k is None for k in keys):
+            keys = None
+        elif all(type(k) is float for k in keys):
+            keys = array("d", keys)
+        else:
+            keys = tuple(keys)
+
+        docset = None
+        if results.docset is not None:
+            docset = array("i", sorted(results.docset))
+        groups = dict((name, fm.as_dict())
+                      for name, fm in iteritems(results._facetmaps))
+        # Don't compute the length if the search didn't, since that may mean
+        # re-running the whole search. It's counted when it's first needed
+        total = len(results) if results.has_exact_length() else None
+        options = dict((name, value) for name, value in key[3]
+                       if name in ("filter", "mask"))
+
+        entry = (keys, docnums, total, docset, groups, options)
+        size = (_sizeof(key) + _sizeof(keys) + sys.getsizeof(docnums) +
+                (sys.getsizeof(docset) if docset is not None else 0) +
+                _sizeof(groups))
+        if size > self.maxbytes:
+            return
+
+        ixkey, generation = key[0][:2]
+        with self._lock:
+            lastgen = self._generations.get(ixkey)
+            if (generation is not None and lastgen is not None
+                    and generation > lastgen):
+                # The index has changed, so throw away entries for older
+                # versions of the same index
+                for oldkey in list(self._entries):
+                    oldixkey, oldgen = oldkey[0][:2]
+                    if (oldixkey == ixkey and oldgen is not None
+                            and oldgen < generation):
+                        self._remove(oldkey)
+            if generation is not None:
+                self._generations[ixkey] = max(generation, lastgen or 0)
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (entry, size)
+            self.size += size
+            while self.size > self.maxbytes:
+                self._remove(next(iter(self._entries)))
+
+    def _set_total(self, key, total):
+        with self._lock:
+            if key in self._entries:
+                entry, size = self._entries[key]
+                keys, docnums, _, docset, groups, options = entry
+                entry = (keys, docnums, total, docset, groups, options)
+                self._entries[key] = (entry, size)
+
+    def _remove(self, key):
+        _, size = self._entries.pop(key)
+        self.size -= size
+
@@ -25,11 +25,16 @@
 # those of the authors and should not be interpreted as representing official
 # policies, either expressed or implied, of Matt Chaput.
 
+from __future__ import division
 from array import array
+from bisect import bisect_right
 from collections import defaultdict
 
+from whoosh import columns
 from whoosh.compat import string_type
 from whoosh.compat import iteritems, izip, xrange
+from whoosh.util.loading import optional_numpy
+from whoosh.util.sketches import HyperLogLog, SpaceSaving, TDigest
 
 
 # Faceting objects
@@ -59,7 +64,8 @@ class FacetType(object):
         elif type(t) is type:
             return t()
         else:
-            return t
+            # Don't share a map instance between searches
+            return t.new()
 
     def default_name(self):
         return "facet"
@@ -155,6 +161,52 @@ class Categorizer(object):
 
         return key
 
+    def ordinal_keys(self):
+        """Returns an ``(ordinals, reverse)`` tuple, where ``ordinals`` is a
+        :class:`whoosh.columns.GlobalOrdinals` object whose ordinals sort in
+        the same order as this categorizer's keys (or in the opposite order if
+        ``reverse`` is True), or None if this categorizer's keys can't be
+        derived from ordinals. Collectors can use this to sort many documents
+        at once using array operations.
+        """
+
+        return None
+
+    def ordinal_key(self, ordinal):
+        """Returns the key this categorizer would return for a document whose
+        value has the given ordinal (see :meth:`Categorizer.ordinal_keys`).
+        """
+
+        raise NotImplementedError
+
+    def array_keys(self):
+        """Returns a ``(values, reverse)`` tuple, where ``values`` is a NumPy
+        array of integers, indexed by (top-level) document number, that sort
+        in the same order as this categorizer's keys (or in the opposite order
+        if ``reverse`` is True), or None if this categorizer can't provide
+        one. Collectors use this like :meth:`Categorizer.ordinal_keys` when the
+        categorizer doesn't have ordinals.
+        """
+
+        return None
+
+    def array_key(self, value):
+        """Returns the key this categorizer would return for a document whose
+        value in the array from :meth:`Categorizer.array_keys` is ``value``.
+        """
+
+        raise NotImplementedError
+
+    def natural_key(self, key):
+        """Returns the "natural" sort key corresponding to a key returned by
+        ``key_for``. Categorizers that substitute cheaper keys for the actual
+        values (for example :class:`OrdinalCategorizer`) override this to
+        translate the key back, for the benefit of wrappers such as
+        :class:`TranslateFacet` that need to look at the real value.
+        """
+
+        return key
+
 
 # General field facet
 
@@ -203,7 +255,11 @@ class FieldFacet(FacetType):
 
         if global_searcher.reader().has_column(fieldname):
             coltype = fieldobj.column_type
-            if coltype.reversible or not self.reverse:
+            if isinstance(coltype, (columns.VarBytesColumn,
+                                    columns.RefBytesColumn)):
+                c = OrdinalCategorizer(global_searcher, fieldname,
+                                       self.reverse)
+            elif coltype.reversible or not self.reverse:
                 c = ColumnCategorizer(global_searcher, fieldname, self.reverse)
             else:
                 c = ReversedColumnCategorizer(global_searcher, fieldname)
@@ -214,11 +270,16 @@ class FieldFacet(FacetType):
 
 
 class ColumnCategorizer(Categorizer):
+    # The most distinct values a numeric column can have (going by the range
+    # of its values) for the categorizer to map them to global ordinals
+    max_numeric_ordinals = 65536
+
     def __init__(self, global_searcher, fieldname, reverse=False):
         self._fieldname = fieldname
         self._fieldobj = global_searcher.schema[self._fieldname]
         self._column_type = self._fieldobj.column_type
         self._reverse = reverse
+        self._reader = global_searcher.reader()
 
         # The column reader is set in set_searcher() as we iterate over the
         # sub-searchers
@@ -241,6 +302,69 @@ class ColumnCategorizer(Categorizer):
     def key_to_name(self, key):
         return self._fieldobj.from_column_value(key)
 
+    def ordinals(self):
+        """Returns a :class:`whoosh.columns.GlobalOrdinals` object for this
+        categorizer's column (cached on the reader), or None if the column
+        stores lists of values, which can't be mapped to ordinals.
+
+        Building the ordinals means sorting every unique value, so for
+        numeric columns this also returns None unless the range of the
+        column's values shows it has at most ``max_numeric_ordinals`` distinct
+        values. Columns with many distinct numbers, such as timestamps, can be
+        sorted by their values directly (see
+        :meth:`ColumnCategorizer.array_keys`).
+        """
+
+        coltype = self._column_type
+        if coltype.stores_lists():
+            return None
+        if isinstance(coltype, columns.NumericColumn):
+            if not self._integer_column():
+                return None
+            span = self._reader.column_range(self._fieldname)
+            if span is None or span[1] - span[0] >= self.max_numeric_ordinals:
+                return None
+        return self._reader.column_ordinals(self._fieldname)
+
+    def _integer_column(self):
+        coltype = self._column_type
+        return (isinstance(coltype, columns.NumericColumn)
+                and coltype._typecode not in "fd")
+
+    def ordinal_name(self, ordinal):
+        """Returns the facet name corresponding to the given ordinal of this
+        categorizer's column.
+        """
+
+        value = self.ordinals().value(ordinal)
+        return self._fieldobj.from_column_value(value)
+
+    def ordinal_keys(self):
+        # Only numeric column values can be negated to reverse them, which is
+        # what key_for does
+        if isinstance(self._column_type, columns.NumericColumn):
+            gords = self.ordinals()
+            if gords is not None:
+                return gords, self._reverse
+        return None
+
+    def ordinal_key(self, ordinal):
+        return self.array_key(self.ordinals().value(ordinal))
+
+    def array_keys(self):
+        # The raw values of an integer column sort the same way as its keys
+        numpy = optional_numpy()
+        if numpy is None or not self._integer_column():
+            return None
+        creader = self._reader.column_reader(self._fieldname,
+                                             translate=False)
+        return numpy.asarray(creader.as_array()), self._reverse
+
+    def array_key(self, value):
+        if self._reverse:
+            return 0 - value
+        return value
+
 
 class ReversedColumnCategorizer(ColumnCategorizer):
     """Categorizer that reverses column values for columns that aren't
@@ -262,12 +386,68 @@ class ReversedColumnCategorizer(ColumnCategorizer):
         # Subtract from 0 to reverse the order
         return 0 - order
 
+    def ordinal_keys(self):
+        return None
+
     def key_to_name(self, key):
         # Re-reverse the key to get the index into _values
         key = self._values[0 - key]
         return ColumnCategorizer.key_to_name(self, key)
 
 
+class OrdinalCategorizer(ColumnCategorizer):
+    """Categorizer for bytes columns that uses the global ordinal of each
+    document's value (see
+    :meth:`whoosh.reading.IndexReader.column_ordinals`) as the key, so sorting
+    and grouping compare small integers instead of byte strings. Keys are only
+    translated back into field values by ``key_to_name``.
+    """
+
+    def __init__(self, global_searcher, fieldname, reverse=False):
+        ColumnCategorizer.__init__(self, global_searcher, fieldname, reverse)
+
+        reader = global_searcher.reader()
+        self._ordinals = reader.column_ordinals(fieldname)
+        self._ords = self._ordinals.ords
+        self._docoffset = 0
+        # Cache of translated names, so each value is only translated once
+        self._names = {}
+
+    def set_searcher(self, segment_searcher, docoffset):
+        self._docoffset = docoffset
+
+    def key_for(self, matcher, segment_docnum):
+        order = self._ords[self._docoffset + segment_docnum]
+        if self._reverse:
+            # Subtract from 0 to reverse the order
+            return 0 - order
+        return order
+
+    def key_to_name(self, key):
+        try:
+            return self._names[key]
+        except KeyError:
+            order = 0 - key if self._reverse else key
+            value = self._ordinals.value(order)
+            name = self._names[key] = self._fieldobj.from_column_value(value)
+            return name
+
+    def ordinal_keys(self):
+        return self._ordinals, self._reverse
+
+    def ordinal_key(self, ordinal):
+        if self._reverse:
+            return 0 - ordinal
+        return ordinal
+
+    def natural_key(self, key):
+        if self._reverse:
+            # A reversed bytes column has no natural key, the negated ordinal
+            # is the best we can do
+            return key
+        return self._ordinals.value(key)
+
+
 class OverlappingCategorizer(Categorizer):
     allow_overlap = True
 
@@ -684,7 +864,7 @@ class TranslateFacet(FacetType):
                 catter.set_searcher(segment_searcher, docoffset)
 
         def key_for(self, matcher, segment_docnum):
-            keys = [catter.key_for(matcher, segment_docnum)
+            keys = [catter.natural_key(catter.key_for(matcher, segment_docnum))
                     for catter in self.catters]
             return self.fn(*keys)
 
@@ -737,7 +917,7 @@ class StoredFieldFacet(FacetType):
             self.segment_searcher = segment_searcher
 
         def keys_for(self, matcher, docid):
-            d = self.segment_searcher.stored_fields(docid)
+            d = self.segment_searcher.stored_fields(docid, [self.fieldname])
             value = d.get(self.fieldname)
             if self.split_fn:
                 return self.split_fn(value)
@@ -745,7 +925,7 @@ class StoredFieldFacet(FacetType):
                 return value.split()
 
         def key_for(self, matcher, docid):
-            d = self.segment_searcher.stored_fields(docid)
+            d = self.segment_searcher.stored_fields(docid, [self.fieldname])
             return d.get(self.fieldname)
 
 
@@ -856,6 +1036,11 @@ class MultiFacet(FacetType):
                          for catter, keypart
                          in izip(self.catters, key))
 
+        def natural_key(self, key):
+            return tuple(catter.natural_key(keypart)
+                         for catter, keypart
+                         in izip(self.catters, key))
+
 
 class Facets(object):
     """Maps facet names to :class:`FacetType` objects, for creating multiple
@@ -968,6 +1153,31 @@ class FacetMap(object):
         myfacet = FieldFacet("size", maptype=Count)
     """
 
+    def new(self):
+        """Returns a new, empty map of the same type and with the same
+        settings as this one. When a facet's ``maptype`` is an instance
+        instead of a class, each search uses a map returned by this method,
+        so the results of one search don't overwrite another's.
+
+        The default implementation creates a new object of the same class
+        with no arguments. If the class requires arguments, it returns this
+        object instead, so subclasses that take arguments should override
+        this method.
+        """
+
+        try:
+            return self.__class__()
+        except TypeError:
+            return self
+
+    def prepare(self, top_searcher):
+        """Called by the collector before a search, with the top-level
+        searcher. Subclasses that need to look up information about the
+        documents they are given (such as :class:`Stats`) can override this.
+        """
+
+        pass
+
     def add(self, groupname, docid, sortkey):
         """Adds a document to the facet results.
 
@@ -1052,6 +1262,12 @@ class Count(FacetMap):
     def add(self, groupname, docid, sortkey):
         self.dict[groupname] += 1
 
+    def add_count(self, groupname, count):
+        """Adds ``count`` documents to the given group at once.
+        """
+
+        self.dict[groupname] += count
+
     def as_dict(self):
         return dict(self.dict)
 
@@ -1080,6 +1296,367 @@ class Best(FacetMap):
         return self.bestids
 
 
+class Stats(FacetMap):
+    """Computes statistics about the values of a numeric field's column for
+    the documents in each group.
+
+    Unlike the other facet map types, you must create an instance of this
+    class with the name of the field to aggregate, and pass the instance as
+    the facet's ``maptype``::
+
+        prices = sorting.Stats("price", percentiles=(50, 95))
+        facet = sorting.FieldFacet("category", maptype=prices)
+        results = searcher.search(myquery, groupedby=facet)
+        print(results.groups("category"))
+
+    The ``as_dict`` method returns a dictionary mapping group names to
+    dictionaries with the keys ``"count"``, ``"sum"``, ``"min"``, ``"max"``,
+    ``"mean"`` and ``"percentiles"`` (a dictionary mapping each requested
+    percentile to its estimated value).
+
+    The column values are read in batches when the results are requested
+    (using NumPy for the arithmetic if it is installed). The percentiles are
+    approximated using a :class:`whoosh.util.sketches.TDigest` so they don't
+    require keeping every value in memory.
+    """
+
+    batchsize = 4096
+
+    def __init__(self, fieldname, percentiles=(50, 90, 99), compression=100):
+        """
+        :param fieldname: the name of the numeric field to aggregate. The
+            field must be sortable (have a column).
+        :param percentiles: a sequence of percentiles (between 0 and 100) to
+            estimate for each group.
+        :param compression: the ``compression`` of the
+            :class:`~whoosh.util.sketches.TDigest` used to estimate the
+            percentiles.
+        """
+
+        self.fieldname = fieldname
+        self.percentiles = percentiles
+        self.compression = compression
+        self.docs = defaultdict(lambda: array("i"))
+        self._readers = None
+        self._offsets = None
+        self._stats = None
+
+    def __repr__(self):
+        return "<%s %r %r>" % (self.__class__.__name__, self.fieldname,
+                               self.docs)
+
+    def new(self):
+        return self.__class__(self.fieldname, self.percentiles,
+                              self.compression)
+
+    def prepare(self, top_searcher):
+        reader = top_searcher.reader()
+        self._readers = []
+        self._offsets = []
+        for r, offset in reader.leaf_readers():
+            self._readers.append(r.column_reader(self.fieldname))
+            self._offsets.append(offset)
+        self.docs = defaultdict(lambda: array("i"))
+        self._stats = None
+
+    def add(self, groupname, docid, sortkey):
+        self.docs[groupname].append(docid)
+        self._stats = None
+
+    def _batches(self, docnums):
+        # Yields lists of the column values for the given (index-wide)
+        # document numbers, reading each segment's column in order
+        readers = self._readers
+        offsets = self._offsets
+        batchsize = self.batchsize
+
+        batch = []
+        creader = None
+        offset = end = 0
+        for docnum in sorted(docnums):
+            if docnum >= end:
+                # Move to the segment containing this document
+                segnum = bisect_right(offsets, docnum) - 1
+                creader = readers[segnum]
+                offset = offsets[segnum]
+                end = offset + len(creader)
+
+            batch.append(creader[docnum - offset])
+            if len(batch) >= batchsize:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _group_stats(self, docnums):
+        count = 0
+        total = 0
+        lo = hi = None
+        digest = TDigest(self.compression)
+
+        numpy = optional_numpy()
+        for batch in self._batches(docnums):
+            values = None
+            if numpy is not None:
+                values = numpy.asarray(batch)
+                if values.dtype.kind not in "iuf":
+                    # Something NumPy can't do arithmetic on natively (e.g.
+                    # Decimal), fall back to Python
+                    values = None
+
+            if values is not None:
+                btotal = values.sum().item()
+                blo = values.min().item()
+                bhi = values.max().item()
+            else:
+                btotal = sum(batch)
+                blo = min(batch)
+                bhi = max(batch)
+
+            count += len(batch)
+            total += btotal
+            lo = blo if lo is None else min(lo, blo)
+            hi = bhi if hi is None else max(hi, bhi)
+            digest.extend(batch)
+
+        pcts = dict((p, digest.percentile(p)) for p in self.percentiles)
+        return {"count": count, "sum": total, "min": lo, "max": hi,
+                "mean": total / count if count else None,
+                "percentiles": pcts}
+
+    def as_dict(self):
+        if self._stats is None:
+            self._stats = dict((name, self._group_stats(docnums))
+                               for name, docnums in iteritems(self.docs))
+        return self._stats
+
+
+class ColumnValueMap(FacetMap):
+    """Base class for facet maps that summarize the (untranslated) column
+    values of a field for the documents in each group as they are added,
+    rather than recording the documents themselves.
+    """
+
+    def __init__(self, fieldname):
+        """
+        :param fieldname: the name of the field whose column values to
+            summarize. The field must be sortable (have a column).
+        """
+
+        self.fieldname = fieldname
+        self._fieldobj = None
+        self._readers = None
+        self._offsets = None
+        self._creader = None
+        self._offset = self._end = 0
+
+    def prepare(self, top_searcher):
+        self._fieldobj = top_searcher.schema[self.fieldname]
+        self._readers = []
+        self._offsets = []
+        for r, offset in top_searcher.reader().leaf_readers():
+            self._readers.append(r.column_reader(self.fieldname,
+                                                 translate=False))
+            self._offsets.append(offset)
+        self._creader = None
+        self._offset = self._end = 0
+        self.reset()
+
+    def reset(self):
+        """Clears any information recorded by this object.
+        """
+
+        raise NotImplementedError
+
+    def _value(self, docid):
+        if not self._offset <= docid < self._end:
+            # Move to the segment containing this document
+            segnum = bisect_right(self._offsets, docid) - 1
+            self._creader = self._readers[segnum]
+            self._offset = self._offsets[segnum]
+            self._end = self._offset + len(self._creader)
+        return self._creader[docid - self._offset]
+
+
+class DistinctCount(ColumnValueMap):
+    """Estimates the number of distinct values of a field among the documents
+    in each group, using a :class:`whoosh.util.sketches.HyperLogLog` sketch of
+    the column values' hashes. The memory used for each group is fixed
+    (``2 ** precision`` bytes) no matter how many distinct values there are.
+
+    For example, to estimate the number of different authors in each
+    category::
+
+        authors = sorting.DistinctCount("author")
+        facet = sorting.FieldFacet("category", maptype=authors)
+        results = searcher.search(myquery, groupedby=facet)
+
+    The ``as_dict`` method returns a dictionary mapping group names to
+    estimated counts.
+    """
+
+    def __init__(self, fieldname, precision=12):
+        """
+        :param fieldname: the name of the field whose distinct values to
+            count. The field must be sortable (have a column).
+        :param precision: the precision of the HyperLogLog sketches. The
+            standard error of the estimates is about
+            ``1.04 / sqrt(2 ** precision)``.
+        """
+
+        ColumnValueMap.__init__(self, fieldname)
+        self.precision = precision
+        self.reset()
+
+    def __repr__(self):
+        return "<%s %r %r>" % (self.__class__.__name__, self.fieldname,
+                               self.sketches)
+
+    def new(self):
+        return self.__class__(self.fieldname, self.precision)
+
+    def reset(self):
+        self.sketches = {}
+
+    def add(self, groupname, docid, sortkey):
+        try:
+            sketch = self.sketches[groupname]
+        except KeyError:
+            sketch = self.sketches[groupname] = HyperLogLog(self.precision)
+        sketch.add(self._value(docid))
+
+    def as_dict(self):
+        return dict((name, sketch.cardinality())
+                    for name, sketch in iteritems(self.sketches))
+
+
+class TopValues(ColumnValueMap):
+    """Finds the most common values of a field (the "heavy hitters") among the
+    documents in each group, using a fixed number of counters per group (see
+    :class:`whoosh.util.sketches.SpaceSaving`). The counts are approximate
+    (they may overestimate) but the memory used doesn't depend on the number
+    of distinct values.
+
+    For example, to find the ten most common domains in each category::
+
+        domains = sorting.TopValues("domain", limit=10)
+        facet = sorting.FieldFacet("category", maptype=domains)
+        results = searcher.search(myquery, groupedby=facet)
+
+    The ``as_dict`` method returns a dictionary mapping group names to lists
+    of ``(value, count)`` pairs, most frequent first.
+    """
+
+    def __init__(self, fieldname, limit=10, capacity=None):
+        """
+        :param fieldname: the name of the field whose values to count. The
+            field must be sortable (have a column).
+        :param limit: the number of values to return for each group.
+        :param capacity: the number of counters to keep for each group. More
+            counters give more accurate results. The default is ten times the
+            limit.
+        """
+
+        ColumnValueMap.__init__(self, fieldname)
+        self.limit = limit
+        self.capacity = capacity or limit * 10
+        self.reset()
+
+    def __repr__(self):
+        return "<%s %r %r>" % (self.__class__.__name__, self.fieldname,
+                               self.sketches)
+
+    def new(self):
+        return self.__class__(self.fieldname, self.limit, self.capacity)
+
+    def reset(self):
+        self.sketches = {}
+
+    def add(self, groupname, docid, sortkey):
+        try:
+            sketch = self.sketches[groupname]
+        except KeyError:
+            sketch = self.sketches[groupname] = SpaceSaving(self.capacity)
+        sketch.add(self._value(docid))
+
+    def as_dict(self):
+        # Only translate the column values that are actually returned
+        fcv = self._fieldobj.from_column_value
+        return dict((name, [(fcv(value), count) for value, count
+                            in sketch.top(self.limit)])
+                    for name, sketch in iteritems(self.sketches))
+
+
+# Array-backed counting
+
+class OrdinalCounts(object):
+    """Counts documents by the global ordinal of their column value (see
+    :class:`whoosh.columns.GlobalOrdinals`) in a preallocated array, instead of
+    updating a dictionary for each document. This is used by
+    :class:`whoosh.collectors.FacetCollector` to fill in :class:`Count` maps
+    for column-backed facets.
+
+    If NumPy is available, document numbers are buffered and counted in
+    batches using ``numpy.bincount``.
+    """
+
+    batchsize = 4096
+
+    def __init__(self, ordinals):
+        """
+        :param ordinals: a :class:`whoosh.columns.GlobalOrdinals` object.
+        """
+
+        self._ords = ordinals.ords
+        self._size = len(ordinals.values)
+
+        self._numpy = numpy = optional_numpy()
+        if numpy is not None:
+            self._npords = numpy.frombuffer(self._ords,
+                                            dtype=self._ords.typecode)
+            self._counts = numpy.zeros(self._size, dtype=numpy.int64)
+            self._buffer = array("i")
+        else:
+            self._counts = array("i", [0]) * self._size
+            self._buffer = None
+
+    def add(self, global_docnum):
+        """Counts the given (index-wide) document number.
+        """
+
+        if self._buffer is None:
+            self._counts[self._ords[global_docnum]] += 1
+        else:
+            self._buffer.append(global_docnum)
+            if len(self._buffer) >= self.batchsize:
+                self._flush()
+
+    def _flush(self):
+        buf = self._buffer
+        if buf:
+            numpy = self._numpy
+            docnums = numpy.frombuffer(buf, dtype=buf.typecode)
+            self._counts += numpy.bincount(self._npords[docnums],
+                                           minlength=self._size)
+            # Can't resize the old buffer while NumPy has a view of it
+            self._buffer = array("i")
+
+    def items(self):
+        """Yields ``(ordinal, count)`` pairs for every ordinal with a non-zero
+        count.
+        """
+
+        counts = self._counts
+        if self._buffer is None:
+            for ordinal, count in enumerate(counts):
+                if count:
+                    yield ordinal, count
+        else:
+            self._flush()
+            for ordinal in self._numpy.flatnonzero(counts):
+                yield int(ordinal), int(counts[ordinal])
+
+
 # Helper functions
 
 def add_sortable(writer, fieldname, facet, column=None):
@@ -26,6 +26,7 @@
 # policies, either expressed or implied, of Matt Chaput.
 
 import pickle
+from importlib import import_module
 
 
 class RenamingUnpickler(pickle.Unpickler):
@@ -82,3 +83,34 @@ def find_object(name, blacklist=None, whitelist=None):
     mod = __import__(modname, fromlist=[clsname])
     cls = getattr(mod, clsname)
     return cls
+
+
+def optional_import(name):
+    """Imports and returns the named module, or returns None if the module is
+    not installed. This is useful for deferring the import of expensive
+    optional dependencies (such as NumPy) until they are actually used.
+    """
+
+    try:
+        return import_module(name)
+    except ImportError:
+        return None
+
+
+# NumPy is optional and slow to import, so it is only imported the first time
+# it's needed. False means we haven't looked for it yet, None means it isn't
+# available.
+numpy = False
+
+
+def optional_numpy():
+    """Returns the ``numpy`` module, or None if NumPy is not installed. NumPy
+    is only imported the first time this is called. The result is kept in
+    this module's ``numpy`` attribute, so setting that attribute to None
+    disables NumPy everywhere it's optional.
+    """
+
+    global numpy
+    if numpy is False:
+        numpy = optional_import("numpy")
+    return numpy
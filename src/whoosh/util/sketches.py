@@ -0,0 +1,371 @@
+# Copyright 2026 Matt Chaput. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY MATT CHAPUT ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+# EVENT SHALL MATT CHAPUT OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are
+# those of the authors and should not be interpreted as representing official
+# policies, either expressed or implied, of Matt Chaput.
+
+"""
+This module contains small, fixed-size "sketch" data structures that
+summarize a stream of values approximately, for use in faceting where keeping
+every value in memory would be too expensive.
+"""
+
+from hashlib import md5
+from heapq import heappop, heappush, heapreplace
+from math import log
+from struct import Struct
+
+from whoosh.compat import bytes_type, izip, text_type
+
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_unpack_hash = Struct(">Q").unpack_from
+
+
+def mix64(x):
+    """Scrambles the bits of an integer (for example the result of calling
+    ``hash()`` on a value) into a well-distributed 64-bit hash, using the
+    "splitmix64" finalizer. This is necessary because Python's ``hash()`` of a
+    small integer is the integer itself.
+    """
+
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+
+def hash64(value):
+    """Returns a well-distributed 64-bit hash of a hashable value. Strings are
+    hashed with MD5 instead of ``hash()``, so their hashes (and so sketch
+    estimates) are the same in every process regardless of hash
+    randomization.
+    """
+
+    if isinstance(value, text_type):
+        value = value.encode("utf8")
+    if isinstance(value, bytes_type):
+        return _unpack_hash(md5(value).digest())[0]
+    return mix64(hash(value))
+
+
+class TDigest(object):
+    """Approximates the distribution of a stream of numbers using a bounded
+    number of weighted centroids (a "merging t-digest", after Dunning and
+    Ertl), so that quantiles can be estimated without keeping every value.
+
+    Centroids near the middle of the distribution are allowed to absorb more
+    values than centroids near the extremes, so estimates of extreme quantiles
+    (such as the 99th percentile) are the most accurate.
+
+    >>> td = TDigest()
+    >>> td.extend(range(1000))
+    >>> td.quantile(0.5)
+    499.5
+    """
+
+    def __init__(self, compression=100):
+        """
+        :param compression: controls how much centroids may grow, and so how
+            many are kept. Higher values are more accurate but use more
+            memory.
+        """
+
+        self.compression = compression
+        self.count = 0
+        self.min = None
+        self.max = None
+
+        self._means = []
+        self._weights = []
+        self._buffer = []
+        self._buffersize = compression * 5
+
+    def __repr__(self):
+        return "<%s %d values, %d centroids>" % (self.__class__.__name__,
+                                                 self.count, len(self._means))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        """Adds a single value to the digest.
+        """
+
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffersize:
+            self._compress()
+
+    def extend(self, values):
+        """Adds a sequence of values to the digest.
+        """
+
+        buf = self._buffer
+        buf.extend(values)
+        if len(buf) >= self._buffersize:
+            self._compress()
+
+    def _compress(self):
+        buf = self._buffer
+        if not buf:
+            return
+
+        buf.sort()
+        if self.min is None or buf[0] < self.min:
+            self.min = buf[0]
+        if self.max is None or buf[-1] > self.max:
+            self.max = buf[-1]
+        self.count += len(buf)
+
+        items = sorted(list(izip(self._means, self._weights))
+                       + [(v, 1) for v in buf])
+        self._buffer = []
+
+        total = float(self.count)
+        compression = self.compression
+        means = []
+        weights = []
+        sofar = 0
+        mean, weight = items[0]
+        for m, w in items[1:]:
+            proposed = weight + w
+            # Centroids may only grow as large as the scale function allows
+            # at their position in the distribution
+            q = (sofar + proposed / 2.0) / total
+            if proposed <= 4 * total * q * (1 - q) / compression:
+                mean += (m - mean) * w / float(proposed)
+                weight = proposed
+            else:
+                means.append(mean)
+                weights.append(weight)
+                sofar += weight
+                mean, weight = m, w
+        means.append(mean)
+        weights.append(weight)
+
+        self._means = means
+        self._weights = weights
+
+    def quantile(self, q):
+        """Returns the estimated value at the given quantile (between 0 and 1),
+        or None if no values have been added.
+        """
+
+        self._compress()
+        means = self._means
+        if not means:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        # Each centroid is treated as a point at the middle of the range of
+        # ranks it covers, with the minimum and maximum at the ends, and the
+        # result is interpolated between the points on either side of the
+        # target rank
+        target = q * self.count
+        prevrank = 0.0
+        prevvalue = self.min
+        rank = 0.0
+        for mean, weight in izip(means, self._weights):
+            center = rank + weight / 2.0
+            if target < center:
+                break
+            prevrank, prevvalue = center, mean
+            rank += weight
+        else:
+            center, mean = float(self.count), self.max
+
+        if center == prevrank:
+            return mean
+        frac = (target - prevrank) / (center - prevrank)
+        return prevvalue + (mean - prevvalue) * frac
+
+    def percentile(self, p):
+        """Returns the estimated value at the given percentile (between 0 and
+        100).
+        """
+
+        return self.quantile(p / 100.0)
+
+
+class HyperLogLog(object):
+    """Estimates the number of distinct values in a stream using a fixed
+    amount of memory (``2 ** precision`` bytes), regardless of how many
+    distinct values there are.
+
+    The standard error of the estimate is about ``1.04 / sqrt(2 ** precision)``,
+    so the default precision of 12 gives about 1.6%.
+
+    >>> hll = HyperLogLog()
+    >>> hll.update(range(10000))
+    >>> abs(hll.cardinality() - 10000) < 500
+    True
+    """
+
+    def __init__(self, precision=12):
+        """
+        :param precision: the number of bits of each hash used to choose a
+            register, between 4 and 16.
+        """
+
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def __repr__(self):
+        return "<%s ~%d>" % (self.__class__.__name__, self.cardinality())
+
+    def add_hash(self, h):
+        """Adds a value to the sketch given its 64-bit hash.
+        """
+
+        p = self.precision
+        index = h >> (64 - p)
+        rest = h & ((1 << (64 - p)) - 1)
+        # The position of the first set bit in the remaining bits
+        rank = (64 - p) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def add(self, value):
+        """Adds a (hashable) value to the sketch.
+        """
+
+        self.add_hash(hash64(value))
+
+    def update(self, values):
+        """Adds a sequence of values to the sketch.
+        """
+
+        add_hash = self.add_hash
+        for value in values:
+            add_hash(hash64(value))
+
+    def merge(self, other):
+        """Merges another sketch with the same precision into this one.
+        """
+
+        if other.precision != self.precision:
+            raise ValueError("Can't merge sketches with different precisions")
+        self._registers = bytearray(max(a, b) for a, b
+                                    in izip(self._registers, other._registers))
+
+    def cardinality(self):
+        """Returns the estimated number of distinct values added to the sketch.
+        """
+
+        registers = self._registers
+        m = len(registers)
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Use linear counting for small cardinalities
+            estimate = m * log(m / float(zeros))
+        return int(round(estimate))
+
+
+class SpaceSaving(object):
+    """Finds the most frequent values in a stream (the "heavy hitters") using a
+    fixed number of counters (the "space-saving" algorithm of Metwally et
+    al.).
+
+    When a value arrives that doesn't have a counter and all the counters are
+    in use, the counter with the lowest count is given to the new value, so
+    reported counts may overestimate the true count by up to the count the
+    counter had when it was reassigned. Any value that occurs more than
+    ``total / capacity`` times is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity=100):
+        """
+        :param capacity: the maximum number of counters to keep.
+        """
+
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # Heap of (count, sequence, value) entries, one for each counted
+        # value. Entries are updated lazily, so the count in an entry may be
+        # lower than the value's actual count
+        self._heap = []
+        self._seq = 0
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.top(5))
+
+    def add(self, value, count=1):
+        """Counts an occurrence of the given (hashable) value.
+        """
+
+        counts = self.counts
+        if value in counts:
+            counts[value] += count
+            return
+
+        heap = self._heap
+        self._seq += 1
+        if len(counts) < self.capacity:
+            counts[value] = count
+            self.errors[value] = 0
+            heappush(heap, (count, self._seq, value))
+            return
+
+        # Find the value with the lowest count, refreshing stale heap entries
+        # as we go
+        while True:
+            c, seq, v = heap[0]
+            actual = counts[v]
+            if c == actual:
+                break
+            heapreplace(heap, (actual, seq, v))
+
+        heappop(heap)
+        del counts[v]
+        del self.errors[v]
+
+        counts[value] = c + count
+        self.errors[value] = c
+        heappush(heap, (c + count, self._seq, value))
+
+    def top(self, n=None):
+        """Returns a list of up to ``n`` ``(value, count)`` pairs for the most
+        frequent values, in order from most to least frequent.
+        """
+
+        items = sorted(self.counts.items(), key=lambda item: (0 - item[1]))
+        if n is not None:
+            items = items[:n]
+        return items
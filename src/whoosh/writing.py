@@ -29,9 +29,12 @@ from __future__ import with_statement
 import threading, time
 from bisect import bisect_right
 from contextlib import contextmanager
+from itertools import groupby
+
+from array import array
 
 from whoosh import columns
-from whoosh.compat import abstractmethod, bytes_type
+from whoosh.compat import abstractmethod, bytes_type, string_type, xrange
 from whoosh.externalsort import SortingPool
 from whoosh.fields import UnknownFieldError
 from whoosh.index import LockError
@@ -504,7 +507,8 @@ class IndexWriter(object):
 
 class SegmentWriter(IndexWriter):
     def __init__(self, ix, poolclass=None, timeout=0.0, delay=0.1, _lk=True,
-                 limitmb=128, docbase=0, codec=None, compound=True, **kwargs):
+                 limitmb=128, docbase=0, codec=None, compound=True,
+                 indexsort=None, **kwargs):
         # Lock the index
         self.writelock = None
         if _lk:
@@ -521,13 +525,32 @@ class SegmentWriter(IndexWriter):
         # Get info from the index
         self.storage = ix.storage
         self.indexname = ix.indexname
-        info = ix._read_toc()
+        # The writer changes the schema and segments, so get a private copy
+        # of the TOC instead of the index's cached one
+        info = ix._read_toc(cached=False)
         self.generation = info.generation + 1
         self.schema = info.schema
         self.segments = info.segments
         self.docnum = self.docbase = docbase
         self._setup_doc_offsets()
 
+        # The index sort may be a field name or a sorting.FieldFacet object;
+        # either way it's normalized to a (fieldname, reverse) tuple
+        self.indexsort = None
+        if indexsort is not None:
+            if isinstance(indexsort, string_type):
+                sortfield, sortreverse = indexsort, False
+            else:
+                sortfield = indexsort.fieldname
+                sortreverse = indexsort.reverse
+            if (sortfield not in self.schema
+                    or not self.schema[sortfield].column_type):
+                if self.writelock:
+                    self.writelock.release()
+                raise IndexingError("Can't sort the index by %r because it is "
+                                    "not a sortable field" % sortfield)
+            self.indexsort = (sortfield, sortreverse)
+
         # Internals
         self._tempstorage = self.storage.temp_storage("%s.tmp" % self.indexname)
         newsegment = codec.new_segment(self.storage, self.indexname)
@@ -539,7 +562,20 @@ class SegmentWriter(IndexWriter):
                                 limitmb=limitmb)
 
         # Set up writers
-        self.perdocwriter = codec.per_document_writer(self.storage, newsegment)
+        self._sortedwriter = None
+        if self.indexsort:
+            # Write the per-document information into a temporary segment
+            # first, and copy it into the new segment in sorted order when the
+            # segment is flushed
+            self._unsorted = codec.new_segment(self._tempstorage,
+                                               self.indexname)
+            self.perdocwriter = codec.per_document_writer(self._tempstorage,
+                                                          self._unsorted)
+            self._sortedwriter = codec.per_document_writer(self.storage,
+                                                           newsegment)
+        else:
+            self.perdocwriter = codec.per_document_writer(self.storage,
+                                                          newsegment)
         self.fieldwriter = codec.field_writer(self.storage, newsegment)
 
         self.merge = True
@@ -655,7 +691,7 @@ class SegmentWriter(IndexWriter):
         items = self._process_posts(items, startdoc, docmap)
         self.fieldwriter.add_postings(self.schema, lengths, items)
 
-    def write_per_doc(self, fieldnames, reader):
+    def write_per_doc(self, fieldnames, reader, order=None):
         # Very bad hack: reader should be an IndexReader, but may be a
         # PerDocumentReader if this is called from multiproc, where the code
         # tries to be efficient by merging per-doc and terms separately.
@@ -673,13 +709,26 @@ class SegmentWriter(IndexWriter):
         for fieldname in fieldnames:
             fieldobj = schema[fieldname]
             coltype = fieldobj.column_type
-            if coltype and reader.has_column(fieldname):
+            if not coltype:
+                continue
+            if reader.has_column(fieldname):
                 creader = reader.column_reader(fieldname, coltype)
                 if isinstance(creader, columns.TranslatingColumnReader):
                     creader = creader.raw_column()
                 cols[fieldname] = creader
+                if reader.is_partial_column(fieldname):
+                    pdw.mark_partial_column(fieldname)
+            else:
+                # The source may have indexed the field before it had a
+                # column, so the merged column can't stand in for its terms
+                pdw.mark_partial_column(fieldname)
+
+        if order is None:
+            docs = reader.iter_docs()
+        else:
+            docs = ((docnum, reader.stored_fields(docnum)) for docnum in order)
 
-        for docnum, stored in reader.iter_docs():
+        for docnum, stored in docs:
             if docmap is not None:
                 docmap[docnum] = self.docnum
 
@@ -788,6 +837,12 @@ class SegmentWriter(IndexWriter):
                 if column and customval is not None:
                     cv = field.to_column_value(customval)
                     perdocwriter.add_column_value(fieldname, column, cv)
+                    # The column only holds one value per document, which may
+                    # not be the value that was indexed
+                    if (customval is not value
+                            or (isinstance(value, (list, tuple, array))
+                                and len(value) != 1)):
+                        perdocwriter.mark_partial_column(fieldname)
         except Exception as ex:
             perdocwriter.cancel_doc()
             raise ex
@@ -835,13 +890,67 @@ class SegmentWriter(IndexWriter):
         # other segments into this writer's pool
         return mergetype(self, self.segments)
 
+    def _sort_per_doc(self):
+        # Copies the per-document information from the temporary unsorted
+        # segment into the new segment, ordered by the index sort column, and
+        # returns a list mapping the old document numbers to the new ones
+
+        fieldname, reverse = self.indexsort
+        fieldobj = self.schema[fieldname]
+        doccount = self.docnum
+        unsorted = self._unsorted
+        unsorted.set_doc_count(doccount)
+        pdr = self.codec.per_document_reader(self._tempstorage, unsorted)
+        try:
+            if pdr.has_column(fieldname):
+                creader = pdr.column_reader(fieldname, fieldobj.column_type)
+                keys = [creader[docnum] for docnum in xrange(doccount)]
+            else:
+                keys = [fieldobj.column_type.default_value()] * doccount
+            # The sort is stable, so documents with equal values keep the
+            # order in which they were added
+            order = sorted(xrange(doccount), key=keys.__getitem__,
+                           reverse=reverse)
+
+            # Include any dynamic fields that were indexed
+            fieldnames = set(self.schema.names())
+            fieldnames |= set(name for name in self.pool.fieldnames
+                              if name in self.schema)
+            self.perdocwriter = self._sortedwriter
+            self.docnum = 0
+            self.write_per_doc(fieldnames, pdr, order)
+        finally:
+            pdr.close()
+
+        docmap = [0] * doccount
+        for newdoc, olddoc in enumerate(order):
+            docmap[olddoc] = newdoc
+        return docmap
+
+    def _sorted_postings(self, postings, docmap):
+        # Renumbers the postings using the given docmap and reorders the
+        # postings for each term by the new document numbers
+        for _, items in groupby(postings, lambda p: (p[0], p[1])):
+            items = [(fieldname, text, docmap[docnum], weight, vbytes)
+                     for fieldname, text, docnum, weight, vbytes in items]
+            items.sort(key=lambda p: p[2])
+            for item in items:
+                yield item
+
     def _flush_segment(self):
         self.perdocwriter.close()
+        docmap = None
+        if self.indexsort:
+            docmap = self._sort_per_doc()
+            self.perdocwriter.close()
+            self.get_segment().indexsort = self.indexsort
         if self.codec.length_stats:
             pdr = self.per_document_reader()
         else:
             pdr = None
         postings = self.pool.iter_postings()
+        if docmap is not None:
+            postings = self._sorted_postings(postings, docmap)
         self.fieldwriter.add_postings(self.schema, pdr, postings)
         self.fieldwriter.close()
         if pdr:
@@ -850,6 +959,9 @@ class SegmentWriter(IndexWriter):
     def _close_segment(self):
         if not self.perdocwriter.is_closed:
             self.perdocwriter.close()
+        sortedwriter = self._sortedwriter
+        if sortedwriter is not None and not sortedwriter.is_closed:
+            sortedwriter.close()
         if not self.fieldwriter.is_closed:
             self.fieldwriter.close()
         self.pool.cleanup()
@@ -890,6 +1002,11 @@ class SegmentWriter(IndexWriter):
         clean_files(self.storage, self.indexname, self.generation, segments)
 
     def _finish(self):
+        if self.indexsort:
+            # The unsorted per-document writer created its own temporary
+            # storage inside ours
+            nested = "%s.tmp" % self._unsorted.indexname
+            self._tempstorage.temp_storage(nested).destroy()
         self._tempstorage.destroy()
         if self.writelock:
             self.writelock.release()
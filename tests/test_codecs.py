@@ -379,6 +379,30 @@ def test_fieldwriter_multiblock():
                   (2, 3.0, b("test3")), (3, 4.0, b("test4")),
                   (4, 1.0, b("test5"))]
 
+    # Skipping a block only reads its info, not its data
+    class CountingFile(object):
+        def __init__(self, f):
+            self.f = f
+            self.views = 0
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+        def get_view(self, position, length):
+            self.views += 1
+            return self.f.get_view(position, length)
+
+    m = tr.matcher("text", b("alfa"), field.format)
+    m._postfile = CountingFile(m._postfile)
+    m.reset()
+    assert m._postfile.views == 0
+    # Reads the first block's data to check the current ID, skips the second
+    # block, and reads the third block's data
+    m.skip_to(4)
+    assert m.id() == 4
+    assert m.value() == b("test5")
+    assert m._postfile.views == 2
+
 
 def test_term_values():
     field = fields.TEXT(phrase=False)
@@ -2,9 +2,10 @@ from __future__ import with_statement
 
 import pytest
 
-from whoosh import collectors, fields, query, searching
+from whoosh import collectors, columns, fields, query, searching
 from whoosh.compat import u, xrange
 from whoosh.filedb.filestore import RamStorage
+from whoosh.util import loading
 from whoosh.util.testing import TempIndex
 
 
@@ -248,3 +249,105 @@ def test_filter_results_count():
             q = query.Term("text", u("alfa"))
             r2 = s.search(q, filter=r1, limit=1)
             assert len(r2) == 2
+
+
+def test_bounded_sorting():
+    import random
+    from whoosh import sorting
+
+    schema = fields.Schema(id=fields.STORED, tag=fields.ID(sortable=True),
+                           num=fields.NUMERIC(sortable=True),
+                           path=fields.ID(sortable=columns.CompressedBytesColumn()),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    rng = random.Random(0)
+    docid = 0
+    for _ in xrange(3):
+        with ix.writer() as w:
+            w.merge = False
+            for _ in xrange(100):
+                w.add_document(id=docid, tag=u("t%d") % rng.randint(0, 9),
+                               num=rng.randint(-50, 50),
+                               path=u("p%d") % rng.randint(0, 20),
+                               text=u("alfa") if docid % 3 else u("bravo"))
+                docid += 1
+
+    facets = ["num", "tag", ["tag", "num"],
+              [sorting.FieldFacet("tag", reverse=True), "num"],
+              [sorting.FieldFacet("num", reverse=True), "path"]]
+
+    q = query.Term("text", u("alfa"))
+    numpy = loading.numpy
+    try:
+        for np in (numpy, None):
+            loading.numpy = np
+            with ix.searcher() as s:
+                for facet in facets:
+                    for reverse in (False, True):
+                        full = s.search(q, sortedby=facet, reverse=reverse,
+                                        limit=None)
+                        expected = [hit.docnum for hit in full]
+                        for limit in (1, 7, 50, 500):
+                            c = collectors.SortingCollector(facet, limit=limit,
+                                                            reverse=reverse)
+                            s.search_with_collector(q, c)
+                            r = c.results()
+                            assert [hit.docnum for hit in r] == \
+                                expected[:limit]
+                            assert len(r) == len(expected)
+                            assert r.docs() == set(expected)
+                            assert ([hit.score for hit in r]
+                                    == [hit.score for hit in full][:limit])
+    finally:
+        loading.numpy = numpy
+
+
+def test_batch_sorting_trim_and_remove():
+    from whoosh import sorting
+
+    if loading.optional_numpy() is None:
+        pytest.skip("requires NumPy")
+
+    schema = fields.Schema(tag=fields.ID(sortable=True),
+                           num=fields.NUMERIC(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    with ix.writer() as w:
+        for i in xrange(200):
+            w.add_document(tag=u("t%d") % (i % 5), num=(i * 37) % 101,
+                           text=u("alfa"))
+
+    q = query.Term("text", u("alfa"))
+    with ix.searcher() as s:
+        full = s.search(q, sortedby="num", limit=None)
+        expected = [hit.docnum for hit in full]
+
+        # Trim the buffered docnums to the top N as the collector goes
+        c = collectors.SortingCollector("num", limit=5)
+        c._batch_min = 16
+        s.search_with_collector(q, c)
+        assert c._batchkeys is not None
+        assert len(c._docnums) < 200
+        r = c.results()
+        assert [hit.docnum for hit in r] == expected[:5]
+        assert len(r) == 200
+        assert r.docs() == set(expected)
+
+        # Collapsing removes documents from the batch
+        r = s.search(q, sortedby="num", collapse="tag", collapse_limit=2)
+        assert r.collector._removed
+        tags = s.reader().column_reader("tag")
+        nums = s.reader().column_reader("num")
+        ckeys = [tags[hit.docnum] for hit in r]
+        assert all(ckeys.count(tag) <= 2 for tag in set(ckeys))
+        assert len(r) == 10
+
+        # A facet map that needs sort keys still gets them
+        r = s.search(q, sortedby="num",
+                     groupedby=sorting.FieldFacet("tag",
+                                                  maptype=sorting.Best))
+        groups = r.groups("tag")
+        assert len(groups) == 5
+        for tag, docnum in groups.items():
+            assert nums[docnum] == min(nums[d] for d in expected
+                                       if tags[d] == tag)
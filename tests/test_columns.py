@@ -1,5 +1,7 @@
 from __future__ import with_statement
 import inspect, random, sys
+from datetime import datetime
+from decimal import Decimal
 
 from whoosh import columns, fields, query
 from whoosh.codec.whoosh3 import W3Codec
@@ -7,6 +9,7 @@ from whoosh.compat import b, u, BytesIO, bytes_type, text_type
 from whoosh.compat import izip, xrange, dumps, loads
 from whoosh.filedb import compound
 from whoosh.filedb.filestore import RamStorage
+from whoosh.util import loading
 from whoosh.util.testing import TempIndex, TempStorage
 
 
@@ -19,6 +22,7 @@ def test_pickleability():
                  "FixedBytesListColumn": (5,),
                  "NumericColumn": ("i",),
                  "PickleColumn": (columns.VarBytesColumn(),),
+                 "StoredFieldsColumn": (columns.VarBytesColumn(),),
                  "StructColumn": ("=if", (0, 0.0)),
                  }
 
@@ -170,6 +174,17 @@ def test_roundtrip():
     c = columns.PickleColumn(columns.VarBytesColumn())
     _rt(c, [None, True, False, 100, -7, "hello"], None)
 
+    c = columns.PackedBlockColumn(blockdocs=2)
+    _rt(c, [b("a"), b("ccc"), b("bbb"), b("e"), b("dd")], b(""))
+
+    c = columns.CompressedBlockColumn()
+    _rt(c, [b("a"), b("ccc"), b("bbb"), b("e"), b("dd")], b(""))
+    c = columns.CompressedBlockColumn(blocksize=0)
+    _rt(c, [b("a"), b("ccc"), b("bbb"), b("e"), b("dd")], b(""))
+    # Columns written without a block directory
+    c._directory = False
+    _rt(c, [b("a"), b("ccc"), b("bbb"), b("e"), b("dd")], b(""))
+
     c = columns.VarBytesListColumn()
     _rt(c, [[b('garnet'), b('amethyst')], [b('pearl')]], [])
     c = columns.VarBytesListColumn()
@@ -321,3 +336,297 @@ def test_varbytes_offsets():
             for i in (10, 100, 1000, 3000):
                 assert cr[i] == values[i % vlen]
 
+
+def test_packed_blocks():
+    from whoosh.codec.whoosh3 import STORED_COLUMN
+
+    words = u("alfa bravo charlie delta echo foxtrot golf hotel").split()
+    docs = [{"id": u("doc%d") % i, "title": u(" ").join(words[i % 8:]),
+             "num": i} for i in xrange(2000)]
+
+    st = RamStorage()
+    c = columns.PackedBlockColumn(blockdocs=8, dictsize=1, cachesize=2)
+    f = st.create_file("packed")
+    w = c.writer(f)
+    for docnum, d in enumerate(docs):
+        if docnum % 3:
+            w.add(docnum, dumps(d, 2))
+    w.finish(len(docs) + 5)
+    assert w._zdict
+    length = f.tell()
+    f.close()
+
+    f = st.open_file("packed")
+    r = c.reader(f, 0, length, len(docs) + 5)
+    for docnum in (1, 2, 3, 1000, 1001, 1999, 2003, 1998, 4, 5):
+        v = r[docnum]
+        if docnum % 3 and docnum < len(docs):
+            assert loads(v) == docs[docnum]
+        else:
+            assert v == b("")
+    assert len(r._cache) == 2
+    values = list(r)
+    assert len(values) == len(docs) + 5
+    assert [loads(v) for v in values if v] == [d for i, d in enumerate(docs)
+                                               if i % 3]
+    f.close()
+
+    # Stored fields written with the old per-document format can still be
+    # read, and the block format is smaller
+    schema = fields.Schema(id=fields.STORED, title=fields.STORED,
+                           num=fields.STORED)
+    sizes = []
+    for storedcol in (STORED_COLUMN, None):
+        with TempIndex(schema) as ix:
+            with ix.writer(codec=W3Codec(storedcolumn=storedcol)) as w:
+                for d in docs:
+                    w.add_document(**d)
+            sizes.append(sum(ix.storage.file_length(name)
+                             for name in ix.storage.list()))
+
+            with ix.reader() as r:
+                assert r.stored_fields(1234) == docs[1234]
+                assert list(r.all_stored_fields()) == docs
+    assert sizes[1] < sizes[0] // 2
+
+    # Documents far apart go in separate blocks instead of padding the gap
+    for dictsize in (0, 1):
+        c = columns.PackedBlockColumn(dictsize=dictsize)
+        f = st.create_file("sparse")
+        w = c.writer(f)
+        w.add(0, b("first"))
+        w.add(70001, b("second"))
+        w.add(70003, b("third"))
+        w.finish(70010)
+        length = f.tell()
+        f.close()
+
+        f = st.open_file("sparse")
+        r = c.reader(f, 0, length, 70010)
+        assert r[0] == b("first")
+        assert r[1] == r[70000] == r[70002] == r[70009] == b("")
+        assert r[70001] == b("second")
+        assert r[70003] == b("third")
+        values = list(r)
+        assert len(values) == 70010
+        assert [(i, v) for i, v in enumerate(values) if v] == \
+            [(0, b("first")), (70001, b("second")), (70003, b("third"))]
+        f.close()
+
+
+def test_stored_serializers():
+    from datetime import datetime
+
+    d = {"s": u("hello"), "e": u(""), "b": b("\x00\xff"), "i": -5,
+         "big": 2 ** 70, "f": 1.5, "t": True, "no": False, "n": None,
+         "dt": datetime(2020, 1, 2, 3, 4, 5, 6),
+         "l": [1, u("x"), [None, 2.5]], "m": {u("k"): 1, 2: [u("z")]},
+         "set": set([1, 2])}
+    names = frozenset(["s", "i", "dt", "n", "m"])
+    for ser in (columns.PickleSerializer(), columns.TypedSerializer()):
+        data = ser.dumps(d)
+        assert ser.loads(data) == d
+        # Again with the cached layout
+        assert ser.loads(data) == d
+        assert ser.loads(data, names) == dict((k, d[k]) for k in names)
+
+        ser2 = loads(dumps(ser, -1))
+        assert type(ser2) is type(ser)
+        assert ser2.loads(data) == d
+
+    # Values of types the typed serializer doesn't know about (including
+    # subclasses of types it does know about) are pickled
+    from collections import OrderedDict
+
+    ser = columns.TypedSerializer()
+    v = ser.loads(ser.dumps({"a": OrderedDict([("x", 1)]), "b": (1, 2)}))
+    assert type(v["a"]) is OrderedDict
+    assert v == {"a": OrderedDict([("x", 1)]), "b": (1, 2)}
+
+    # Strings that can't be encoded as UTF-8 are pickled too
+    v = {"s": u("a\ud800b"), "l": [u("\udfff")]}
+    assert ser.loads(ser.dumps(v)) == v
+
+    # The typed serializer is the default for new stored columns, but columns
+    # pickled without a serializer read pickled values
+    col = columns.StoredFieldsColumn(columns.VarBytesColumn())
+    assert isinstance(col._serializer, columns.TypedSerializer)
+    del col.__dict__["_serializer"]
+    col = loads(dumps(col, -1))
+    assert isinstance(col._serializer, columns.PickleSerializer)
+
+    schema = fields.Schema(id=fields.STORED, n=fields.STORED)
+    with TempIndex(schema) as ix:
+        with ix.writer() as w:
+            for i in xrange(100):
+                w.add_document(id=u("doc%d") % i, n=i)
+            w.add_document(id=u("\ud800"), n=100)
+        with ix.reader() as r:
+            assert r.stored_fields(100) == {"id": u("\ud800"), "n": 100}
+            assert r.stored_fields(42) == {"id": u("doc42"), "n": 42}
+            assert r.stored_fields(7, ["n"]) == {"n": 7}
+
+
+def test_column_as_array():
+    schema = fields.Schema(i=fields.NUMERIC(sortable=True),
+                           n=fields.NUMERIC(bits=64, sortable=True),
+                           b=fields.COLUMN(columns.FixedBytesColumn(2)),
+                           d=fields.DATETIME(sortable=True),
+                           m=fields.NUMERIC(decimal_places=2, sortable=True))
+    ivals = [-5, 20, 3, 0, -100, 7]
+    nvals = [2 ** 40, -2 ** 50, 1, 0, -1, 99]
+    dvals = [datetime(2000 + i, i + 1, 1, i, 30) for i in xrange(7)]
+    mvals = [Decimal(v) for v in ("-1.25", "3.50", "10.00", "-100.01", "7.77",
+                                  "12.00", "-3.14")]
+
+    with TempIndex(schema, "columnarray") as ix:
+        with ix.writer() as w:
+            for i in xrange(3):
+                w.add_document(i=ivals[i], n=nvals[i], b=b("a%d" % i),
+                               d=dvals[i], m=mvals[i])
+        with ix.writer() as w:
+            w.add_document(i=ivals[3], n=nvals[3], d=dvals[3], m=mvals[3])
+            for i in xrange(4, 6):
+                w.add_document(i=ivals[i], n=nvals[i], b=b("c%d" % i),
+                               d=dvals[i], m=mvals[i])
+        with ix.writer() as w:
+            w.merge = False
+            # A segment without any values in the "b" column
+            w.add_document(i=42, n=42, d=dvals[6], m=mvals[6])
+
+        def check():
+            with ix.reader() as r:
+                assert not r.is_atomic()
+                ir = r.column_reader("i")
+                assert list(ir.as_array()) == ivals + [42]
+                assert ir.values([6, 0, 4]) == [42, -5, -100]
+
+                nr = r.column_reader("n")
+                assert list(nr.as_array()) == nvals + [42]
+                assert nr.values([1, 4]) == [-2 ** 50, -1]
+
+                raw = r.column_reader("i", translate=False)
+                assert [raw[n] for n in xrange(7)] == list(raw.as_array())
+
+                br = r.column_reader("b")
+                arr = br.as_array()
+                assert [bytes(bytearray(row)) for row in arr] == [
+                    b("a0"), b("a1"), b("a2"), b("\x00\x00"), b("c4"),
+                    b("c5"), b("\x00\x00")]
+
+                dr = r.column_reader("d")
+                assert list(dr.as_array()) == dvals
+                assert dr.values([5, 1]) == [dvals[5], dvals[1]]
+
+                mr = r.column_reader("m")
+                assert list(mr.as_array()) == mvals
+                assert list(mr) == mvals
+
+                sr = r.leaf_readers()[0][0].column_reader("i")
+                assert list(sr.as_array()) == ivals[:3]
+
+        check()
+        # Without NumPy the readers return arrays and lists
+        old = loading.numpy
+        loading.numpy = None
+        try:
+            check()
+        finally:
+            loading.numpy = old
+
+    # Vectorized conversion of sortable floats
+    np = loading.optional_numpy()
+    if np is not None:
+        field = fields.NUMERIC(float)
+        fvals = [1.5, -2.25, 0.0, 1e10, -3.5, -1e-10]
+        sortable = np.array([field.to_column_value(v) for v in fvals],
+                            dtype=">u8")
+        assert field.from_column_array(sortable).tolist() == fvals
+
+
+def test_zone_maps():
+    from whoosh.matching import NullMatcher
+
+    schema = fields.Schema(id=fields.STORED,
+                           n=fields.NUMERIC(sortable=True),
+                           t=fields.TEXT)
+    codec = W3Codec(zonesize=4)
+    with TempIndex(schema, "zonemaps") as ix:
+        # Three segments with increasing values, and a segment without the
+        # column
+        for seg in xrange(3):
+            with ix.writer(codec=codec) as w:
+                w.merge = False
+                for i in xrange(10):
+                    num = seg * 100 + i * 5
+                    if (seg, i) == (1, 3):
+                        w.add_document(id=num)
+                    else:
+                        w.add_document(id=num, n=num)
+        with ix.writer(codec=codec) as w:
+            w.merge = False
+            w.add_document(id=-1, t=u("alfa"))
+
+        with ix.searcher() as s:
+            r = s.reader()
+            field = schema["n"]
+            subreaders = [sr for sr, _ in r.leaf_readers()]
+            assert len(subreaders) == 4
+
+            sr = subreaders[1]
+            lo, hi = sr.column_range("n")
+            assert field.from_column_value(lo) == 100
+            # The missing value in document 3 uses the field's default
+            assert hi == field.to_column_value(2 ** 31 - 1)
+
+            zones = sr.zone_map("n")
+            assert len(zones) == 3
+            assert zones.zonesize == 4
+            start = field.to_column_value(110)
+            end = field.to_column_value(125)
+            assert zones.doc_ranges(start, end) == [(0, 8)]
+            # Zone 0 contains the default value of document 3
+            assert (zones.doc_ranges(field.to_column_value(140), None)
+                    == [(0, 4), (8, 12)])
+            assert subreaders[3].zone_map("n") is None
+
+            def ids(q):
+                return sorted(s.stored_fields(docnum)["id"]
+                              for docnum in q.docs(s))
+
+            q = query.ColumnRange("n", 110, 125)
+            assert ids(q) == [110, 120, 125]
+            q = query.ColumnRange("n", 110, 125, startexcl=True, endexcl=True)
+            assert ids(q) == [120]
+            results = s.search(query.ColumnRange("n", 110, 125), limit=None)
+            assert sorted(hit["id"] for hit in results) == [110, 120, 125]
+            q = query.ColumnRange("n", 240, 1000)
+            assert ids(q) == [240, 245]
+            # Documents without a value have the field's default value, which
+            # for NUMERIC is the largest possible number
+            q = query.ColumnRange("n", 240, None)
+            assert ids(q) == [-1, 115, 240, 245]
+            q = query.ColumnQuery("n", 205)
+            assert ids(q) == [205]
+            assert ids(query.ColumnQuery("n", 17)) == []
+
+            # The segments whose values are outside the range are skipped
+            # (segment 1 can't be skipped because of the default value)
+            q = query.ColumnRange("n", 230, 240)
+            sub = s.leaf_searchers()
+            matchers = [q.matcher(ss) for ss, _ in sub]
+            assert matchers[0] is NullMatcher
+            assert list(matchers[1].all_ids()) == []
+            assert list(matchers[2].all_ids()) == [6, 7, 8]
+            assert matchers[3] is NullMatcher
+
+    # Without zone maps, the queries still work
+    with TempIndex(schema, "nozonemaps") as ix:
+        with ix.writer(codec=W3Codec(zonesize=0)) as w:
+            for i in xrange(10):
+                w.add_document(id=i, n=i)
+        with ix.searcher() as s:
+            assert s.reader().zone_map("n") is None
+            assert s.reader().column_range("n") is None
+            q = query.ColumnRange("n", 3, 5)
+            assert [s.stored_fields(d)["id"] for d in q.docs(s)] == [3, 4, 5]
@@ -52,6 +52,43 @@ def test_simple_compound_nomap():
     _test_simple_compound(st)
 
 
+def test_mmap_views():
+    from array import array
+
+    with TempStorage("views") as st:
+        with st.create_file("a") as af:
+            af.write(b("alfa"))
+            af.write_array(array("i", [1, 2, 3]))
+        with st.create_file("b") as bf:
+            bf.write_pickle(("bravo", 2))
+            bf.write(b("charlie"))
+
+        f = st.create_file("f")
+        CompoundStorage.assemble(f, st, ["a", "b"])
+        cs = CompoundStorage(st.open_file("f"))
+
+        af = cs.open_file("a")
+        # get_view() returns a slice of the memory map instead of a copy
+        view = af.get_view(0, 4)
+        assert isinstance(view, memoryview)
+        assert view == b("alfa")
+        assert af.get(0, 4) == b("alfa")
+        assert list(af.get_array(4, "i", 3)) == [1, 2, 3]
+        assert af.subset(4, 12).get_int(8) == 3
+        view.release()
+
+        bf = cs.open_file("b")
+        obj, end = bf.get_pickle(0)
+        assert obj == ("bravo", 2)
+        assert bf.get(end, 7) == b("charlie")
+        assert bf.read_pickle() == ("bravo", 2)
+        assert bf.read() == b("charlie")
+
+        af.close()
+        bf.close()
+        cs.close()
+
+
 #def test_unclosed_mmap():
 #    with TempStorage("unclosed") as st:
 #        assert st.supports_mmap
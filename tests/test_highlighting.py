@@ -263,6 +263,133 @@ def test_pinpoint():
                 == "golf hotel india JULIET kilo lima mike")
 
 
+def test_vector_highlighting():
+    from whoosh import formats
+
+    domain = u("alfa bravo charlie delta echo foxtrot golf hotel india juliet "
+               "kilo lima mike november oskar papa quebec romeo sierra tango")
+    words = domain.split()
+    schema = fields.Schema(text=fields.TEXT(stored=True,
+                                            vector=formats.Characters()),
+                           chars=fields.TEXT(stored=True, chars=True))
+    ix = RamStorage().create_index(schema)
+    for start in (0, 5):
+        with ix.writer() as w:
+            for i in range(start, start + 5):
+                text = u(" ").join(words[i:] + words[:i])
+                w.add_document(text=text, chars=text)
+            # Keep the segments separate to check the docnums of vectors
+            w.merge = False
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Read postings")
+
+    def highlights(fieldname, hi):
+        q = query.Or([query.Term(fieldname, u("juliet")),
+                      query.Term(fieldname, u("kilo"))])
+        r = s.search(q, terms=True, limit=None)
+        assert len(r) == 10
+        return r, [hi.highlight_hit(hit, fieldname) for hit in r]
+
+    with ix.searcher() as s:
+        assert not s.is_atomic()
+        hi = highlight.Highlighter(highlight.PinpointFragmenter(surround=6),
+                                   formatter=highlight.UppercaseFormatter())
+
+        # Highlighting from the stored characters of the postings
+        r, expected = highlights("chars", hi)
+        assert not hi.can_read_vector(r, "chars")
+        assert r._char_cache
+        assert all("JULIET KILO l" in h for h in expected)
+
+        # Highlighting from the term vectors only reads each hit's vector
+        s.postings = fail
+        try:
+            r, output = highlights("text", hi)
+        finally:
+            del s.postings
+        assert hi.can_read_vector(r, "text")
+        assert not r._char_cache
+        assert output == expected
+
+        # Fragmenters that need all the tokens still retokenize the text
+        hi.fragmenter = highlight.ContextFragmenter()
+        assert not hi.can_read_vector(r, "text")
+
+
+def test_fragment_matches():
+    # Fragmenting from the character offsets of the matches gives the same
+    # fragments as fragmenting the whole token stream
+    def check(text, terms, fragmenter, analyzer):
+        uc = highlight.UppercaseFormatter()
+        expected = highlight.highlight(text, terms, analyzer, fragmenter, uc)
+
+        tokens = []
+        for t in analyzer(text, chars=True, removestops=False):
+            if t.text in terms:
+                t.matched = True
+                tokens.append(t.copy())
+        fragments = fragmenter.fragment_matches(text, tokens)
+        fragments = highlight.top_fragments(fragments, 3,
+                                            highlight.BasicFragmentScorer(),
+                                            highlight.FIRST)
+        assert uc(text, fragments) == expected
+
+    sa = analysis.StandardAnalyzer()
+    check(_doc, frozenset(("bravo", "india")),
+          highlight.ContextFragmenter(surround=6), sa)
+    check(_doc, frozenset(("kilo", "lima")),
+          highlight.ContextFragmenter(surround=15), sa)
+
+    text = u("This is the first sentence. This one doesn't have the word. " +
+             "This sentence is the second. Third sentence here. And... " +
+             "another sentence! The end")
+    check(text, frozenset(["sentence"]), highlight.SentenceFragmenter(),
+          analysis.StandardAnalyzer(stoplist=None))
+
+    schema = fields.Schema(text=fields.TEXT(stored=True, chars=True))
+    ix = RamStorage().create_index(schema)
+    with ix.writer() as w:
+        w.add_document(text=text)
+    with ix.searcher() as s:
+        r = s.search(query.Term("text", u("sentence")), terms=True)
+        r.formatter = highlight.UppercaseFormatter()
+        r.fragmenter = highlight.SentenceFragmenter()
+        expected = r[0].highlights("text")
+        assert expected.count("SENTENCE") == 3
+
+        r.fragmenter = highlight.SentenceFragmenter(retokenize=False)
+        assert r.highlighter.can_load_chars(r, "text")
+        assert r[0].highlights("text") == expected
+
+
+def test_stream_fragments():
+    sa = analysis.StandardAnalyzer()
+    count = [0]
+
+    def analyzer(text, **kwargs):
+        for t in sa(text, **kwargs):
+            count[0] += 1
+            yield t
+
+    text = u(". ").join([_doc] * 10000)
+    uc = highlight.UppercaseFormatter()
+    for fragmenter in (highlight.ContextFragmenter(surround=6, charlimit=None),
+                       highlight.SentenceFragmenter(charlimit=None)):
+        count[0] = 0
+        highlight.highlight(text, frozenset(["juliet"]), analyzer, fragmenter,
+                            uc)
+        assert count[0] == 120000
+
+        # Stop tokenizing the text once there are enough fragments
+        count[0] = 0
+        fragmenter.stream = True
+        output = highlight.highlight(text, frozenset(["juliet"]), analyzer,
+                                     fragmenter, uc, top=2)
+        assert output.count("JULIET") == 2
+        assert count[0] < 100
+
+
 def test_highlight_wildcards():
     schema = fields.Schema(text=fields.TEXT(stored=True))
     ix = RamStorage().create_index(schema)
@@ -68,6 +68,51 @@ def test_version_in():
         assert not ix.is_empty()
 
 
+def test_toc_cache():
+    from whoosh.filedb.filestore import FileStorage
+
+    class CountingStorage(FileStorage):
+        listed = 0
+
+        def list(self):
+            self.listed += 1
+            return FileStorage.list(self)
+
+    schema = fields.Schema(a=fields.ID(stored=True))
+    with TempStorage("toccache") as st:
+        with st.create_index(schema).writer() as w:
+            w.add_document(a=u("alfa"))
+        cst = CountingStorage(st.folder)
+        ix = cst.open_index()
+        listed = cst.listed
+
+        # Reading the TOC again doesn't re-read the file
+        toc = ix._read_toc()
+        assert ix._read_toc() is toc
+        # Checking the generation doesn't list the directory
+        with ix.searcher() as s:
+            for _ in xrange(10):
+                assert s.up_to_date()
+            assert cst.listed == listed
+
+            # Commit from another index object
+            with st.open_index().writer() as w:
+                w.add_document(a=u("bravo"))
+            assert not s.up_to_date()
+            assert ix.latest_generation() == 2
+            assert cst.listed == listed
+
+        assert ix._read_toc() is not toc
+        assert ix._read_toc().generation == 2
+        assert ix.doc_count() == 2
+
+        # If the index is recreated, the generation goes back to 0
+        st.create_index(schema)
+        assert ix.latest_generation() == 0
+        assert cst.listed > listed
+        assert ix.doc_count() == 0
+
+
 def test_simple_indexing():
     schema = fields.Schema(text=fields.TEXT, id=fields.STORED)
     domain = (u("alfa"), u("bravo"), u("charlie"), u("delta"), u("echo"),
@@ -1,7 +1,7 @@
 from __future__ import with_statement
 import os, threading, time
 
-from whoosh.compat import u
+from whoosh.compat import u, xrange
 from whoosh.util.filelock import try_for
 from whoosh.util.numeric import length_to_byte, byte_to_length
 from whoosh.util.testing import TempStorage
@@ -47,6 +47,38 @@ def test_ramstorage():
     lock.release()
 
 
+def test_positional_file():
+    from array import array
+    from whoosh.filedb.structfile import PositionalFile
+
+    with TempStorage("posfile") as st:
+        with st.create_file("test") as f:
+            f.write(b"abcdef")
+            f.write_int(-20)
+            f.write_array(array("i", [1, 2, 3]))
+            f.write_pickle(("hi", 5))
+            f.write(b"xyz")
+
+        f = st.open_file("test")
+        assert isinstance(f, PositionalFile)
+        # Positional reads don't depend on or move the file position
+        f.seek(2)
+        assert f.get(1, 3) == b"bcd"
+        assert f.get_int(6) == -20
+        assert list(f.get_array(10, "i", 3)) == [1, 2, 3]
+        assert f.tell() == 2
+        obj, end = f.get_pickle(22)
+        assert obj == ("hi", 5)
+        assert f.get(end, 10) == b"xyz"
+
+        sub = f.subset(2, 8)
+        assert sub.get(0, 4) == b"cdef"
+        assert sub.get_int(4) == -20
+        # Reads are clamped to the end of the subset
+        assert sub.get(6, 10) == f.get(8, 2)
+        f.close()
+
+
 def test_filelock_simple():
     with TempStorage("simplefilelock") as st:
         lock1 = st.lock("testlock")
@@ -130,3 +162,86 @@ def test_version_object():
 
     assert sv(1, 2, 3).to_int() == 17213488128
     assert sv.from_int(17213488128) == sv(1, 2, 3)
+
+
+def test_tdigest():
+    import random
+    from whoosh.util.sketches import TDigest
+
+    td = TDigest()
+    assert td.quantile(0.5) is None
+
+    rng = random.Random(0)
+    values = [rng.gauss(0, 1) for _ in xrange(20000)]
+    for v in values:
+        td.add(v)
+    values.sort()
+
+    assert len(td) == len(values)
+    assert td.quantile(0) == values[0]
+    assert td.quantile(1) == values[-1]
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        expected = values[int(q * len(values))]
+        assert abs(td.quantile(q) - expected) < 0.05
+
+
+def test_sketches():
+    from whoosh.util.sketches import HyperLogLog, SpaceSaving
+
+    hll = HyperLogLog(precision=10)
+    hll.update(xrange(50000))
+    hll.update(xrange(25000))
+    assert abs(hll.cardinality() - 50000) < 50000 * 0.1
+
+    small = HyperLogLog()
+    small.update([b"a", b"b", b"c", b"a"])
+    assert small.cardinality() == 3
+    other = HyperLogLog()
+    other.update([b"c", b"d"])
+    small.merge(other)
+    assert small.cardinality() == 4
+
+    ss = SpaceSaving(capacity=10)
+    for i in xrange(10000):
+        ss.add(i % 3 if i % 2 else i)
+    top = ss.top(3)
+    assert sorted(v for v, _ in top) == [0, 1, 2]
+    for v, count in top:
+        assert count >= 10000 // 6
+
+
+def test_lazy_imports():
+    import subprocess, sys
+    import pytest
+
+    if sys.version_info < (3, 7):
+        pytest.skip("Needs module __getattr__")
+
+    # Searching shouldn't pull in the optional or rarely used heavy modules
+    heavy = ["numpy", "asyncio", "urllib.request", "whoosh.lang.morph_en",
+             "whoosh.lang.porter", "whoosh.analysis.morph",
+             "whoosh.analysis.ngrams"]
+    code = ("import sys, whoosh.index, whoosh.qparser, whoosh.searching; "
+            "print(' '.join(m for m in %r if m in sys.modules))" % heavy)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in sys.path if p)
+    out = subprocess.check_output([sys.executable, "-c", code], env=env)
+    assert out.strip() == b""
+
+    # The lazily loaded names are still available from the package
+    from whoosh import analysis
+    from whoosh.analysis import morph, ngrams
+
+    assert analysis.StemFilter is morph.StemFilter
+    assert analysis.NgramWordAnalyzer is ngrams.NgramWordAnalyzer
+    assert analysis.morph is morph
+    assert "ShingleFilter" in dir(analysis)
+    with pytest.raises(AttributeError):
+        analysis.NoSuchFilter
+
+    # Star imports include the lazily loaded names
+    namespace = {}
+    exec("from whoosh.analysis import *", namespace)
+    assert namespace["StemFilter"] is morph.StemFilter
+    assert namespace["NgramFilter"] is ngrams.NgramFilter
+    assert namespace["RegexTokenizer"] is analysis.RegexTokenizer
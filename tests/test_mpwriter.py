@@ -252,6 +252,23 @@ def test_multisegment():
                     assert word in hit["a"].split()
 
 
+def test_indexsort_requires_multisegment():
+    from whoosh.multiproc import MpWriter
+
+    schema = fields.Schema(a=fields.NUMERIC(sortable=True))
+    with TempIndex(schema) as ix:
+        with pytest.raises(ValueError):
+            MpWriter(ix, procs=2, indexsort="a")
+        subargs = {"indexsort": "a"}
+        with pytest.raises(ValueError):
+            MpWriter(ix, procs=2, subargs=subargs)
+        assert subargs == {"indexsort": "a"}
+
+        # The index isn't left locked
+        with ix.writer() as w:
+            w.add_document(a=1)
+
+
 def test_batchsize_eq_doccount():
     check_multi()
     schema = fields.Schema(a=fields.KEYWORD(stored=True))
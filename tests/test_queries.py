@@ -598,3 +598,102 @@ def test_andnot_reverse():
 
     assert len(names_fw) == len(names_rv) == 1
     assert names_fw == names_rv
+
+
+def test_numeric_range_planner():
+    from datetime import datetime, timedelta
+
+    schema = fields.Schema(id=fields.STORED,
+                           n=fields.NUMERIC(sortable=True),
+                           d=fields.DATETIME(sortable=True),
+                           m=fields.NUMERIC(sortable=True))
+    base = datetime(2010, 1, 1)
+    with TempIndex(schema, "numplanner") as ix:
+        for seg in range(2):
+            with ix.writer() as w:
+                w.merge = False
+                for i in range(seg * 50, seg * 50 + 50):
+                    w.add_document(id=i, n=i * 10,
+                                   d=base + timedelta(days=i),
+                                   m=[i, 1000 + i])
+        with ix.writer() as w:
+            w.merge = False
+            # A document without values
+            w.add_document(id=-1)
+        with ix.writer() as w:
+            w.merge = False
+            w.delete_by_term("n", 120)
+
+        def forced(q, strategy):
+            q = q.copy()
+            if strategy == "terms":
+                q.column_cost = q.python_column_cost = float("inf")
+            elif strategy == "column":
+                q.term_cost = float("inf")
+            return q
+
+        with ix.searcher() as s:
+            def ids(q):
+                return sorted(hit["id"] for hit in s.search(q, limit=None))
+
+            queries = [NumericRange("n", 105, 640), NumericRange("n", None, 200),
+                       NumericRange("n", 100, 640, True, True),
+                       NumericRange("n", 490, 510),
+                       DateRange("d", base + timedelta(days=30), None),
+                       DateRange("d", None, base + timedelta(days=3)),
+                       NumericRange("m", 1020, 1030)]
+            for q in queries:
+                target = ids(forced(q, "terms"))
+                assert target
+                assert ids(forced(q, "column")) == target
+                assert ids(q) == target
+                assert sorted(s.stored_fields(docnum)["id"]
+                              for docnum in forced(q, "column").docs(s)) == target
+
+            subreaders = [r for r, _ in s.reader().leaf_readers()]
+            r0 = subreaders[0]
+            q = forced(NumericRange("n", 105, 300), "column")
+            assert q._plan(r0).__class__ is ConstantScoreQuery
+            assert q._plan(r0).child.__class__ is query.RawColumnRange
+            # The second segment's values are all outside the range
+            assert q._plan(subreaders[1]) is NullQuery
+            # The third segment doesn't have a column, so it uses the terms
+            assert q._plan(subreaders[2]).child.__class__ is not query.RawColumnRange
+
+            # The column only holds the first value of multi-valued fields
+            assert r0.is_partial_column("m")
+            assert not r0.is_partial_column("n")
+            q = forced(NumericRange("m", 1020, 1030), "column")
+            assert q._plan(r0).child.__class__ is not query.RawColumnRange
+
+            # Documents without a value have the default value, which is in
+            # an open-ended NUMERIC range
+            q = forced(NumericRange("n", 105, None), "column")
+            assert q._plan(r0).child.__class__ is not query.RawColumnRange
+            assert ids(q) == [i for i in range(11, 100) if i != 12]
+            assert 12 not in ids(forced(NumericRange("n", 105, 300), "column"))
+
+
+def test_numeric_range_planner_merge():
+    # Merging a segment that indexed the field before it had a column must
+    # not let the planner trust the merged column
+    schema = fields.Schema(id=fields.STORED, n=fields.NUMERIC)
+    with TempIndex(schema, "numplannermerge") as ix:
+        with ix.writer() as w:
+            for i in range(2000):
+                w.add_document(id=i, n=i)
+        with ix.writer() as w:
+            w.remove_field("n")
+            w.add_field("n", fields.NUMERIC(sortable=True))
+            w.add_document(id=2000, n=2000)
+            w.merge = False
+        ix.optimize()
+
+        with ix.searcher() as s:
+            r = s.reader()
+            assert r.has_column("n")
+            assert r.is_partial_column("n")
+
+            q = NumericRange("n", 100, 105)
+            assert len(list(q.docs(s))) == 6
+            assert len(s.search(q)) == 6
@@ -1,6 +1,6 @@
 # coding=utf-8
 from __future__ import with_statement
-import random, threading, time
+import random, sys, threading, time
 
 import pytest
 from whoosh import fields, formats, reading
@@ -338,6 +338,126 @@ def test_nonexclusive_read():
             th.join()
 
 
+def test_concurrent_searches():
+    from whoosh import query
+    from whoosh.filedb.filestore import FileStorage
+    from whoosh.util.testing import TempStorage
+
+    schema = fields.Schema(id=fields.NUMERIC(stored=True, sortable=True),
+                           text=fields.TEXT(stored=True))
+    words = u("alfa bravo charlie delta echo foxtrot golf hotel").split()
+    with TempStorage("concurrent") as st:
+        ix = st.create_index(schema)
+        with ix.writer() as w:
+            for i in xrange(500):
+                text = u(" ").join(words[j % len(words)]
+                                   for j in xrange(i % 7, i % 7 + 3))
+                w.add_document(id=i, text=text)
+
+        # Open the index without mmap so the readers share real files
+        ix = FileStorage(st.folder, supports_mmap=False).open_index()
+        with ix.searcher() as s:
+            qs = [query.Term("text", w) for w in words]
+            expected = [[hit["id"] for hit in s.search(q, limit=None,
+                                                        sortedby="id")]
+                        for q in qs]
+
+            errors = []
+
+            def fn(n):
+                try:
+                    for _ in xrange(20):
+                        i = n % len(qs)
+                        r = s.search(qs[i], limit=None, sortedby="id")
+                        if [hit["id"] for hit in r] != expected[i]:
+                            errors.append(i)
+                        n += 1
+                except Exception:
+                    e = sys.exc_info()[1]
+                    errors.append(e)
+
+            ths = [threading.Thread(target=fn, args=(n,)) for n in xrange(8)]
+            for th in ths:
+                th.start()
+            for th in ths:
+                th.join()
+            assert not errors
+
+
+def test_lazy_open_and_warm():
+    from whoosh.filedb.filestore import FileStorage
+    from whoosh.filedb.structfile import HandlePool
+    from whoosh.util.testing import TempStorage
+
+    schema = fields.Schema(id=fields.ID(stored=True, sortable=True),
+                           text=fields.TEXT(vector=True))
+    with TempStorage("lazyopen") as st:
+        ix = st.create_index(schema)
+        with ix.writer() as w:
+            w.add_document(id=u("a"), text=u("alfa bravo charlie"))
+            w.add_document(id=u("b"), text=u("bravo charlie delta"))
+        with ix.writer() as w:
+            w.add_document(id=u("c"), text=u("charlie delta echo"))
+            w.merge = False
+
+        pool = HandlePool(limit=2)
+        stores = [st, FileStorage(st.folder, supports_mmap=False),
+                  FileStorage(st.folder, handle_pool=pool)]
+        for store in stores:
+            with store.open_index().reader() as r:
+                assert len(r.readers) == 2
+                sr = r.readers[0]
+                # The term index isn't parsed until it's needed
+                assert r.doc_count() == 3
+                assert sr._terms._index is None
+                assert not sr._perdoc._colfiles
+
+                assert r.doc_frequency("text", u("charlie")) == 3
+                assert sr._terms._index is not None
+                assert not sr._perdoc._colfiles
+
+                r.warm(fields=["text"], columns=["id"])
+                assert sr._perdoc._colfiles.keys() == set(["id"])
+                r.warm()
+                assert "_stored" in sr._perdoc._colfiles
+
+                m = r.postings("text", u("charlie"))
+                assert [docnum for docnum, _ in m.items_as("weight")] == [0, 1, 2]
+                assert r.stored_fields(2) == {"id": u("c")}
+                assert list(r.vector_as("weight", 0, "text")) == [
+                    (u("alfa"), 1.0), (u("bravo"), 1.0), (u("charlie"), 1.0)]
+
+        # The pool only keeps idle handles up to its limit
+        assert len(pool) <= 2
+        pool.close_idle()
+        assert len(pool) == 0
+
+
+def test_reader_survives_optimize():
+    from whoosh import query
+    from whoosh.filedb.filestore import FileStorage
+    from whoosh.util.testing import TempStorage
+
+    schema = fields.Schema(id=fields.ID(stored=True), num=fields.NUMERIC)
+    with TempStorage("optimizeopen") as st:
+        ix = st.create_index(schema)
+        for i in xrange(0, 100, 20):
+            with ix.writer() as w:
+                w.merge = False
+                for n in xrange(i, i + 20):
+                    w.add_document(id=u(str(n)), num=n)
+
+        for store in (st, FileStorage(st.folder, supports_mmap=False)):
+            with store.open_index().searcher() as s:
+                # Another writer merges every segment and deletes their files
+                with ix.writer() as w:
+                    w.add_document(id=u("x"), num=1000)
+                    w.optimize = True
+
+                r = s.search(query.NumericRange("num", 0, 99), limit=None)
+                assert sorted(int(hit["id"]) for hit in r) == list(range(100))
+
+
 def test_doc_count():
     schema = fields.Schema(id=fields.NUMERIC)
     ix = RamStorage().create_index(schema)
@@ -504,3 +624,80 @@ def test_term_inspection_multi_reader():
             w.merge = False
 
         _check_inspection_results(ix)
+
+
+def test_completion_top_terms():
+    from whoosh.codec.whoosh3 import W3Codec
+
+    domain = u"alfa alpha alpine apple bravo brave bread charlie chart".split()
+    schema = fields.Schema(name=fields.KEYWORD(completion=True),
+                           tags=fields.KEYWORD)
+    codec = W3Codec(completiondepth=2, completionlimit=3)
+    rng = random.Random(7)
+    with TempIndex(schema) as ix:
+        for _ in xrange(3):
+            with ix.writer(codec=codec) as w:
+                for _ in xrange(20):
+                    words = u" ".join(rng.choice(domain) for _ in xrange(3))
+                    w.add_document(name=words, tags=words)
+                w.merge = False
+
+        with ix.reader() as r:
+            assert len(r.leaf_readers()) == 3
+            assert r.prefix_top_terms("tags", u"a") is None
+
+            for leaf, _ in r.leaf_readers():
+                assert leaf.prefix_top_terms("name", u"") is not None
+                complete, items = leaf.prefix_top_terms("name", u"zz")
+                assert complete and items == []
+
+            for prefix in ("", "a", "al", "alp", "b", "br", "ch", "z"):
+                for number in (1, 3, 5):
+                    target = r.most_frequent_terms("tags", number, prefix)
+                    assert r.most_frequent_terms("name", number,
+                                                 prefix) == target
+                    for leaf, _ in r.leaf_readers():
+                        target = leaf.most_frequent_terms("tags", number,
+                                                          prefix)
+                        assert leaf.most_frequent_terms("name", number,
+                                                        prefix) == target
+
+        with ix.writer(codec=codec) as w:
+            w.optimize = True
+        with ix.reader() as r:
+            assert r.is_atomic()
+            complete, items = r.prefix_top_terms("name", u"a")
+            assert not complete
+            assert items == r.most_frequent_terms("tags", 3, "a")
+
+
+def test_stored_fields_many():
+    schema = fields.Schema(id=fields.STORED, name=fields.ID(stored=True),
+                           body=fields.STORED)
+    with TempIndex(schema) as ix:
+        for start in (0, 40, 50):
+            with ix.writer() as w:
+                w.merge = False
+                for i in xrange(start, start + (40 if start < 50 else 30)):
+                    w.add_document(id=i, name=u("n%d") % i,
+                                   body=u("x%d ") % i * 500)
+
+        with ix.reader() as r:
+            assert not r.is_atomic()
+            docnums = [75, 3, 41, 3, 0, 79, 42, 10]
+            expected = [r.stored_fields(d) for d in docnums]
+            assert r.stored_fields_many(docnums) == expected
+            assert r.stored_fields_many(iter(docnums)) == expected
+            assert r.stored_fields_many([]) == []
+
+            many = r.stored_fields_many(docnums, ["id"])
+            assert many == [{"id": e["id"]} for e in expected]
+            many = r.stored_fields_many(docnums, ["body", "name"])
+            assert many == [{"body": e["body"], "name": e["name"]}
+                            for e in expected]
+            # Repeated documents get separate dictionaries
+            assert many[1] is not many[3]
+
+            leaf = r.leaf_readers()[0][0]
+            assert leaf.stored_fields_many([5, 1]) == [leaf.stored_fields(5),
+                                                       leaf.stored_fields(1)]
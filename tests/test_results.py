@@ -673,3 +673,131 @@ def test_filter_by_result():
             assert all(x["title"] == "even" and x["content"] == "foo"
                        for x in result)
 
+
+
+def test_search_after():
+    schema = fields.Schema(id=fields.STORED, content=fields.TEXT,
+                           num=fields.NUMERIC(sortable=True))
+    ix = RamStorage().create_index(schema)
+
+    domain = ("alfa", "bravo", "bravo", "charlie", "delta")
+    w = ix.writer()
+    for i, lst in enumerate(permutations(domain, 3)):
+        w.add_document(id=i, content=u(" ").join(lst), num=i % 7)
+    w.commit()
+
+    q = query.Term("content", u("bravo"))
+    options = [{}, {"reverse": True}, {"sortedby": "num"},
+               {"sortedby": "num", "reverse": True},
+               {"sortedby": ["num", "content"]}, {"scored": False}]
+    with ix.searcher() as s:
+        for kwargs in options:
+            everything = [hit.docnum for hit in s.search(q, limit=None,
+                                                         **kwargs)]
+            assert len(everything) == 54
+
+            # Page through the results with cursors
+            docnums = []
+            cursor = None
+            while True:
+                r = s.search(q, limit=8, search_after=cursor, **kwargs)
+                assert len(r) == 54
+                if not r.scored_length():
+                    break
+                docnums.extend(hit.docnum for hit in r)
+                cursor = r.next_cursor()
+            assert docnums == everything, kwargs
+
+        # Results pages
+        tops = [hit.docnum for hit in s.search(q, limit=None)]
+        page = s.search_page(q, 1, pagelen=10)
+        pages = [[hit.docnum for hit in page]]
+        while not page.is_last_page():
+            page = s.search_page(q, page.pagenum + 1, pagelen=10,
+                                 search_after=page.next_cursor())
+            assert page.offset == (page.pagenum - 1) * 10
+            assert page.scored_length() <= 10
+            pages.append([page.docnum(i) for i in xrange(page.pagelen)])
+        assert page.pagenum == 6
+        assert len(pages[-1]) == 4
+        assert sum(pages, []) == tops
+
+
+class Unreadable(object):
+    # Raises an exception if it's ever unpickled
+    def __reduce__(self):
+        return (_fail_unpickle, ())
+
+
+def _fail_unpickle():
+    raise Exception("Tried to decode a field that wasn't asked for")
+
+
+def test_stored_field_projection():
+    schema = fields.Schema(id=fields.ID(stored=True),
+                           title=fields.TEXT(stored=True),
+                           body=fields.STORED, text=fields.STORED)
+    longtext = u("bravo ") * 1000
+    with TempIndex(schema) as ix:
+        with ix.writer() as w:
+            for i in xrange(10):
+                w.add_document(id=text_type(i), title=u("alfa %d") % i,
+                               body=Unreadable(), text=longtext)
+        with ix.writer() as w:
+            w.merge = False
+            w.add_document(id=u("10"), title=u("alfa 10"), body=Unreadable())
+
+        with ix.searcher() as s:
+            assert not s.reader().is_atomic()
+            assert s.stored_fields(10, ["id", "missing"]) == {"id": u("10")}
+            # Long strings are kept in a separate column
+            leaf = s.reader().leaf_readers()[0][0]
+            assert leaf._perdoc.has_column("_stored_big")
+            assert s.stored_fields(3, ["text", "id"]) == {"id": u("3"),
+                                                          "text": longtext}
+
+            q = query.Term("title", u("alfa"))
+            r = s.search(q, limit=None, fields=["id"])
+            assert len(r) == 11
+            assert r.fields(0) == {"id": r[0]["id"]}
+            assert r.fields(0, ["title"]) == {"title": r[0]["title"]}
+
+            for hit in r:
+                assert list(hit.keys()) == ["id"]
+                # Fields outside the projection are loaded separately
+                assert hit["title"] == u("alfa ") + hit["id"]
+                assert hit.get("title") == hit["title"]
+                assert "title" in hit
+                assert hit.fields(["id", "title"]) == {"id": hit["id"],
+                                                       "title": hit["title"]}
+                with pytest.raises(Exception):
+                    hit["body"]
+
+
+def test_prefetch_stored_fields():
+    schema = fields.Schema(id=fields.STORED, text=fields.TEXT)
+    with TempIndex(schema) as ix:
+        with ix.writer() as w:
+            for i in xrange(30):
+                w.add_document(id=i, text=u("alfa bravo"))
+
+        with ix.searcher() as s:
+            calls = []
+            many = s.stored_fields_many
+
+            def counting_many(docnums, fieldnames=None):
+                calls.append(list(docnums))
+                return many(docnums, fieldnames)
+
+            s.stored_fields_many = counting_many
+            r = s.search(query.Term("text", u("alfa")), limit=None)
+            r.prefetch = 12
+            ids = [hit["id"] for hit in r]
+            assert [len(c) for c in calls] == [12, 12, 6]
+            assert ids == [r.fields(i)["id"] for i in xrange(30)]
+
+            del calls[:]
+            page = s.search_page(query.Term("text", u("alfa")), 2, pagelen=7)
+            assert [hit["id"] for hit in page] == \
+                [r.fields(i)["id"] for i in xrange(7, 14)]
+            assert [len(c) for c in calls] == [7]
@@ -1839,3 +1839,204 @@ def test_function_weighting():
 
 
 
+
+
+def test_result_cache():
+    from whoosh.searching import ResultCache
+
+    schema = fields.Schema(id=fields.STORED, text=fields.TEXT,
+                           tag=fields.ID(sortable=True))
+    ix = RamStorage().create_index(schema)
+    words = u("alfa bravo charlie delta echo").split()
+    with ix.writer() as w:
+        for i in xrange(100):
+            w.add_document(id=i, text=u(" ").join(words[:i % 5 + 1]),
+                           tag=words[i % 3])
+
+    cache = ResultCache()
+    ix.resultcache = cache
+    q = query.Term("text", u("charlie"))
+    options = [{}, {"limit": 5}, {"sortedby": "tag", "limit": None},
+               {"groupedby": "tag"}, {"scored": False},
+               {"filter": query.Term("tag", u("alfa"))}]
+    with ix.searcher() as s:
+        expected = []
+        for kwargs in options:
+            r = s.search(q, **kwargs)
+            expected.append(([(hit.score, hit.docnum) for hit in r], len(r),
+                             r.groups() if "groupedby" in kwargs else None))
+        assert cache.misses == len(options)
+        assert len(cache) == len(options)
+
+    with ix.searcher() as s:
+        for kwargs, (hits, length, groups) in zip(options, expected):
+            r = s.search(q, **kwargs)
+            assert [(hit.score, hit.docnum) for hit in r] == hits
+            assert len(r) == length
+            assert r[0]["id"] == s.stored_fields(hits[0][1])["id"]
+            if groups is not None:
+                assert r.groups() == groups
+        assert cache.hits == len(options)
+
+        # Cached results can still compute their full document set
+        r = s.search(q, filter=query.Term("tag", u("alfa")))
+        assert cache.hits == len(options) + 1
+        assert sorted(r.docs()) == sorted(s.docs_for_query(
+            query.And([q, query.Term("tag", u("alfa"))])))
+
+        # Each cache hit gets its own stored field projection
+        hits = cache.hits
+        r1 = s.search(q, fields=["id"])
+        r2 = s.search(q, fields=["tag"])
+        r3 = s.search(q)
+        assert cache.hits == hits + 3
+        assert r1 is not r2
+        assert r1.fieldnames == ["id"]
+        assert r2.fieldnames == ["tag"]
+        assert r3.fieldnames is None
+        assert r1[0].fields() == {"id": r1[0]["id"]}
+
+        # Searches that record matched terms aren't cached
+        r = s.search(q, terms=True)
+        assert r.has_matched_terms()
+        assert len(cache) == len(options)
+
+    # Changing the index invalidates the cache
+    with ix.writer() as w:
+        w.delete_by_term("tag", u("alfa"))
+    with ix.searcher() as s:
+        r = s.search(q, limit=None)
+        assert len(r) == expected[0][1] - 20
+        assert all(s.stored_fields(hit.docnum)["id"] % 3 for hit in r)
+        assert len(cache) == 1
+
+    # Old entries are evicted to stay under the byte budget
+    cache = ResultCache(maxbytes=cache.size * 3)
+    with ix.searcher(resultcache=cache) as s:
+        for word in words:
+            s.search(query.Term("text", word), limit=None)
+    assert 0 < len(cache) < len(words)
+    assert cache.size <= cache.maxbytes
+
+
+def test_result_cache_totals_and_indexes():
+    from whoosh.searching import ResultCache
+
+    schema = fields.Schema(id=fields.STORED, text=fields.TEXT)
+    ix1 = RamStorage().create_index(schema)
+    ix2 = RamStorage().create_index(schema)
+    for ix, count in ((ix1, 300), (ix2, 50)):
+        with ix.writer() as w:
+            for i in xrange(count):
+                w.add_document(id=i, text=u("alfa bravo") if i % 2
+                               else u("alfa"))
+
+    cache = ResultCache()
+    q = query.Term("text", u("alfa"))
+
+    # A search that skipped blocks doesn't know its length, so putting it in
+    # the cache doesn't count the matches
+    with ix1.searcher(resultcache=cache) as s:
+        r = s.search(q, limit=3)
+        assert not r.has_exact_length()
+        assert cache._entries[cache.key(s, q, {"limit": 3})][0][2] is None
+        r = s.search(q, limit=3)
+        assert len(r) == 300
+        assert cache._entries[cache.key(s, q, {"limit": 3})][0][2] == 300
+
+    # One cache shared by two indexes keeps their entries apart
+    with ix2.searcher(resultcache=cache) as s:
+        assert len(s.search(q, limit=3)) == 50
+    with ix1.writer() as w:
+        w.add_document(id=300, text=u("bravo"))
+    with ix1.searcher(resultcache=cache) as s:
+        assert len(s.search(q, limit=3)) == 300
+    assert len(cache) == 2
+    with ix2.searcher(resultcache=cache) as s:
+        hits = cache.hits
+        assert len(s.search(q, limit=3)) == 50
+        assert cache.hits == hits + 1
+
+
+def test_searcher_manager():
+    import time
+    from whoosh.searching import SearcherManager
+
+    schema = fields.Schema(id=fields.ID(stored=True))
+    ix = RamStorage().create_index(schema)
+    with ix.writer() as w:
+        w.add_document(id=u("a"))
+
+    with SearcherManager(ix) as manager:
+        s1 = manager.acquire()
+        assert s1.doc_count() == 1
+        assert not manager.maybe_refresh()
+        with manager.searcher() as s:
+            assert s is s1
+
+        with ix.writer() as w:
+            w.merge = False
+            w.add_document(id=u("b"))
+        assert manager.maybe_refresh()
+        with manager.searcher() as s2:
+            assert s2 is not s1
+            assert s2.doc_count() == 2
+            # The unchanged segment's reader was reused
+            assert s2.reader().readers[0] is s1.reader().readers[0]
+
+        # The old searcher stays usable until it's released
+        assert not s1.is_closed
+        assert s1.document(id=u("a")) == {"id": u("a")}
+        manager.release(s1)
+        assert s1.is_closed
+        assert not s1.reader().readers[0].is_closed
+
+        # Deleting from a segment opens a new reader for it
+        old = manager.acquire()
+        with ix.writer() as w:
+            w.delete_by_term("id", u("a"))
+        manager.request_refresh()
+        with manager.searcher() as s3:
+            assert s3.doc_count() == 1
+            assert s3.document(id=u("a")) is None
+        manager.release(old)
+        assert old.reader().readers[0].is_closed
+    assert s3.is_closed
+
+    # Background refreshing
+    with SearcherManager(ix, refresh_interval=0.01) as manager:
+        with ix.writer() as w:
+            w.add_document(id=u("c"))
+        manager.request_refresh()
+        for _ in xrange(500):
+            with manager.searcher() as s:
+                if s.doc_count() == 2:
+                    break
+            time.sleep(0.01)
+        with manager.searcher() as s:
+            assert s.doc_count() == 2
+
+    # An error while refreshing doesn't stop the background thread
+    with SearcherManager(ix, refresh_interval=0.01) as manager:
+        errors = []
+        open_searcher = manager._open_searcher
+
+        def failing_open():
+            if not errors:
+                errors.append(True)
+                raise IOError("TOC is being replaced")
+            return open_searcher()
+
+        manager._open_searcher = failing_open
+        with ix.writer() as w:
+            w.add_document(id=u("d"))
+        manager.request_refresh()
+        for _ in xrange(500):
+            with manager.searcher() as s:
+                if s.doc_count() == 3:
+                    break
+            time.sleep(0.01)
+        assert errors
+        assert manager._thread.is_alive()
+        with manager.searcher() as s:
+            assert s.doc_count() == 3
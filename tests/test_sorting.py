@@ -1,11 +1,15 @@
 from __future__ import with_statement
+from collections import defaultdict
 from datetime import datetime, timedelta
 import random
 
-from whoosh import fields, query, sorting, columns
+import pytest
+
+from whoosh import fields, query, sorting, columns, writing
 from whoosh.compat import u
 from whoosh.compat import permutations, xrange
 from whoosh.filedb.filestore import RamStorage
+from whoosh.util import loading
 from whoosh.util.testing import TempIndex
 
 
@@ -1047,3 +1051,383 @@ def test_column_scoring():
             assert [hit["id"] for hit in r] == ["d", "c", "b", "a"]
 
 
+def test_global_ordinals():
+    schema = fields.Schema(id=fields.STORED,
+                           tag=fields.ID(sortable=columns.RefBytesColumn()),
+                           name=fields.ID(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    segs = [[(0, u("delta"), u("mike")), (1, u("alfa"), u("bravo"))],
+            [(2, u("charlie"), u("zulu")), (3, u("alfa"), u("echo"))],
+            [(4, u("bravo"), u("kilo")), (5, u("delta"), u("alfa"))]]
+    for seg in segs:
+        with ix.writer() as w:
+            w.merge = False
+            for id, tag, name in seg:
+                w.add_document(id=id, tag=tag, name=name, text=u("hello"))
+
+    with ix.searcher() as s:
+        assert not s.is_atomic()
+        r = s.reader()
+
+        gords = r.column_ordinals("tag")
+        assert r.column_ordinals("tag") is gords
+        # The RefBytes column always includes the default (empty) value
+        assert gords.values == [b"", b"alfa", b"bravo", b"charlie", b"delta"]
+        assert list(gords.ords) == [4, 1, 3, 1, 2, 4]
+        nords = r.column_ordinals("name")
+        assert [nords.value(nords.ordinal(i)) for i in xrange(6)] == \
+            [b"mike", b"bravo", b"zulu", b"echo", b"kilo", b"alfa"]
+
+        q = query.Term("text", u("hello"))
+        c = s.collector(sortedby="name", limit=None)
+        s.search_with_collector(q, c)
+        assert isinstance(c.categorizer, sorting.OrdinalCategorizer)
+        assert [hit["id"] for hit in c.results()] == [5, 1, 3, 4, 0, 2]
+
+        facet = sorting.FieldFacet("name", reverse=True)
+        r = s.search(q, sortedby=facet, limit=None)
+        assert [hit["id"] for hit in r] == [2, 0, 4, 3, 1, 5]
+
+        facet = sorting.MultiFacet(["tag", sorting.FieldFacet("name",
+                                                              reverse=True)])
+        r = s.search(q, sortedby=facet, limit=None)
+        assert [hit["id"] for hit in r] == [3, 1, 4, 2, 0, 5]
+
+        r = s.search(q, groupedby="tag")
+        assert r.groups() == {"alfa": [1, 3], "bravo": [4], "charlie": [2],
+                              "delta": [0, 5]}
+
+
+def test_ordinal_counts():
+    schema = fields.Schema(tag=fields.ID(sortable=True),
+                           size=fields.NUMERIC(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    tags = u("alfa bravo charlie delta").split()
+    count = 0
+    for _ in xrange(3):
+        with ix.writer() as w:
+            w.merge = False
+            for _ in xrange(20):
+                w.add_document(tag=tags[count % 4], size=count % 3,
+                               text=u("hello") if count % 5 else u("there"))
+                count += 1
+
+    facets = sorting.Facets().add_field("tag").add_field("size")
+    q = query.Term("text", u("hello"))
+    with ix.searcher() as s:
+        expected = dict((name, dict((k, len(v)) for k, v in groups.items()))
+                        for name, groups
+                        in ((n, s.search(q, groupedby=facets).groups(n))
+                            for n in ("tag", "size")))
+
+        numpy = loading.numpy
+        batchsize = sorting.OrdinalCounts.batchsize
+        try:
+            for np in (numpy, None):
+                loading.numpy = np
+                sorting.OrdinalCounts.batchsize = 7
+
+                r = s.search(q, groupedby=facets, maptype=sorting.Count)
+                assert r.groups("tag") == expected["tag"]
+                assert r.groups("size") == expected["size"]
+        finally:
+            loading.numpy = numpy
+            sorting.OrdinalCounts.batchsize = batchsize
+
+
+def test_numeric_array_keys():
+    # Numeric columns with many distinct values are sorted by their values
+    # instead of building global ordinals
+    if loading.optional_numpy() is None:
+        pytest.skip("requires NumPy")
+
+    schema = fields.Schema(id=fields.STORED,
+                           ts=fields.NUMERIC(bits=64, sortable=True),
+                           n=fields.NUMERIC(sortable=True),
+                           small=fields.NUMERIC(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    rng = random.Random(7)
+    docs = []
+    for _ in xrange(3):
+        with ix.writer() as w:
+            w.merge = False
+            for _ in xrange(40):
+                d = {"id": len(docs),
+                     "ts": rng.randint(-2 ** 63 + 1, 2 ** 63 - 1),
+                     "n": rng.randint(-10 ** 6, 10 ** 6),
+                     "small": rng.randint(0, 5)}
+                w.add_document(text=u("alfa"), **d)
+                docs.append(d)
+
+    def key(d, sortedby):
+        k = []
+        for facet in sortedby:
+            if isinstance(facet, sorting.FieldFacet):
+                k.append(0 - d[facet.fieldname])
+            else:
+                k.append(d[facet])
+        return tuple(k) + (d["id"],)
+
+    q = query.Term("text", u("alfa"))
+    with ix.searcher() as s:
+        for name in ("ts", "n"):
+            catter = sorting.FieldFacet(name).categorizer(s)
+            assert catter.ordinals() is None
+            assert catter.ordinal_keys() is None
+            assert catter.array_keys() is not None
+        assert sorting.FieldFacet("small").categorizer(s).ordinals()
+        assert "ts" not in getattr(s.reader(), "_ordinals_cache", {})
+
+        for sortedby in (["ts"], ["n"], ["small", "n"],
+                         [sorting.FieldFacet("small", reverse=True), "ts"]):
+            for reverse in (False, True):
+                expected = sorted(docs, key=lambda d: key(d, sortedby),
+                                  reverse=reverse)
+                expected = [d["id"] for d in expected]
+                for limit in (5, None):
+                    c = s.collector(sortedby=sortedby, reverse=reverse,
+                                    limit=limit)
+                    s.search_with_collector(q, c)
+                    assert c._batchkeys is not None
+                    ids = [hit["id"] for hit in c.results()]
+                    assert ids == expected[:limit]
+
+
+def test_stats_facet():
+    schema = fields.Schema(tag=fields.ID(sortable=True),
+                           price=fields.NUMERIC(sortable=True),
+                           qty=fields.NUMERIC(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    tags = u("alfa bravo charlie").split()
+    values = defaultdict(list)
+    n = 0
+    for _ in xrange(3):
+        with ix.writer() as w:
+            w.merge = False
+            for _ in xrange(50):
+                tag = tags[n % 3]
+                price = n * 7 % 50
+                values[tag].append((price, n))
+                w.add_document(tag=tag, price=price, qty=n, text=u("hello"))
+                n += 1
+    # Segment without the qty column
+    with ix.writer() as w:
+        w.merge = False
+        w.add_document(tag=u("alfa"), price=15, text=u("hello"))
+        values["alfa"].append((15, 0))
+
+    numpy = loading.numpy
+    try:
+        for np in (numpy, None):
+            loading.numpy = np
+            with ix.searcher() as s:
+                q = query.Term("text", u("hello"))
+                stats = sorting.Stats("price", percentiles=(0, 50, 100))
+                facet = sorting.FieldFacet("tag", maptype=stats)
+                r = s.search(q, groupedby=facet)
+                groups = r.groups("tag")
+                assert sorted(groups) == tags
+                for tag in tags:
+                    prices = [p for p, _ in values[tag]]
+                    st = groups[tag]
+                    assert st["count"] == len(prices)
+                    assert st["sum"] == sum(prices)
+                    assert st["min"] == min(prices)
+                    assert st["max"] == max(prices)
+                    assert st["mean"] == sum(prices) / len(prices)
+                    pcts = st["percentiles"]
+                    assert pcts[0] == min(prices)
+                    assert pcts[100] == max(prices)
+                    prices.sort()
+                    assert prices[0] <= pcts[50] <= prices[-1]
+
+                stats = sorting.Stats("qty", percentiles=())
+                r = s.search(q, groupedby="tag", maptype=stats)
+                st = r.groups()["alfa"]
+                # Documents in the segment without a "qty" column get the
+                # column's default value
+                expected = 0
+                for leaf, offset in s.reader().leaf_readers():
+                    col = leaf.column_reader("qty")
+                    tagcol = leaf.column_reader("tag")
+                    expected += sum(col[i] for i in xrange(len(col))
+                                    if tagcol[i] == "alfa")
+                assert st["sum"] == expected
+                assert st["percentiles"] == {}
+    finally:
+        loading.numpy = numpy
+
+
+def test_sketch_facets():
+    schema = fields.Schema(tag=fields.ID(sortable=True),
+                           author=fields.ID(sortable=True),
+                           text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    authors = defaultdict(list)
+    n = 0
+    for _ in xrange(3):
+        with ix.writer() as w:
+            w.merge = False
+            for _ in xrange(300):
+                tag = u("even") if n % 2 else u("odd")
+                # Low-numbered authors are much more common
+                author = u("a%d") % (n % (n % 7 + 1) if n % 3 else n % 150)
+                authors[tag].append(author)
+                w.add_document(tag=tag, author=author, text=u("hello"))
+                n += 1
+
+    with ix.searcher() as s:
+        q = query.Term("text", u("hello"))
+        facet = sorting.FieldFacet("tag",
+                                   maptype=sorting.DistinctCount("author"))
+        groups = s.search(q, groupedby=facet).groups()
+        for tag in (u("even"), u("odd")):
+            expected = len(set(authors[tag]))
+            assert abs(groups[tag] - expected) <= expected * 0.05
+
+        facet = sorting.FieldFacet("tag",
+                                   maptype=sorting.TopValues("author", 3))
+        groups = s.search(q, groupedby=facet).groups()
+        for tag in (u("even"), u("odd")):
+            counts = defaultdict(int)
+            for author in authors[tag]:
+                counts[author] += 1
+            expected = sorted(counts.items(), key=lambda x: (0 - x[1], x[0]))
+            top = groups[tag]
+            assert len(top) == 3
+            assert [name for name, _ in top] == [a for a, _ in expected[:3]]
+            for name, count in top:
+                assert count >= counts[name]
+
+
+def test_facet_map_instances():
+    # A map instance passed as a maptype is only a template, each search
+    # gets its own map
+    schema = fields.Schema(tag=fields.ID(sortable=True),
+                           size=fields.ID(sortable=True),
+                           price=fields.NUMERIC(sortable=True))
+    ix = RamStorage().create_index(schema)
+    with ix.writer() as w:
+        for i, tag in enumerate(u("a b b a b a b a b b").split()):
+            size = u("small") if i % 2 else u("large")
+            w.add_document(tag=tag, size=size, price=i)
+
+    with ix.searcher() as s:
+        for maptype in (sorting.Stats("price"), sorting.DistinctCount("price"),
+                        sorting.TopValues("price"), sorting.Count()):
+            facet = sorting.FieldFacet("tag", maptype=maptype)
+            r1 = s.search(query.NumericRange("price", 0, 4), groupedby=facet)
+            before = r1.groups()
+            r2 = s.search(query.Every(), groupedby=facet)
+            assert r1.groups() == before
+            assert r2.groups() != before
+
+            # A search-level map instance shared by two facets
+            r = s.search(query.Every(), groupedby=["tag", "size"],
+                         maptype=maptype)
+            assert sorted(r.groups("tag")) == ["a", "b"]
+            assert sorted(r.groups("size")) == ["large", "small"]
+
+    # A custom map that needs arguments and doesn't override new() is used
+    # as is, like before new() existed
+    class Limited(sorting.Count):
+        def __init__(self, limit):
+            sorting.Count.__init__(self)
+            self.limit = limit
+
+        def as_dict(self):
+            return dict((k, min(v, self.limit))
+                        for k, v in sorting.Count.as_dict(self).items())
+
+    maptype = Limited(3)
+    assert maptype.new() is maptype
+    with ix.searcher() as s:
+        r = s.search(query.Every(), groupedby="tag", maptype=maptype)
+        assert r.groups() == {"a": 3, "b": 3}
+
+
+def test_index_sort():
+    schema = fields.Schema(id=fields.STORED, num=fields.NUMERIC(sortable=True),
+                           text=fields.TEXT(vector=True))
+    domain = list(range(60))
+    random.shuffle(domain)
+    words = u("alfa bravo charlie delta").split()
+
+    ix = RamStorage().create_index(schema)
+    for chunk in (domain[:25], domain[25:]):
+        with ix.writer(indexsort="num") as w:
+            w.merge = False
+            for i in chunk:
+                w.add_document(id=i, num=i % 20,
+                               text=u(" ").join(words[:i % 4 + 1]))
+
+    # Each segment is sorted by num, with ties in the order they were added
+    segments = ix._segments()
+    assert len(segments) == 2
+    assert all(seg.index_sort() == ("num", False) for seg in segments)
+    with ix.reader() as r:
+        nums = [r.stored_fields(docnum)["id"] % 20 for docnum in r.all_doc_ids()]
+        assert nums[:25] == sorted(nums[:25])
+        assert nums[25:] == sorted(nums[25:])
+        assert list(r.column_reader("num")) == nums
+
+        # Postings and vectors follow the documents
+        for docnum in r.postings("text", "delta").all_ids():
+            assert r.stored_fields(docnum)["id"] % 4 == 3
+        for docnum in r.all_doc_ids():
+            n = r.stored_fields(docnum)["id"] % 4 + 1
+            assert r.doc_field_length(docnum, "text") == n
+            vwords = [w for w, _ in r.vector_as("weight", docnum, "text")]
+            assert vwords == sorted(words[:n])
+
+    q = query.Term("text", "bravo")
+    target = sorted((i % 20, i) for i in domain if i % 4 >= 1)
+
+    def check(s, reverse):
+        facet = sorting.FieldFacet("num", reverse=reverse)
+        r = s.search(q, sortedby=facet, limit=7)
+        keys = [hit["id"] % 20 for hit in r]
+        expected = sorted(k for k, _ in target)
+        if reverse:
+            expected.reverse()
+        assert keys == expected[:7]
+        assert len(r) == len(target)
+        return r
+
+    with ix.searcher() as s:
+        r = check(s, False)
+        assert not r.has_exact_length()
+        r = check(s, True)
+
+    # Deleting and merging keeps the merged segment sorted
+    with ix.writer(indexsort=sorting.FieldFacet("num", reverse=True)) as w:
+        w.delete_by_term("text", u("charlie"))
+        w.optimize = True
+    target = [(k, i) for k, i in target if i % 4 == 1]
+    segments = ix._segments()
+    assert len(segments) == 1
+    assert segments[0].index_sort() == ("num", True)
+
+    with ix.searcher() as s:
+        nums = list(s.reader().column_reader("num"))
+        assert nums == sorted(nums, reverse=True)
+        r = check(s, True)
+        assert not r.has_exact_length()
+        r = check(s, False)
+        assert r.has_exact_length()
+
+
+def test_index_sort_unsortable():
+    schema = fields.Schema(id=fields.STORED, text=fields.TEXT)
+    ix = RamStorage().create_index(schema)
+    with pytest.raises(writing.IndexingError):
+        ix.writer(indexsort="text")
+    with pytest.raises(writing.IndexingError):
+        ix.writer(indexsort="nosuchfield")
+    # The failed writers released the lock
+    with ix.writer() as w:
+        w.add_document(id=1, text=u("alfa"))
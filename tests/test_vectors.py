@@ -135,3 +135,16 @@ def test_vpst_block_tag():
             with ix.writer() as w:
                 w.add_document(text=string)
 
+
+
+def test_long_vector_terms():
+    # A vector block's info holds its last term, so with long terms the info
+    # is longer than the part of the block that's read for it at first
+    schema = fields.Schema(text=fields.TEXT(vector=True))
+    words = [u("%s%s") % (c, "x" * 100) for c in "abc"]
+    ix = RamStorage().create_index(schema)
+    with ix.writer() as w:
+        w.add_document(text=u(" ").join(words))
+    with ix.reader() as r:
+        assert list(r.vector_as("frequency", 0, "text")) == [
+            (word, 1) for word in words]